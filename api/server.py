@@ -0,0 +1,160 @@
+import asyncio
+import os
+import sys
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + '/../')
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from src.embeddings_manager import EmbeddingsManager
+from src.metadata_filter import validate_where
+from src.metrics import metrics
+from src.vector_store import VectorStore
+from utils.config_file import IngestConfig, RAGSystemConfig, SnapshotConfig
+from workflows.retrive_workflow import RAGRetriever
+from workflows.upsert_workflow import RAGSystem
+
+
+class TextDocument(BaseModel):
+    source: str
+    text: str
+
+
+class IngestRequest(BaseModel):
+    documents: List[TextDocument] = Field(default_factory=list)
+    # Relative to IngestConfig.API_INGEST_ROOT on the server
+    directory: Optional[str] = None
+    prune_missing: bool = False
+
+
+class SearchRequest(BaseModel):
+    query: str
+    n_results: int = Field(default=5, ge=1, le=100)
+    # ChromaDB-style metadata filter, e.g. {"source": "week3.pdf"}
+    where: Optional[Dict[str, Any]] = None
+
+
+class ChatTurn(BaseModel):
+    role: str
+    content: str
+
+
+class AskRequest(BaseModel):
+    query: str
+    where: Optional[Dict[str, Any]] = None
+    # Earlier turns of the chat and its id, so follow-ups reuse the session's candidates
+    history: List[ChatTurn] = Field(default_factory=list)
+    session_id: Optional[str] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the shared models and vector index once per worker process, warming them up if configured."""
+    embeddings_manager = EmbeddingsManager()
+    vector_store = VectorStore()
+    await asyncio.to_thread(vector_store.create_client)
+    snapshot_path = getattr(SnapshotConfig, 'IMPORT_ON_START', None)
+    if snapshot_path and vector_store.client.count() == 0:
+        # New replica: load a prebuilt collection instead of ingesting from scratch
+        rag_system = RAGSystem(None, embeddings_manager=embeddings_manager, vector_store=vector_store)
+        await asyncio.to_thread(rag_system.import_snapshot, snapshot_path)
+    app.state.embeddings_manager = embeddings_manager
+    app.state.vector_store = vector_store
+    app.state.retriever = RAGRetriever(vector_store=vector_store, embeddings_manager=embeddings_manager)
+    if RAGSystemConfig.WARM_UP_ON_START:
+        await asyncio.to_thread(app.state.retriever.warm_up)
+    # Ingests run one at a time; the local backend itself keeps queries off the index while it changes
+    app.state.ingest_lock = asyncio.Lock()
+    yield
+
+
+app = FastAPI(title="EduRAG", lifespan=lifespan)
+
+
+@app.get("/health")
+async def health(request: Request) -> Dict[str, Any]:
+    return await asyncio.to_thread(request.app.state.retriever.get_system_info)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics() -> str:
+    """Counters and stage-latency histograms in the Prometheus text format."""
+    return metrics.render()
+
+
+def resolve_ingest_directory(directory: str) -> str:
+    """Server path of a requested ingest directory, which must stay inside ``API_INGEST_ROOT``."""
+    root = getattr(IngestConfig, 'API_INGEST_ROOT', None)
+    if not root:
+        raise HTTPException(status_code=403, detail="Directory ingestion is disabled on this server.")
+    root = os.path.realpath(root)
+    # realpath resolves "..", absolute paths and symlinks before the containment check
+    path = os.path.realpath(os.path.join(root, directory))
+    if os.path.commonpath([root, path]) != root:
+        raise HTTPException(status_code=400, detail=f"Directory must be inside the ingest root: {directory}")
+    if not os.path.isdir(path):
+        raise HTTPException(status_code=400, detail=f"Directory not found: {directory}")
+    return path
+
+
+@app.post("/ingest")
+async def ingest(body: IngestRequest, request: Request) -> Dict[str, Any]:
+    if not body.documents and not body.directory:
+        raise HTTPException(status_code=400, detail="Provide documents and/or a directory to ingest.")
+    directory = resolve_ingest_directory(body.directory) if body.directory else None
+
+    state = request.app.state
+    rag_system = RAGSystem(
+        directory,
+        embeddings_manager=state.embeddings_manager,
+        vector_store=state.vector_store
+    )
+    async with state.ingest_lock:
+        num_chunks = 0
+        if body.documents:
+            documents = [(doc.source, doc.text) for doc in body.documents]
+            num_chunks = await asyncio.to_thread(rag_system.ingest_texts, documents)
+        if directory:
+            await asyncio.to_thread(rag_system.workflow, body.prune_missing)
+    return {"status": "ok", "chunks_from_documents": num_chunks, "directory": body.directory}
+
+
+def check_filter(where: Optional[Dict[str, Any]]):
+    try:
+        validate_where(where)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/search")
+async def search(body: SearchRequest, request: Request) -> Dict[str, Any]:
+    check_filter(body.where)
+    documents = await request.app.state.retriever.aretrieve_documents(body.query, body.n_results, body.where)
+    return {"query": body.query, "retrieved_documents": documents}
+
+
+@app.post("/ask")
+async def ask(body: AskRequest, request: Request) -> Dict[str, Any]:
+    check_filter(body.where)
+    history = [turn.model_dump() for turn in body.history]
+    return await request.app.state.retriever.aask(body.query, body.where, history, body.session_id)
+
+
+@app.post("/ask/stream")
+async def ask_stream(body: AskRequest, request: Request) -> StreamingResponse:
+    check_filter(body.where)
+    retriever: RAGRetriever = request.app.state.retriever
+    history = [turn.model_dump() for turn in body.history]
+    retrieved_docs = await retriever.aretrieve_in_session(body.query, history, body.session_id,
+                                                          retriever.n_results, body.where)
+    return StreamingResponse(retriever.astream_answer(body.query, retrieved_docs, history), media_type="text/plain")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run("api.server:app", host="0.0.0.0", port=int(os.getenv("PORT", "8000")))
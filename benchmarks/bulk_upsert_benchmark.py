@@ -0,0 +1,83 @@
+"""Time BulkWriter against a fault-injecting backend at several concurrency levels.
+
+A FaultInjectingBackend adds per-request latency, random retryable
+failures and a record limit (to trigger batch splitting) in front of a
+temporary local index, so the effect of concurrency, retries and
+adaptive batching can be measured without a remote vector store.
+
+Usage:
+    python benchmarks/bulk_upsert_benchmark.py --chunks 5000 --latency-ms 50 --failure-rate 0.1
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + '/../')
+
+from src.bulk_writer import BulkWriter
+from src.vector_backends import FaultInjectingBackend, LocalBackend
+from utils.config_file import VectorStoreConfig
+
+
+def run(chunks: int, dim: int, concurrency: int, args, workdir: str) -> dict:
+    rng = np.random.default_rng(0)
+    ids = [f"chunk-{i}" for i in range(chunks)]
+    documents = [" ".join(["lorem"] * int(rng.integers(50, 300))) for _ in range(chunks)]
+    metadatas = [{"source": "bench.txt", "chunk_id": i} for i in range(chunks)]
+    embeddings = rng.normal(size=(chunks, dim)).astype(np.float32)
+
+    inner = LocalBackend(f"bulk_{concurrency}", workdir, dim)
+    inner.connect()
+    backend = FaultInjectingBackend(inner, failure_rate=args.failure_rate, latency_ms=args.latency_ms,
+                                    max_records=args.max_records, seed=concurrency)
+    backend.max_batch_size = args.batch_size
+    writer = BulkWriter(backend, concurrency=concurrency, backoff_base=args.backoff_base)
+
+    start = time.perf_counter()
+    written = writer.write(ids, embeddings, documents, metadatas)
+    elapsed = time.perf_counter() - start
+    assert inner.count() == chunks == len(written)
+    return {
+        "concurrency": writer.concurrency,
+        "seconds": round(elapsed, 3),
+        "chunks_per_s": round(chunks / elapsed, 1),
+        **writer.stats,
+        "final_batch_size": writer.max_batch_size
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=getattr(VectorStoreConfig, 'VECTOR_SIZE', 384))
+    parser.add_argument("--concurrency", default="1,4,8")
+    parser.add_argument("--batch-size", type=int, default=100, help="backend max_batch_size to start from")
+    parser.add_argument("--max-records", type=int, default=50, help="larger batches are rejected as too large")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--backoff-base", type=float, default=0.05)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        rows = [run(args.chunks, args.dim, int(level), args, workdir) for level in args.concurrency.split(",")]
+
+    if args.json:
+        print(json.dumps({"chunks": args.chunks, "latency_ms": args.latency_ms,
+                          "failure_rate": args.failure_rate, "results": rows}, indent=2))
+        return
+    print(f"{args.chunks} chunks, {args.latency_ms} ms per request, {args.failure_rate:.0%} injected failures, "
+          f"batches over {args.max_records} records rejected")
+    print(f"{'concurrency':>12}{'seconds':>10}{'chunks/s':>10}{'batches':>9}{'retries':>9}{'splits':>8}")
+    for row in rows:
+        print(f"{row['concurrency']:>12}{row['seconds']:>10}{row['chunks_per_s']:>10}{row['batches']:>9}"
+              f"{row['retries']:>9}{row['splits']:>8}")
+
+
+if __name__ == "__main__":
+    main()
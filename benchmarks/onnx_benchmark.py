@@ -0,0 +1,166 @@
+"""Compare the torch, ONNX and int8 ONNX embedding backends: parity, throughput, latency and memory.
+
+Each backend is measured in a fresh process, so load time and peak RSS are
+not inflated by the others. Parity is the cosine similarity between every
+ONNX embedding and the PyTorch embedding of the same text; the script
+exits with status 1 when a backend falls below its threshold, so it can
+gate a model or dependency upgrade.
+
+Usage:
+    python benchmarks/onnx_benchmark.py                       # all backends, DEFAULT_MODEL
+    python benchmarks/onnx_benchmark.py --parity-only --json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + '/../')
+
+from src.onnx_backend import ensure_exported
+from utils.config_file import EmbeddingsConfig
+
+BACKENDS = ("torch", "onnx", "onnx_int8")
+
+
+def synthetic_texts(count: int, seed: int = 0) -> List[str]:
+    """Sentences of varying length drawn from a small course-material vocabulary."""
+    vocabulary = (
+        "the a of and to in is for on with as by students course lecture exam assignment grade "
+        "semester module chapter theorem proof algorithm data structure complexity graph tree "
+        "network energy force velocity matrix vector integral derivative function equation "
+        "experiment hypothesis result analysis history economy market policy language grammar"
+    ).split()
+    rng = np.random.default_rng(seed)
+    texts = []
+    for _ in range(count):
+        words = rng.choice(vocabulary, int(rng.integers(4, 120)))
+        texts.append(" ".join(words).capitalize() + ".")
+    return texts
+
+
+def peak_rss_mb() -> float:
+    scale = 1 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20, 1)
+
+
+def measure(model_name: str, backend: str, texts: List[str], queries: List[str],
+            parity_texts: List[str], batch_size: int, threads: int) -> Dict:
+    """Runs in a child process: load one backend and time it."""
+    if threads:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+    from src import model_registry
+
+    start = time.perf_counter()
+    model = model_registry.embedding_model(model_name, backend, threads=threads)
+    model.encode(queries[:1], batch_size=1)
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model.encode(texts, batch_size=batch_size)
+    encode_s = time.perf_counter() - start
+
+    latencies = []
+    for query in queries:
+        begin = time.perf_counter()
+        model.encode([query], batch_size=1)
+        latencies.append((time.perf_counter() - begin) * 1000)
+
+    embeddings = np.asarray(model.encode(parity_texts, batch_size=batch_size), dtype=np.float32)
+    return {
+        "backend": backend,
+        "load_s": round(load_s, 2),
+        "texts_per_s": round(len(texts) / encode_s, 1),
+        "query_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "query_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "peak_rss_mb": peak_rss_mb(),
+        "embeddings": embeddings
+    }
+
+
+def cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.clip(np.linalg.norm(a, axis=1, keepdims=True), 1e-12, None)
+    b = b / np.clip(np.linalg.norm(b, axis=1, keepdims=True), 1e-12, None)
+    return np.sum(a * b, axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=getattr(EmbeddingsConfig, 'DEFAULT_MODEL', 'all-MiniLM-L6-v2'))
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--texts", type=int, default=2000, help="texts in the throughput run")
+    parser.add_argument("--queries", type=int, default=200, help="single-text encodes in the latency run")
+    parser.add_argument("--parity-texts", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=getattr(EmbeddingsConfig, 'BATCH_SIZE', 32))
+    parser.add_argument("--threads", type=int, default=0, help="intra-op threads per backend; 0 = library default")
+    parser.add_argument("--min-cosine", type=float, default=0.999, help="parity threshold for onnx")
+    parser.add_argument("--min-cosine-int8", type=float, default=0.98, help="parity threshold for onnx_int8")
+    parser.add_argument("--parity-only", action="store_true", help="skip the throughput and latency runs")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    backends = [backend.strip() for backend in args.backends.split(",") if backend.strip()]
+    unknown = [backend for backend in backends if backend not in BACKENDS]
+    if unknown:
+        parser.error(f"unknown backends: {unknown}")
+    if "torch" not in backends:
+        backends.insert(0, "torch")  # parity reference
+
+    # Export up front so neither export time nor torch's memory is charged to the ONNX runs
+    for backend in backends:
+        if backend != "torch":
+            ensure_exported(args.model, quantized=backend == "onnx_int8")
+
+    texts = [] if args.parity_only else synthetic_texts(args.texts, seed=0)
+    queries = synthetic_texts(1 if args.parity_only else args.queries, seed=1)
+    parity_texts = synthetic_texts(args.parity_texts, seed=2)
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for backend in backends:
+        with context.Pool(1) as pool:
+            results.append(pool.apply(measure, (args.model, backend, texts, queries, parity_texts,
+                                                args.batch_size, args.threads)))
+
+    reference = results[0]["embeddings"]
+    thresholds = {"torch": 1.0, "onnx": args.min_cosine, "onnx_int8": args.min_cosine_int8}
+    failed = []
+    for row in results:
+        cosine = cosine_rows(row.pop("embeddings"), reference)
+        row["min_cosine"] = round(float(cosine.min()), 6)
+        row["mean_cosine"] = round(float(cosine.mean()), 6)
+        row["parity_ok"] = row["backend"] == "torch" or row["min_cosine"] >= thresholds[row["backend"]]
+        if not row["parity_ok"]:
+            failed.append(row["backend"])
+        if args.parity_only:
+            for key in ("texts_per_s", "query_p50_ms", "query_p95_ms"):
+                row.pop(key)
+
+    if args.json:
+        print(json.dumps({"model": args.model, "batch_size": args.batch_size, "results": results}, indent=2))
+    else:
+        print(f"{args.model}: {len(parity_texts)} parity texts, {len(texts)} throughput texts, "
+              f"{len(queries)} single-text queries")
+        columns = ["backend", "load_s", "texts_per_s", "query_p50_ms", "query_p95_ms", "peak_rss_mb",
+                   "min_cosine", "parity_ok"]
+        columns = [column for column in columns if column in results[0]]
+        print("".join(f"{column:>14}" for column in columns))
+        for row in results:
+            print("".join(f"{str(row[column]):>14}" for column in columns))
+    if failed:
+        print(f"Parity below threshold for: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Compare float32, int8 and binary local indexes: memory per vector, QPS and recall@k.
+
+Usage:
+    python benchmarks/quantization_benchmark.py --num-vectors 100000 --queries 200
+    python benchmarks/quantization_benchmark.py --collection documents   # vectors of a local collection
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + '/../')
+
+from src.ann_index import create_index
+from src.vector_backends import LocalBackend
+from utils.config_file import VectorStoreConfig
+
+
+def synthetic_vectors(num_vectors: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Clustered vectors, closer to real embeddings than isotropic noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, num_vectors // 250), dim))
+    labels = rng.integers(0, len(centers), num_vectors)
+    return (centers[labels] + 0.6 * rng.normal(size=(num_vectors, dim))).astype(np.float32)
+
+
+def collection_vectors(collection: str, index_dir: str) -> np.ndarray:
+    path = os.path.join(index_dir, f"{collection}.meta.json")
+    if not os.path.exists(path):
+        raise ValueError(f"No local index found at {path}")
+    with open(path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    # The .npy has spare rows past the live ones; the backend knows how many are live
+    backend = LocalBackend(collection, index_dir, meta["dimension"], meta["metric"])
+    backend.connect()
+    try:
+        return backend.index.vectors
+    finally:
+        backend.close()
+
+
+def run(vectors: np.ndarray, queries: np.ndarray, k: int, metric: str, rescore_factors: dict) -> list:
+    dim = vectors.shape[1]
+    truth = None
+    rows = []
+    for quantization in ("none", "int8", "binary"):
+        options = {}
+        if quantization != "none":
+            options = {"quantization": quantization, "rescore_factor": rescore_factors[quantization]}
+        index = create_index("flat", dim, metric, **options)
+        for start in range(0, len(vectors), 65536):
+            index.add(np.asarray(vectors[start:start + 65536]))
+        if truth is None:
+            _, truth = index.exact_search(queries, k)
+
+        start = time.perf_counter()
+        found = np.stack([index.search(query[None, :], k)[1][0] for query in queries])
+        elapsed = time.perf_counter() - start
+
+        hits = sum(len(set(f.tolist()) & set(t.tolist())) for f, t in zip(found, truth))
+        bytes_per_vector = index.info().get("bytes_per_vector", 4 * dim)
+        rows.append({
+            "quantization": quantization,
+            "rescore_factor": options.get("rescore_factor"),
+            "bytes_per_vector": bytes_per_vector,
+            "resident_mb": round(bytes_per_vector * len(vectors) / 2**20, 1),
+            "qps": round(len(queries) / elapsed, 1),
+            f"recall_at_{k}": round(hits / truth.size, 4)
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--num-vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=getattr(VectorStoreConfig, 'VECTOR_SIZE', 384))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--metric", default=getattr(VectorStoreConfig, 'DISTANCE_METRIC', 'cosine'))
+    parser.add_argument("--int8-rescore", type=int, default=4)
+    parser.add_argument("--binary-rescore", type=int, default=10)
+    parser.add_argument("--collection", help="benchmark the vectors of a local collection instead")
+    parser.add_argument("--index-dir", default=getattr(VectorStoreConfig, 'LOCAL_INDEX_DIR', 'data/vector_index'))
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    if args.collection:
+        vectors = collection_vectors(args.collection, args.index_dir)
+    else:
+        vectors = synthetic_vectors(args.num_vectors, args.dim)
+    # Queries are perturbed stored vectors, so every query has true near neighbours
+    rng = np.random.default_rng(1)
+    picks = rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)
+    queries = np.asarray(vectors[np.sort(picks)]) + 0.1 * rng.normal(size=(len(picks), vectors.shape[1]))
+    queries = queries.astype(np.float32)
+
+    rows = run(vectors, queries, args.k, args.metric,
+               {"int8": args.int8_rescore, "binary": args.binary_rescore})
+    if args.json:
+        print(json.dumps({"num_vectors": len(vectors), "dim": vectors.shape[1], "results": rows}, indent=2))
+        return
+
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} single-vector queries, k={args.k}")
+    print(f"{'quantization':<13}{'bytes/vec':>10}{'resident MB':>13}{'QPS':>9}{'recall':>9}")
+    for row in rows:
+        print(f"{row['quantization']:<13}{row['bytes_per_vector']:>10}{row['resident_mb']:>13}"
+              f"{row['qps']:>9}{row[f'recall_at_{args.k}']:>9}")
+
+
+if __name__ == "__main__":
+    main()
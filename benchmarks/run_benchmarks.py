@@ -0,0 +1,344 @@
+"""Offline benchmarks for the ingest and query hot paths.
+
+Generates a synthetic corpus (text files and PDFs), then times document
+loading, chunking, embedding at several batch sizes, update_collection and
+RAGRetriever.ask end to end against a local vector store and the stub LLM.
+Results (p50/p95/p99 latency, throughput, peak RSS) are printed as JSON.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output benchmark.json
+    python benchmarks/run_benchmarks.py --hashing-embedder   # no model download at all
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + '/../')
+
+# Offline defaults must be in place before the pipeline modules read them
+os.environ["LLM_PROVIDER"] = "stub"
+os.environ["VECTOR_STORE_BACKEND"] = "local"
+
+from src.document_loader import DocumentLoader
+from src.embeddings_manager import EmbeddingsManager
+from src.vector_store import VectorStore
+from utils.config_file import (AnswerCacheConfig, EmbeddingsConfig, IngestConfig, RAGSystemConfig,
+                               VectorStoreConfig)
+
+
+# --- synthetic corpus -------------------------------------------------------
+
+def _vocabulary(rng: np.random.Generator, size: int = 5000) -> List[str]:
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    words = ["".join(rng.choice(letters, rng.integers(2, 11))) for _ in range(size)]
+    # A few course codes and formulas, the kind of tokens hybrid search is for
+    words += [f"CS-{n}" for n in range(100, 140)] + ["E=mc^2", "O(n log n)", "dx/dt"]
+    return words
+
+
+def _paragraph(rng: np.random.Generator, vocabulary: List[str], words: int) -> str:
+    sentences = []
+    remaining = words
+    while remaining > 0:
+        length = int(min(remaining, rng.integers(8, 25)))
+        sentence = " ".join(rng.choice(vocabulary, length))
+        sentences.append(sentence[0].upper() + sentence[1:] + ".")
+        remaining -= length
+    return " ".join(sentences)
+
+
+def write_pdf(path: str, pages: List[str], line_chars: int = 90):
+    """Minimal text-only PDF (Helvetica, one content stream per page) readable by PyPDF2."""
+    def escape(text: str) -> str:
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    objects: List[bytes] = []
+    page_ids = []
+    for text in pages:
+        lines = [text[i:i + line_chars] for i in range(0, len(text), line_chars)]
+        stream = "BT /F1 9 Tf 12 TL 40 800 Td " + " ".join(f"({escape(line)}) Tj T*" for line in lines) + " ET"
+        content_id = len(objects) + 4
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream".encode('latin-1'))
+        page_ids.append(len(objects) + 4)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Contents {content_id} 0 R "
+            f"/Resources << /Font << /F1 3 0 R >> >> >>".encode('latin-1')
+        )
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    header_objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode('latin-1'),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(header_objects + objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode('latin-1') + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode('latin-1')
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode('latin-1')
+    out += f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('latin-1')
+    with open(path, 'wb') as f:
+        f.write(out)
+
+
+def generate_corpus(directory: str, num_txt: int, num_pdf: int, pages_per_pdf: int,
+                    words_per_page: int, seed: int) -> Dict[str, int]:
+    rng = np.random.default_rng(seed)
+    vocabulary = _vocabulary(rng)
+    os.makedirs(directory, exist_ok=True)
+    for i in range(num_txt):
+        paragraphs = [_paragraph(rng, vocabulary, words_per_page // 4) for _ in range(4 * pages_per_pdf)]
+        with open(os.path.join(directory, f"notes_{i:03d}.txt"), 'w', encoding='utf-8') as f:
+            f.write("\n\n".join(paragraphs))
+    for i in range(num_pdf):
+        write_pdf(os.path.join(directory, f"lecture_{i:03d}.pdf"),
+                  [_paragraph(rng, vocabulary, words_per_page) for _ in range(pages_per_pdf)])
+    total_bytes = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    return {"txt_files": num_txt, "pdf_files": num_pdf, "pages_per_pdf": pages_per_pdf,
+            "words_per_page": words_per_page, "bytes": total_bytes}
+
+
+def make_queries(directory: str, count: int, seed: int) -> List[str]:
+    """Queries built from words that occur in the corpus."""
+    rng = np.random.default_rng(seed + 1)
+    words = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".txt"):
+            with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                words.extend(f.read().split()[:2000])
+    return [" ".join(rng.choice(words, rng.integers(3, 9))) for _ in range(count)]
+
+
+# --- offline embedder -------------------------------------------------------
+
+class _HashingModel:
+    """Deterministic bag-of-hashed-words encoder with the SentenceTransformer surface we use."""
+
+    tokenizer = None
+    max_seq_length = 256
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, texts, batch_size: int = 32, **kwargs) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                digest = hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest()
+                out[i, int.from_bytes(digest[:4], 'little') % self.dim] += 1.0 if digest[4] & 1 else -1.0
+        return out
+
+
+class HashingEmbeddingsManager(EmbeddingsManager):
+    """EmbeddingsManager backed by _HashingModel, for runs without the model weights."""
+
+    def _load_model(self):
+        self._model = _HashingModel(getattr(VectorStoreConfig, 'VECTOR_SIZE', 384))
+        self._cache = None
+        self._loaded_key = (self.model_name, self.backend)
+
+
+# --- measurement ------------------------------------------------------------
+
+def peak_rss_mb() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return round(max(usage, children) * scale / 2**20, 1)
+
+
+def summarize(latencies: List[float], items: int = 0, item_name: str = "items", nbytes: int = 0) -> Dict:
+    latencies_ms = np.asarray(latencies) * 1000
+    total_s = float(np.sum(latencies))
+    result = {
+        "calls": len(latencies),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+        "mean_ms": round(float(np.mean(latencies_ms)), 3),
+        "total_s": round(total_s, 3),
+        "calls_per_s": round(len(latencies) / total_s, 2) if total_s else None,
+    }
+    if items:
+        result[f"{item_name}_per_s"] = round(items / total_s, 2) if total_s else None
+    if nbytes:
+        result["mb_per_s"] = round(nbytes / 2**20 / total_s, 3) if total_s else None
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def timed(fn: Callable, *args, **kwargs):
+    start = time.perf_counter()
+    value = fn(*args, **kwargs)
+    return time.perf_counter() - start, value
+
+
+# --- benchmarks -------------------------------------------------------------
+
+def bench_loading(corpus_dir: str, repeat: int, page_cache_path: str) -> Dict:
+    loader = DocumentLoader(corpus_dir, use_page_cache=False)
+    files = loader.list_files()
+    results = {}
+    for extension, load in ((".txt", loader.load_txt), (".pdf", loader.load_pdf)):
+        paths = [os.path.join(corpus_dir, f) for f in files if f.endswith(extension)]
+        latencies, nbytes = [], 0
+        for _ in range(repeat):
+            for path in paths:
+                elapsed, _ = timed(load, path)
+                latencies.append(elapsed)
+                nbytes += os.path.getsize(path)
+        if latencies:
+            results[f"load{extension.replace('.', '_')}"] = summarize(latencies, len(latencies), "files", nbytes)
+
+    # PDFs again with the page cache populated: the cost of re-ingesting unchanged pages
+    pdf_paths = [os.path.join(corpus_dir, f) for f in files if f.endswith(".pdf")]
+    if pdf_paths:
+        IngestConfig.PAGE_CACHE_PATH = page_cache_path
+        cached_loader = DocumentLoader(corpus_dir)
+        IngestConfig.PAGE_CACHE_PATH = None
+        for path in pdf_paths:
+            cached_loader.load_pdf(path)
+        latencies, nbytes = [], 0
+        for _ in range(repeat):
+            for path in pdf_paths:
+                elapsed, _ = timed(cached_loader.load_pdf, path)
+                latencies.append(elapsed)
+                nbytes += os.path.getsize(path)
+        results["load_pdf_cached"] = summarize(latencies, len(latencies), "files", nbytes)
+        cached_loader.page_cache.close()
+    return results
+
+
+def bench_chunking(corpus_dir: str, vector_store: VectorStore, repeat: int) -> Dict:
+    documents = DocumentLoader(corpus_dir).load_documents()
+    latencies, chunks, nbytes = [], 0, 0
+    for _ in range(repeat):
+        for document in documents:
+            elapsed, pieces = timed(vector_store.chunk_text, document)
+            latencies.append(elapsed)
+            chunks += len(pieces)
+            nbytes += len(document.encode('utf-8'))
+    return {"chunk_text": summarize(latencies, chunks, "chunks", nbytes)}
+
+
+def bench_encode(embeddings_manager: EmbeddingsManager, texts: List[str], batch_sizes: List[int]) -> Dict:
+    results = {}
+    embeddings_manager.encode(texts[:8])  # warm-up
+    for batch_size in batch_sizes:
+        latencies = []
+        for start in range(0, len(texts), batch_size):
+            elapsed, _ = timed(embeddings_manager.encode, texts[start:start + batch_size], batch_size=batch_size)
+            latencies.append(elapsed)
+        results[f"encode_batch_{batch_size}"] = summarize(latencies, len(texts), "texts")
+    return results
+
+
+def bench_update_collection(corpus_dir: str, embeddings_manager: EmbeddingsManager,
+                            vector_store: VectorStore, docs_per_call: int) -> Dict:
+    documents = DocumentLoader(corpus_dir).load_documents()
+    latencies, chunks = [], 0
+    for start in range(0, len(documents), docs_per_call):
+        group = documents[start:start + docs_per_call]
+        begin = time.perf_counter()
+        pieces = vector_store.update_collection(group, encode=embeddings_manager.encode)
+        latencies.append(time.perf_counter() - begin)
+        chunks += len(pieces)
+    return {"update_collection": summarize(latencies, chunks, "chunks")}
+
+
+def bench_ask(retriever, queries: List[str]) -> Dict:
+    retriever.ask(queries[0])  # warm-up
+    latencies = [timed(retriever.ask, query)[0] for query in queries]
+    return {"ask": summarize(latencies, len(queries), "queries")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline ingest/query benchmarks (JSON output)")
+    parser.add_argument("--txt-files", type=int, default=10)
+    parser.add_argument("--pdf-files", type=int, default=10)
+    parser.add_argument("--pages-per-pdf", type=int, default=10)
+    parser.add_argument("--words-per-page", type=int, default=400)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--batch-sizes", default="8,32,128")
+    parser.add_argument("--docs-per-update", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the corpus for load/chunk benchmarks")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--hashing-embedder", action="store_true",
+                        help="use a hashing embedder instead of the SentenceTransformer model")
+    parser.add_argument("--workdir", help="keep corpus and index here instead of a temporary directory")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = args.workdir or tmp
+        corpus_dir = os.path.join(workdir, "corpus")
+
+        # Everything the pipeline writes goes to the work directory; caches are off
+        # so every call measures real work
+        VectorStoreConfig.LOCAL_INDEX_DIR = os.path.join(workdir, "vector_index")
+        IngestConfig.MANIFEST_DIR = os.path.join(workdir, "manifests")
+        IngestConfig.PAGE_CACHE_PATH = None
+        EmbeddingsConfig.CACHE_ENABLED = False
+        AnswerCacheConfig.ENABLED = False
+
+        report = {
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "embedder": "hashing" if args.hashing_embedder else EmbeddingsConfig.DEFAULT_MODEL,
+                "n_results": RAGSystemConfig.N_RESULTS
+            }
+        }
+
+        # Pipeline progress prints go to stderr so stdout stays valid JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            report["corpus"] = generate_corpus(corpus_dir, args.txt_files, args.pdf_files, args.pages_per_pdf,
+                                               args.words_per_page, args.seed)
+            embeddings_manager = HashingEmbeddingsManager() if args.hashing_embedder else EmbeddingsManager()
+            vector_store = VectorStore()
+
+            from src.chunker import TextChunker
+            from workflows.retrive_workflow import RAGRetriever
+            vector_store.chunker = TextChunker.for_model(embeddings_manager.model)
+
+            results = {}
+            results.update(bench_loading(corpus_dir, args.repeat, os.path.join(workdir, "page_cache.sqlite")))
+            results.update(bench_chunking(corpus_dir, vector_store, args.repeat))
+            texts = [c for d in DocumentLoader(corpus_dir).load_documents() for c in vector_store.chunk_text(d)]
+            batch_sizes = [int(size) for size in args.batch_sizes.split(",") if size]
+            results.update(bench_encode(embeddings_manager, texts, batch_sizes))
+            results.update(bench_update_collection(corpus_dir, embeddings_manager, vector_store,
+                                                   args.docs_per_update))
+            retriever = RAGRetriever(vector_store=vector_store, embeddings_manager=embeddings_manager)
+            results.update(bench_ask(retriever, make_queries(corpus_dir, args.queries, args.seed)))
+
+        report["results"] = results
+        report["peak_rss_mb"] = peak_rss_mb()
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
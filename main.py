@@ -1,6 +1,12 @@
 import streamlit as st
+import asyncio
 import os
 import tempfile
+import threading
+import uuid
+from src.embeddings_manager import EmbeddingsManager
+from src.vector_store import VectorStore
+from utils.config_file import RAGSystemConfig
 from workflows.upsert_workflow import RAGSystem
 from workflows.retrive_workflow import RAGRetriever
 
@@ -8,6 +14,41 @@ def main():
     print("Hello from rag-project!")
 
 
+@st.cache_resource
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """One long-lived event loop per process for the async RAG pipeline.
+
+    Streamlit runs scripts in plain threads; a single background loop keeps
+    the async OpenAI client's connection pool bound to one loop across reruns.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+
+@st.cache_resource
+def get_retriever() -> RAGRetriever:
+    """One retriever, embedding model and vector index per process, shared by every session and rerun."""
+    retriever = RAGRetriever(vector_store=VectorStore(), embeddings_manager=EmbeddingsManager())
+    if RAGSystemConfig.WARM_UP_ON_START:
+        retriever.warm_up()
+    return retriever
+
+
+def run_async(coroutine):
+    """Run a coroutine on the background loop and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coroutine, get_event_loop()).result()
+
+
+def iter_async(async_iterator):
+    """Expose an async iterator as a regular generator for st.write_stream."""
+    while True:
+        try:
+            yield run_async(async_iterator.__anext__())
+        except StopAsyncIteration:
+            break
+
+
 if __name__ == "__main__":
     main()
     def create_streamlit_app():
@@ -39,7 +80,12 @@ if __name__ == "__main__":
                             
                             # Process documents using upsert workflow
                             try:
-                                rag_system = RAGSystem(temp_dir)
+                                retriever = get_retriever()
+                                rag_system = RAGSystem(
+                                    temp_dir,
+                                    embeddings_manager=retriever.embeddings_manager,
+                                    vector_store=retriever.vector_store
+                                )
                                 rag_system.workflow()
                                 st.success(f"Successfully processed {len(uploaded_files)} documents!")
                             except Exception as e:
@@ -53,11 +99,14 @@ if __name__ == "__main__":
         # Initialize chat history
         if "messages" not in st.session_state:
             st.session_state.messages = []
+        # Names this chat in the retriever's per-session candidate cache
+        if "session_id" not in st.session_state:
+            st.session_state.session_id = uuid.uuid4().hex
         
-        # Initialize retriever
+        # Shared retriever, built and warmed up once per process
         if "retriever" not in st.session_state:
             try:
-                st.session_state.retriever = RAGRetriever()
+                st.session_state.retriever = get_retriever()
             except Exception as e:
                 st.error(f"Error initializing retriever: {str(e)}")
                 return
@@ -69,30 +118,34 @@ if __name__ == "__main__":
         
         # Chat input
         if prompt := st.chat_input("Ask a question about your documents..."):
+            # Earlier turns, for condensing follow-ups and quoting in the prompt
+            history = list(st.session_state.messages)
             # Add user message to chat history
             st.session_state.messages.append({"role": "user", "content": prompt})
             with st.chat_message("user"):
                 st.markdown(prompt)
             
-            # Generate response using retrieve workflow
+            # Generate response using the async retrieve workflow, streaming tokens as they arrive
             with st.chat_message("assistant"):
-                with st.spinner("Thinking..."):
-                    try:
-                        result = st.session_state.retriever.ask(prompt)
-                        response = result["response"]
-                        st.markdown(response)
-                        
-                        # Show retrieved documents in an expander
-                        if result["retrieved_documents"]:
-                            with st.expander(f"📚 View {result['num_retrieved']} source documents"):
-                                for i, doc in enumerate(result["retrieved_documents"], 1):
-                                    st.markdown(f"**Document {i}** (Relevance: {doc['relevance_score']:.3f})")
-                                    st.text(doc["content"][:300] + "..." if len(doc["content"]) > 300 else doc["content"])
-                                    st.markdown("---")
-                        
-                    except Exception as e:
-                        response = f"Sorry, I encountered an error: {str(e)}"
-                        st.error(response)
+                try:
+                    retriever = st.session_state.retriever
+                    with st.spinner("Searching documents..."):
+                        retrieved_docs = run_async(retriever.aretrieve_in_session(
+                            prompt, history, st.session_state.session_id, retriever.n_results
+                        ))
+                    response = st.write_stream(iter_async(retriever.astream_answer(prompt, retrieved_docs, history)))
+                    
+                    # Show retrieved documents in an expander
+                    if retrieved_docs:
+                        with st.expander(f"📚 View {len(retrieved_docs)} source documents"):
+                            for i, doc in enumerate(retrieved_docs, 1):
+                                st.markdown(f"**Document {i}** (Relevance: {doc['relevance_score']:.3f})")
+                                st.text(doc["content"][:300] + "..." if len(doc["content"]) > 300 else doc["content"])
+                                st.markdown("---")
+                    
+                except Exception as e:
+                    response = f"Sorry, I encountered an error: {str(e)}"
+                    st.error(response)
             
             # Add assistant response to chat history
             st.session_state.messages.append({"role": "assistant", "content": response})
@@ -0,0 +1,667 @@
+import logging
+import os
+import time
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_METRICS = ("cosine", "l2", "ip")
+QUANTIZATIONS = ("none", "int8", "binary")
+
+
+class FlatIndex:
+    """Exact (brute-force) index over a growable float32 matrix.
+
+    Distances follow ChromaDB's conventions so results are interchangeable
+    between backends: ``cosine`` is ``1 - cos``, ``ip`` is ``1 - dot`` and
+    ``l2`` is the squared euclidean distance.
+
+    Saved files are preallocated with spare rows: the caller keeps the
+    live row count (``load`` takes it), so a save after appends only
+    writes the new rows into the spare capacity, and the whole file is
+    rewritten only when saved rows changed or the capacity runs out.
+    """
+
+    index_type = "flat"
+
+    def __init__(self, dim: int, metric: str = "cosine"):
+        if metric not in SUPPORTED_METRICS:
+            raise ValueError(f"Unsupported distance metric '{metric}', expected one of {SUPPORTED_METRICS}")
+        self.dim = dim
+        self.metric = metric
+        self._vectors: Optional[np.ndarray] = None
+        self._sq_norms: Optional[np.ndarray] = None
+        self._size = 0
+        self._saved_rows: Dict[str, int] = {}  # file -> rows it held at the last save or load
+        self._unchanged_rows = 0  # leading rows not modified since then
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Live rows of the matrix (without spare capacity)."""
+        if self._vectors is None:
+            return np.empty((0, self.dim), dtype=np.float32)
+        return self._vectors[:self._size]
+
+    def _prepare(self, vectors: np.ndarray) -> np.ndarray:
+        """Validate shape and apply the metric's normalisation."""
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dim}")
+        if self.metric == "cosine":
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            vectors = vectors / norms
+        return vectors
+
+    def _reserve(self, extra: int):
+        """Make room for ``extra`` more rows, growing geometrically."""
+        needed = self._size + extra
+        if self._vectors is not None:
+            if self._vectors.flags.writeable and self._vectors.shape[0] >= needed:
+                return
+            capacity = max(needed, 2 * self._vectors.shape[0])
+        else:
+            capacity = max(needed, 1024)
+
+        grown = np.empty((capacity, self.dim), dtype=np.float32)
+        if self._size:
+            grown[:self._size] = self._vectors[:self._size]
+        self._vectors = grown
+        if self.metric == "l2":
+            norms = np.empty(capacity, dtype=np.float32)
+            if self._size:
+                norms[:self._size] = self._sq_norms[:self._size]
+            self._sq_norms = norms
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        """Append vectors and return the rows they were stored at."""
+        vectors = self._prepare(vectors)
+        self._reserve(len(vectors))
+        rows = np.arange(self._size, self._size + len(vectors))
+        self._vectors[rows] = vectors
+        if self.metric == "l2":
+            self._sq_norms[rows] = np.einsum('ij,ij->i', vectors, vectors)
+        self._size += len(vectors)
+        return rows
+
+    def update(self, rows: np.ndarray, vectors: np.ndarray):
+        """Overwrite the vectors stored at ``rows``."""
+        vectors = self._prepare(vectors)
+        self._reserve(0)
+        self._vectors[rows] = vectors
+        self._mark_changed(rows)
+        if self.metric == "l2":
+            self._sq_norms[rows] = np.einsum('ij,ij->i', vectors, vectors)
+
+    def remove(self, rows: np.ndarray) -> np.ndarray:
+        """Drop ``rows`` and compact the matrix; returns the boolean keep-mask."""
+        keep = np.ones(self._size, dtype=bool)
+        keep[np.asarray(rows, dtype=np.int64)] = False
+        self._mark_changed(rows)
+        self._vectors = np.ascontiguousarray(self.vectors[keep])
+        if self.metric == "l2":
+            self._sq_norms = self._sq_norms[:self._size][keep]
+        self._size = int(keep.sum())
+        return keep
+
+    def _distances(self, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Distances from prepared queries to all rows, or to the given subset."""
+        vectors = self.vectors if rows is None else self._vectors[rows]
+        dots = queries @ vectors.T
+        if self.metric == "l2":
+            sq_norms = self._sq_norms[:self._size] if rows is None else self._sq_norms[rows]
+            q_norms = np.einsum('ij,ij->i', queries, queries)[:, None]
+            return np.maximum(q_norms - 2 * dots + sq_norms, 0.0)
+        return 1.0 - dots
+
+    @staticmethod
+    def _top_k(distances: np.ndarray, k: int) -> np.ndarray:
+        """Positions of the ``k`` smallest distances, sorted ascending."""
+        if k < len(distances):
+            top = np.argpartition(distances, k - 1)[:k]
+        else:
+            top = np.arange(len(distances))
+        return top[np.argsort(distances[top], kind='stable')]
+
+    def exact_search(self, queries: np.ndarray, k: int, max_block_elements: int = 1 << 25,
+                     subset: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Brute-force top-k; returns ``(distances, rows)`` of shape ``(m, k')``.
+
+        Queries are scored in blocks so the distance matrix never exceeds
+        ``max_block_elements`` floats, however many queries are batched.
+        With ``subset`` (sorted rows, e.g. from a metadata filter) only those
+        rows are scored.
+        """
+        queries = self._prepare(queries)
+        size = self._size if subset is None else len(subset)
+        k = min(k, size)
+        if k == 0:
+            empty = np.empty((len(queries), 0))
+            return empty.astype(np.float32), empty.astype(np.int64)
+
+        block = max(1, max_block_elements // max(size, 1))
+        all_distances = np.empty((len(queries), k), dtype=np.float32)
+        all_rows = np.empty((len(queries), k), dtype=np.int64)
+        for start in range(0, len(queries), block):
+            distances = self._distances(queries[start:start + block], subset)
+            if k < size:
+                rows = np.argpartition(distances, k - 1, axis=1)[:, :k]
+            else:
+                rows = np.broadcast_to(np.arange(size), distances.shape)
+            top = np.take_along_axis(distances, rows, axis=1)
+            order = np.argsort(top, axis=1, kind='stable')
+            rows = np.take_along_axis(rows, order, axis=1)
+            all_rows[start:start + block] = rows if subset is None else subset[rows]
+            all_distances[start:start + block] = np.take_along_axis(top, order, axis=1)
+        return all_distances, all_rows
+
+    def search(self, queries: np.ndarray, k: int,
+               subset: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k search, restricted to ``subset`` rows when given; ``(distances, rows)`` of shape ``(m, k')``."""
+        return self.exact_search(queries, k, subset=subset)
+
+    def _mark_changed(self, rows: np.ndarray):
+        """Note that ``rows`` (and, after a remove, every row behind them) differ from the saved files."""
+        if len(rows):
+            self._unchanged_rows = min(self._unchanged_rows, int(np.min(rows)))
+
+    def _row_files(self) -> Dict[str, np.ndarray]:
+        """Suffix -> per-row array saved under the index prefix."""
+        return {".npy": self.vectors}
+
+    def _save_rows(self, path: str, rows: np.ndarray):
+        """Bring ``path`` in line with ``rows``, appending in place when only new rows were added.
+
+        Appended rows lie past the live row count the caller has recorded,
+        so a crash part way leaves them ignored. Anything else is a rewrite
+        into a temporary file with room to double, swapped in atomically.
+        """
+        saved = self._saved_rows.get(path)
+        if saved is not None and self._unchanged_rows >= saved and os.path.exists(path):
+            out = np.load(path, mmap_mode='r+')
+            if out.dtype == rows.dtype and out.shape[1:] == rows.shape[1:] and out.shape[0] >= len(rows):
+                if len(rows) > saved:
+                    out[saved:len(rows)] = rows[saved:]
+                    out.flush()
+                self._saved_rows[path] = len(rows)
+                return
+            del out
+
+        tmp = path[:-len(".npy")] + ".tmp.npy"
+        capacity = max(2 * len(rows), 1024)
+        out = np.lib.format.open_memmap(tmp, mode='w+', dtype=rows.dtype, shape=(capacity,) + rows.shape[1:])
+        out[:len(rows)] = rows
+        out.flush()
+        del out
+        os.replace(tmp, path)
+        self._saved_rows[path] = len(rows)
+
+    def save(self, prefix: str):
+        """Write the per-row files (``<prefix>.npy`` for the matrix), appending where possible."""
+        for suffix, rows in self._row_files().items():
+            self._save_rows(prefix + suffix, rows)
+        self._unchanged_rows = self._size
+
+    def write_file(self, prefix: str, blocks: Iterable[np.ndarray], size: int):
+        """Stream ``size`` vectors into ``<prefix>.npy`` block by block, without holding them in RAM.
+
+        ``load`` then memory-maps the file like any saved index.
+        """
+        tmp = prefix + ".tmp.npy"
+        out = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.float32, shape=(size, self.dim)) \
+            if size else None
+        start = 0
+        for block in blocks:
+            block = self._prepare(block) if len(block) else block
+            if start + len(block) > size:
+                raise ValueError(f"More than {size} vectors written to {prefix}.npy")
+            out[start:start + len(block)] = block
+            start += len(block)
+        if start != size:
+            raise ValueError(f"Expected {size} vectors for {prefix}.npy, got {start}")
+        if out is None:
+            np.save(tmp, np.empty((0, self.dim), dtype=np.float32))
+        else:
+            out.flush()
+            del out
+        os.replace(tmp, prefix + ".npy")
+
+    def load(self, prefix: str, size: int):
+        """Memory-map the first ``size`` rows of ``<prefix>.npy``; they are copied into RAM only on the next write."""
+        self._size = size
+        self._saved_rows = {}
+        self._unchanged_rows = size
+        if size == 0:
+            return
+        vectors = np.load(prefix + ".npy", mmap_mode='r')
+        if vectors.ndim != 2 or vectors.shape[0] < size or vectors.shape[1] != self.dim:
+            raise ValueError(f"Index file {prefix}.npy has shape {vectors.shape}, expected at least {(size, self.dim)}")
+        self._vectors = vectors[:size]
+        self._saved_rows[prefix + ".npy"] = size
+        if self.metric == "l2":
+            self._sq_norms = np.einsum('ij,ij->i', self._vectors, self._vectors)
+
+    def info(self) -> Dict[str, Union[str, int]]:
+        return {"index_type": self.index_type, "metric": self.metric, "dimension": self.dim, "size": self._size}
+
+
+class IVFIndex(FlatIndex):
+    """Inverted-file ANN index: k-means coarse quantiser plus per-list scans.
+
+    Until ``min_train_size`` vectors are stored the index answers exactly.
+    Once trained, new vectors are assigned to their nearest centroid on
+    insert, and the quantiser is retrained whenever the index has grown
+    ``retrain_factor`` times since the last training. ``nprobe`` trades
+    recall for latency at query time.
+    """
+
+    index_type = "ivf"
+
+    def __init__(self, dim: int, metric: str = "cosine", nlist: int = 0, nprobe: int = 8,
+                 min_train_size: int = 10000, retrain_factor: float = 4.0, seed: int = 0):
+        super().__init__(dim, metric)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.retrain_factor = retrain_factor
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self._assignments = np.empty(0, dtype=np.int32)
+        self._trained_size = 0
+        self._list_order: Optional[np.ndarray] = None
+        self._list_offsets: Optional[np.ndarray] = None
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def _centroid_distances(self, vectors: np.ndarray) -> np.ndarray:
+        dots = vectors @ self.centroids.T
+        if self.metric == "l2":
+            c_norms = np.einsum('ij,ij->i', self.centroids, self.centroids)
+            return c_norms - 2 * dots
+        return -dots
+
+    def _assign(self, vectors: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+        assignments = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), batch_size):
+            batch = np.asarray(vectors[start:start + batch_size])
+            assignments[start:start + batch_size] = self._centroid_distances(batch).argmin(axis=1)
+        return assignments
+
+    def train(self, iterations: int = 10):
+        """Fit the coarse quantiser on a sample of the stored vectors and reassign every row."""
+        n = self._size
+        nlist = self.nlist or int(4 * np.sqrt(n))
+        nlist = max(1, min(nlist, n))
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(n, nlist * 64)
+        sample = np.asarray(self.vectors[np.sort(rng.choice(n, sample_size, replace=False))])
+
+        self.centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = self._centroid_distances(sample).argmin(axis=1)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+            filled = counts > 0
+            self.centroids[filled] = sums[filled] / counts[filled, None]
+            if self.metric != "l2":
+                norms = np.linalg.norm(self.centroids, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                self.centroids /= norms
+
+        self._assignments = self._assign(self.vectors)
+        self._trained_size = n
+        self._list_order = None
+        self._unchanged_rows = 0  # every row's assignment may have moved
+        logger.info("Trained IVF index: %d lists over %d vectors", nlist, n)
+
+    def _maybe_train(self):
+        if not self.is_trained:
+            if self._size >= self.min_train_size:
+                self.train()
+        elif self._size >= self.retrain_factor * self._trained_size:
+            self.train()
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        rows = super().add(vectors)
+        if self.is_trained:
+            self._assignments = np.concatenate([self._assignments, self._assign(self._vectors[rows])])
+            self._list_order = None
+        self._maybe_train()
+        return rows
+
+    def update(self, rows: np.ndarray, vectors: np.ndarray):
+        super().update(rows, vectors)
+        if self.is_trained:
+            self._assignments[rows] = self._assign(self._vectors[rows])
+            self._list_order = None
+
+    def remove(self, rows: np.ndarray) -> np.ndarray:
+        keep = super().remove(rows)
+        if self.is_trained:
+            self._assignments = self._assignments[keep]
+            self._list_order = None
+        return keep
+
+    def _lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        """CSR view of the inverted lists, rebuilt lazily after writes."""
+        if self._list_order is None:
+            self._list_order = np.argsort(self._assignments, kind='stable')
+            counts = np.bincount(self._assignments, minlength=len(self.centroids))
+            self._list_offsets = np.concatenate([[0], np.cumsum(counts)])
+        return self._list_order, self._list_offsets
+
+    def search(self, queries: np.ndarray, k: int, nprobe: Optional[int] = None,
+               subset: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        if not self.is_trained:
+            return self.exact_search(queries, k, subset=subset)
+
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        # A filter that keeps fewer rows than the probed lists hold on average is
+        # cheaper (and exact) to scan directly, and probing it would return too few hits
+        if subset is not None and len(subset) <= self._size * nprobe / len(self.centroids):
+            return self.exact_search(queries, k, subset=subset)
+
+        queries = self._prepare(queries)
+        allowed = None
+        if subset is not None:
+            allowed = np.zeros(self._size, dtype=bool)
+            allowed[subset] = True
+        order, offsets = self._lists()
+        probes = np.argpartition(self._centroid_distances(queries), nprobe - 1, axis=1)[:, :nprobe]
+
+        # Rows of -1 (distance inf) mark slots a query could not fill
+        all_distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        all_rows = np.full((len(queries), k), -1, dtype=np.int64)
+        for i, query in enumerate(queries):
+            candidates = np.concatenate([order[offsets[c]:offsets[c + 1]] for c in probes[i]])
+            if allowed is not None:
+                candidates = candidates[allowed[candidates]]
+            if len(candidates) == 0:
+                continue
+            distances = self._distances(query[None, :], candidates)[0]
+            top = self._top_k(distances, min(k, len(candidates)))
+            all_distances[i, :len(top)] = distances[top]
+            all_rows[i, :len(top)] = candidates[top]
+        return all_distances, all_rows
+
+    def _row_files(self) -> Dict[str, np.ndarray]:
+        files = super()._row_files()
+        if self.is_trained:
+            files[".assignments.npy"] = self._assignments[:self._size]
+        return files
+
+    def save(self, prefix: str):
+        super().save(prefix)
+        if self.is_trained:
+            # The centroids are small; the per-row assignments are appended with the vectors
+            tmp = prefix + ".ivf.tmp.npz"
+            np.savez(tmp, centroids=self.centroids, trained_size=np.array([self._trained_size]))
+            os.replace(tmp, prefix + ".ivf.npz")
+        else:
+            for suffix in (".ivf.npz", ".assignments.npy"):
+                if os.path.exists(prefix + suffix):
+                    os.remove(prefix + suffix)
+
+    def load(self, prefix: str, size: int):
+        super().load(prefix, size)
+        path, assignments_path = prefix + ".ivf.npz", prefix + ".assignments.npy"
+        if os.path.exists(path):
+            with np.load(path) as data:
+                self.centroids = data["centroids"]
+                self._trained_size = int(data["trained_size"][0])
+                # Older saves kept the assignments inside the npz
+                assignments = data["assignments"] if "assignments" in data else None
+            in_file = os.path.exists(assignments_path)
+            if in_file:
+                assignments = np.load(assignments_path, mmap_mode='r')
+            if assignments is not None and len(assignments) >= size:
+                self._assignments = np.array(assignments[:size])
+                if in_file:
+                    self._saved_rows[assignments_path] = size
+            else:
+                # Sidecar from an older save; recompute rather than trust it
+                self._assignments = self._assign(self.vectors)
+        else:
+            self._maybe_train()
+
+    def info(self):
+        info = super().info()
+        info.update({
+            "nlist": len(self.centroids) if self.is_trained else 0,
+            "nprobe": self.nprobe,
+            "trained": self.is_trained
+        })
+        return info
+
+
+def _popcount(codes: np.ndarray) -> np.ndarray:
+    """Set bits per element of an unsigned integer array."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(codes)
+    table = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    return table[codes.view(np.uint8)].reshape(*codes.shape, -1).sum(axis=-1)
+
+
+class QuantizedIndex(FlatIndex):
+    """Exact index whose first pass scans compressed codes, then rescores in float32.
+
+    ``int8`` stores one byte per dimension plus a per-vector scale, and
+    ``binary`` keeps only the sign bits
+    (``dim / 8`` bytes) and ranks by Hamming distance. For every query the
+    ``k * rescore_factor`` best candidates by code are rescored against the
+    full-precision vectors, which stay memory-mapped on disk after a reload,
+    so only the codes need to be resident.
+    """
+
+    def __init__(self, dim: int, metric: str = "cosine", quantization: str = "int8", rescore_factor: int = 4):
+        super().__init__(dim, metric)
+        if quantization not in QUANTIZATIONS or quantization == "none":
+            raise ValueError(f"Unsupported quantization '{quantization}', expected one of {QUANTIZATIONS[1:]}")
+        self.quantization = quantization
+        self.rescore_factor = max(1, rescore_factor)
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+
+    @property
+    def bytes_per_vector(self) -> int:
+        if self.quantization == "binary":
+            return (self.dim + 7) // 8
+        return self.dim + 4
+
+    def _encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Codes (and int8 scales) for already prepared vectors."""
+        if self.quantization == "binary":
+            return np.packbits(vectors > 0, axis=1), None
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def _store_codes(self, rows: np.ndarray, vectors: np.ndarray):
+        codes, scales = self._encode(vectors)
+        needed = int(rows.max()) + 1 if len(rows) else 0
+        if self._codes is None or self._codes.shape[0] < needed:
+            capacity = max(needed, 2 * (0 if self._codes is None else self._codes.shape[0]), 1024)
+            grown = np.empty((capacity, codes.shape[1]), dtype=codes.dtype)
+            if self._codes is not None:
+                grown[:len(self._codes)] = self._codes
+            self._codes = grown
+            if scales is not None:
+                grown_scales = np.empty(capacity, dtype=np.float32)
+                if self._scales is not None:
+                    grown_scales[:len(self._scales)] = self._scales
+                self._scales = grown_scales
+        self._codes[rows] = codes
+        if scales is not None:
+            self._scales[rows] = scales
+
+    def _encode_all(self, block: int = 65536):
+        """Rebuild codes from the stored vectors, streaming through the memory map."""
+        self._codes, self._scales = None, None
+        for start in range(0, self._size, block):
+            rows = np.arange(start, min(start + block, self._size))
+            self._store_codes(rows, np.asarray(self._vectors[rows]))
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        rows = super().add(vectors)
+        self._store_codes(rows, self._vectors[rows])
+        return rows
+
+    def update(self, rows: np.ndarray, vectors: np.ndarray):
+        super().update(rows, vectors)
+        self._store_codes(np.asarray(rows), self._vectors[rows])
+
+    def remove(self, rows: np.ndarray) -> np.ndarray:
+        size = self._size
+        keep = super().remove(rows)
+        self._codes = np.ascontiguousarray(self._codes[:size][keep])
+        if self._scales is not None:
+            self._scales = self._scales[:size][keep]
+        return keep
+
+    def _approx_distances(self, queries: np.ndarray, selection) -> np.ndarray:
+        """First-pass distances from prepared queries to the ``selection`` rows (a slice or row array) using codes only."""
+        codes = self._codes[selection]
+        if self.quantization == "binary":
+            query_bits = np.packbits(queries > 0, axis=1)
+            if codes.shape[1] % 8 == 0:
+                # Popcount over 64-bit words
+                query_bits, codes = query_bits.view(np.uint64), np.ascontiguousarray(codes).view(np.uint64)
+            return _popcount(query_bits[:, None, :] ^ codes[None, :, :]).sum(axis=2, dtype=np.float32)
+
+        # Decode a few thousand rows at a time so the float32 copy stays in cache
+        dots = np.empty((len(queries), len(codes)), dtype=np.float32)
+        step = max(1, (1 << 18) // self.dim)
+        for offset in range(0, len(codes), step):
+            dots[:, offset:offset + step] = queries @ codes[offset:offset + step].astype(np.float32).T
+        dots *= self._scales[selection]
+        if self.metric == "l2":
+            q_norms = np.einsum('ij,ij->i', queries, queries)[:, None]
+            return q_norms - 2 * dots + self._sq_norms[selection]
+        return 1.0 - dots
+
+    def search(self, queries: np.ndarray, k: int, rescore_factor: Optional[int] = None,
+               subset: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Two-pass search: top ``k * rescore_factor`` by code, then exact rescoring.
+
+        With ``subset`` only those rows' codes are scanned.
+        """
+        size = self._size if subset is None else len(subset)
+        candidates_per_query = min(size, k * (rescore_factor or self.rescore_factor))
+        if candidates_per_query >= size:
+            return self.exact_search(queries, k, subset=subset)
+
+        queries = self._prepare(queries)
+        # Bound the first pass's (queries x rows) temporaries, as exact_search does
+        row_block = max(1, (1 << 25) // (len(queries) * (self._codes.shape[1] if self.quantization == "binary" else 1)))
+        shortlist = np.empty((len(queries), 0), dtype=np.int64)
+        shortlist_distances = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, size, row_block):
+            stop = min(start + row_block, size)
+            block_rows = np.arange(start, stop) if subset is None else subset[start:stop]
+            selection = slice(start, stop) if subset is None else block_rows
+            distances = np.concatenate([shortlist_distances, self._approx_distances(queries, selection)], axis=1)
+            rows = np.concatenate([shortlist, np.broadcast_to(block_rows, (len(queries), stop - start))], axis=1)
+            keep = np.argpartition(distances, candidates_per_query - 1, axis=1)[:, :candidates_per_query] \
+                if distances.shape[1] > candidates_per_query else np.broadcast_to(
+                    np.arange(distances.shape[1]), distances.shape)
+            shortlist = np.take_along_axis(rows, keep, axis=1)
+            shortlist_distances = np.take_along_axis(distances, keep, axis=1)
+
+        k = min(k, size)
+        all_distances = np.empty((len(queries), k), dtype=np.float32)
+        all_rows = np.empty((len(queries), k), dtype=np.int64)
+        for i, query in enumerate(queries):
+            candidates = np.sort(shortlist[i])  # sorted rows read the memory map sequentially
+            distances = self._distances(query[None, :], candidates)[0]
+            top = self._top_k(distances, k)
+            all_distances[i] = distances[top]
+            all_rows[i] = candidates[top]
+        return all_distances, all_rows
+
+    def _row_files(self) -> Dict[str, np.ndarray]:
+        files = super()._row_files()
+        files[".codes.npy"] = self._codes[:self._size] if self._codes is not None \
+            else np.empty((0, 0), dtype=np.uint8)
+        if self._scales is not None:
+            files[".scales.npy"] = self._scales[:self._size]
+        return files
+
+    def load(self, prefix: str, size: int):
+        super().load(prefix, size)
+        if size == 0:
+            return
+        expected, _ = self._encode(np.zeros((1, self.dim), dtype=np.float32))
+        codes_path, scales_path = prefix + ".codes.npy", prefix + ".scales.npy"
+        needs_scales = self.quantization == "int8"
+        if os.path.exists(codes_path) and (os.path.exists(scales_path) or not needs_scales):
+            codes = np.load(codes_path, mmap_mode='r')
+            scales = np.load(scales_path, mmap_mode='r') if needs_scales else None
+            if codes.dtype == expected.dtype and codes.ndim == 2 and codes.shape[0] >= size \
+                    and codes.shape[1] == expected.shape[1] and (scales is None or scales.shape[0] >= size):
+                # Codes stay resident; only the float32 vectors are left memory-mapped
+                self._codes = np.array(codes[:size])
+                self._scales = np.array(scales[:size]) if scales is not None else None
+                self._saved_rows[codes_path] = size
+                if scales is not None:
+                    self._saved_rows[scales_path] = size
+                return
+        # Codes or scales missing, or written for another quantization or size: re-encode
+        self._encode_all()
+
+    def info(self):
+        info = super().info()
+        info.update({
+            "quantization": self.quantization,
+            "rescore_factor": self.rescore_factor,
+            "bytes_per_vector": self.bytes_per_vector
+        })
+        return info
+
+
+def create_index(index_type: str, dim: int, metric: str, **options) -> FlatIndex:
+    """Build an empty index of the requested type."""
+    quantization = options.pop("quantization", "none")
+    rescore_factor = options.pop("rescore_factor", 4)
+    if index_type == "flat":
+        if quantization != "none":
+            return QuantizedIndex(dim, metric, quantization, rescore_factor)
+        return FlatIndex(dim, metric)
+    if index_type == "ivf":
+        if quantization != "none":
+            raise ValueError("Quantization is only supported with INDEX_TYPE='flat'")
+        return IVFIndex(dim, metric, **options)
+    raise ValueError(f"Unknown index type: {index_type}")
+
+
+def recall_report(index: FlatIndex, queries: np.ndarray, k: int = 10, **search_options) -> Dict[str, float]:
+    """Measure recall@k of ``index.search`` against exact search on the same vectors."""
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+
+    start = time.perf_counter()
+    _, approx_rows = index.search(queries, k, **search_options)
+    approx_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    _, exact_rows = index.exact_search(queries, k)
+    exact_ms = (time.perf_counter() - start) * 1000
+
+    hits = sum(len(set(a[a >= 0].tolist()) & set(e.tolist())) for a, e in zip(approx_rows, exact_rows))
+    expected = exact_rows.size
+    return {
+        "k": k,
+        "num_queries": len(queries),
+        "recall_at_k": hits / expected if expected else 1.0,
+        "approx_ms_per_query": approx_ms / max(len(queries), 1),
+        "exact_ms_per_query": exact_ms / max(len(queries), 1),
+        **{key: value for key, value in index.info().items()
+           if key in ("index_type", "nlist", "nprobe", "size", "quantization", "bytes_per_vector")}
+    }
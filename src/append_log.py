@@ -0,0 +1,63 @@
+import json
+import os
+from typing import Any, Dict, List
+
+
+class AppendLog:
+    """JSON-lines journal of the changes made since a snapshot was written.
+
+    The first line names the snapshot ``generation`` the journal extends;
+    a journal left over from an older snapshot is ignored. Each later line
+    is one entry whose ``ids`` list counts towards ``records``, which the
+    owner compares with its size to decide when to compact (rewrite the
+    snapshot and ``reset`` the journal). Appends are single fsynced writes,
+    and a line torn by a crash mid-append is cut off on ``read``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.records = 0  # ids in the journal's entries
+
+    def read(self, generation: Any) -> List[Dict[str, Any]]:
+        """Entries journalled on top of snapshot ``generation``."""
+        self.records = 0
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            # A crash mid-append left a torn last line: cut it off, or the next append would extend it
+            with open(self.path, 'r+b') as f:
+                f.truncate(complete)
+                f.flush()
+                os.fsync(f.fileno())
+        lines = data[:complete].decode('utf-8').splitlines()
+        if not lines or json.loads(lines[0]).get("generation") != generation:
+            return []  # left over from before the snapshot was rewritten
+        entries = [json.loads(line) for line in lines[1:]]
+        self.records = sum(len(entry["ids"]) for entry in entries)
+        return entries
+
+    def append(self, generation: Any, entries: List[Dict[str, Any]]):
+        """Journal ``entries`` on top of snapshot ``generation`` in one write."""
+        if not entries:
+            return
+        lines = []
+        if self.records == 0 or not os.path.exists(self.path):
+            # Start a journal for the current snapshot, replacing any stale one
+            self.reset()
+            lines.append(json.dumps({"generation": generation}))
+        # json.dumps uses the C encoder; json.dump to a file falls back to the pure-Python one
+        lines.extend(json.dumps(entry) for entry in entries)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.records += sum(len(entry["ids"]) for entry in entries)
+
+    def reset(self):
+        """Drop the journal, once its entries are part of a new snapshot."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.records = 0
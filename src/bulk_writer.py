@@ -0,0 +1,259 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+import numpy as np
+
+from src.vector_backends import Metadata, VectorBackend
+from utils.config_file import BulkWriteConfig
+
+# HTTP statuses of transient failures: timeouts, rate limits and 5xx responses
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+# HTTP status of a request rejected for its size or record count
+TOO_LARGE_STATUS = frozenset({413})
+# Client-library exception classes, matched by name so none of the libraries is imported:
+# httpx / requests transport errors and ChromaDB's rate limit
+_RETRYABLE_TYPES = frozenset({"TimeoutException", "NetworkError", "RemoteProtocolError", "Timeout",
+                              "ReadTimeout", "ConnectTimeout", "RateLimitError"})
+# ChromaDB's per-request record limit
+_TOO_LARGE_TYPES = frozenset({"BatchSizeExceededError"})
+
+
+def status_code(error: Exception) -> Optional[int]:
+    """HTTP status carried by a client exception (``status_code``, ``status``, ``response`` or ChromaDB's ``code()``)."""
+    for candidate in (getattr(error, "status_code", None), getattr(error, "status", None),
+                      getattr(getattr(error, "response", None), "status_code", None)):
+        if isinstance(candidate, int) and not isinstance(candidate, bool):
+            return candidate
+    code = getattr(error, "code", None)
+    if callable(code):
+        try:
+            code = code()
+        except Exception:
+            return None
+        if isinstance(code, int) and not isinstance(code, bool):
+            return code
+    return None
+
+
+def _type_names(error: Exception) -> Set[str]:
+    return {cls.__name__ for cls in type(error).__mro__}
+
+
+def is_retryable(error: Exception) -> bool:
+    """Transient failures: timeouts, dropped connections, rate limits and 5xx responses.
+
+    Decided by exception type and HTTP status, never by message text, so a
+    plan quota (ChromaDB's ``QuotaError``, HTTP 400) fails at once.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)) and not isinstance(error, BulkWriteError):
+        return True
+    if _type_names(error) & _RETRYABLE_TYPES:
+        return True
+    return status_code(error) in RETRYABLE_STATUS
+
+
+def is_too_large(error: Exception) -> bool:
+    """A request rejected for its size (HTTP 413 or ChromaDB's batch size error), which splitting can fix."""
+    return bool(_type_names(error) & _TOO_LARGE_TYPES) or status_code(error) in TOO_LARGE_STATUS
+
+
+class BulkWriteError(ConnectionError):
+    """A batch failed for good; ``committed`` lists the ids that were written before that."""
+
+    def __init__(self, message: str, committed: List[str]):
+        super().__init__(message)
+        self.committed = committed
+
+
+class BulkWriter:
+    """Upserts large chunk sets with bounded concurrency, retries and adaptive batches.
+
+    Batches are packed up to the backend's ``max_batch_size`` and a payload
+    byte limit. Up to ``concurrency`` batches are in flight at once
+    (backends with ``max_concurrency`` cap this). Transient errors are
+    retried with exponential backoff and full jitter. A batch rejected as
+    too large is split in half and the limit is lowered for the rest of
+    the run; batches of ``min_split_size`` records or fewer are not split
+    further and fail instead. Upserts are keyed by content-hash ids, so a retried or resumed
+    batch never creates duplicates; duplicate ids within one call are sent
+    once.
+    """
+
+    def __init__(self, backend: VectorBackend, concurrency: Optional[int] = None,
+                 max_batch_bytes: Optional[int] = None, max_retries: Optional[int] = None,
+                 backoff_base: Optional[float] = None, backoff_max: Optional[float] = None,
+                 min_split_size: Optional[int] = None, sleep: Callable[[float], None] = time.sleep):
+        self.backend = backend
+        concurrency = concurrency or getattr(BulkWriteConfig, 'CONCURRENCY', 4)
+        if backend.max_concurrency:
+            concurrency = min(concurrency, backend.max_concurrency)
+        self.concurrency = max(1, concurrency)
+        limits = [limit for limit in (max_batch_bytes or getattr(BulkWriteConfig, 'MAX_BATCH_BYTES', None),
+                                      backend.max_batch_bytes) if limit]
+        self.max_batch_bytes: Optional[int] = min(limits) if limits else None
+        self.max_batch_size: Optional[int] = backend.max_batch_size
+        self.max_retries = max_retries if max_retries is not None else getattr(BulkWriteConfig, 'MAX_RETRIES', 5)
+        self.backoff_base = backoff_base if backoff_base is not None else \
+            getattr(BulkWriteConfig, 'BACKOFF_BASE_SECONDS', 0.5)
+        self.backoff_max = backoff_max if backoff_max is not None else \
+            getattr(BulkWriteConfig, 'BACKOFF_MAX_SECONDS', 30.0)
+        self.min_split_size = max(1, min_split_size if min_split_size is not None else
+                                  getattr(BulkWriteConfig, 'MIN_SPLIT_SIZE', 4))
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"batches": 0, "retries": 0, "splits": 0, "written": 0}
+
+    def _count(self, key: str, value: int = 1):
+        with self._lock:
+            self.stats[key] += value
+
+    def _payload_bytes(self, chunk_id: str, document: str, metadata: Metadata, dim: int) -> int:
+        return (len(chunk_id) + len(document.encode('utf-8')) + len(json.dumps(metadata))
+                + dim * self.backend.embedding_bytes_per_dim)
+
+    def _batches(self, ids: List[str], documents: List[str], metadatas: List[Metadata],
+                 dim: int) -> Iterator[List[int]]:
+        """Positions packed greedily under the current count and byte limits."""
+        batch: List[int] = []
+        batch_bytes = 0
+        for position in range(len(ids)):
+            size = self._payload_bytes(ids[position], documents[position], metadatas[position], dim)
+            full = self.max_batch_size is not None and len(batch) >= self.max_batch_size
+            too_big = self.max_batch_bytes is not None and batch_bytes + size > self.max_batch_bytes
+            if batch and (full or too_big):
+                yield batch
+                batch, batch_bytes = [], 0
+            batch.append(position)
+            batch_bytes += size
+        if batch:
+            yield batch
+
+    def _send(self, positions: List[int], ids: List[str], embeddings: np.ndarray,
+              documents: List[str], metadatas: List[Metadata]) -> List[str]:
+        attempt = 0
+        while True:
+            try:
+                self.backend.upsert(
+                    ids=[ids[p] for p in positions],
+                    embeddings=embeddings[positions],
+                    documents=[documents[p] for p in positions],
+                    metadatas=[metadatas[p] for p in positions]
+                )
+                self._count("batches")
+                self._count("written", len(positions))
+                return [ids[p] for p in positions]
+            except Exception as e:
+                if len(positions) > self.min_split_size and is_too_large(e):
+                    half = len(positions) // 2
+                    with self._lock:
+                        self.max_batch_size = max(self.min_split_size,
+                                                  min(self.max_batch_size or len(positions), half))
+                        self.stats["splits"] += 1
+                    return (self._send(positions[:half], ids, embeddings, documents, metadatas)
+                            + self._send(positions[half:], ids, embeddings, documents, metadatas))
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                self._count("retries")
+                self.sleep(random.uniform(0, delay))
+                attempt += 1
+
+    def write(self, ids: List[str], embeddings: np.ndarray, documents: List[str],
+              metadatas: List[Metadata]) -> List[str]:
+        """Upsert every record; returns the written ids, or raises BulkWriteError."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        # Last occurrence wins, as it would for sequential upserts
+        last = {chunk_id: position for position, chunk_id in enumerate(ids)}
+        if len(last) < len(ids):
+            keep = sorted(last.values())
+            ids = [ids[p] for p in keep]
+            documents = [documents[p] for p in keep]
+            metadatas = [metadatas[p] for p in keep]
+            embeddings = embeddings[keep]
+
+        dim = embeddings.shape[1] if embeddings.ndim == 2 else 0
+        batches = self._batches(ids, documents, metadatas, dim)
+        committed: List[str] = []
+        if self.concurrency == 1:
+            for positions in batches:
+                try:
+                    committed.extend(self._send(positions, ids, embeddings, documents, metadatas))
+                except Exception as e:
+                    raise BulkWriteError(f"Upsert failed after {len(committed)} chunks: {e}", committed) from e
+            return committed
+
+        error: Optional[Exception] = None
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="bulk-upsert") as pool:
+            in_flight: Set[Future] = set()
+            for positions in batches:
+                in_flight.add(pool.submit(self._send, positions, ids, embeddings, documents, metadatas))
+                if len(in_flight) >= self.concurrency:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    error = self._collect(done, committed) or error
+                    if error is not None:
+                        break
+            done, _ = wait(in_flight)
+            error = self._collect(done, committed) or error
+        if error is not None:
+            raise BulkWriteError(f"Upsert failed after {len(committed)} chunks: {error}", committed) from error
+        return committed
+
+    @staticmethod
+    def _collect(done: Set[Future], committed: List[str]) -> Optional[Exception]:
+        error = None
+        for future in done:
+            if future.exception() is not None:
+                error = future.exception()
+            else:
+                committed.extend(future.result())
+        return error
+
+
+class UpsertProgress:
+    """Append-only journal of chunk ids known to be durably stored, so a failed ingest can resume.
+
+    ``stage`` records ids as their upserts succeed; ``commit`` appends the
+    staged ids to the journal and is called once the store has persisted
+    them (``VectorStore.persist``). On the next run ``done`` holds every
+    committed id, which the ingest workflow skips before embedding.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Set[str] = set()
+        self._staged: List[str] = []
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.done.update(line.strip() for line in f if line.strip())
+
+    def stage(self, ids: List[str]):
+        with self._lock:
+            self._staged.extend(ids)
+
+    def commit(self):
+        with self._lock:
+            staged, self._staged = self._staged, []
+        if not staged:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write("".join(f"{chunk_id}\n" for chunk_id in staged))
+            f.flush()
+            os.fsync(f.fileno())
+        self.done.update(staged)
+
+    def clear(self):
+        """Forget all progress once the ingest it belongs to has completed."""
+        with self._lock:
+            self._staged = []
+        self.done = set()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,115 @@
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+from utils.config_file import ChunkerConfig
+
+# Sentence ends: terminal punctuation (plus closing quotes/brackets) before whitespace.
+# Single line breaks are not boundaries: PDF text wraps lines mid-sentence.
+_SENTENCE_END = re.compile(r'[.!?]["\')\]]*\s+')
+_PARAGRAPH_END = re.compile(r'\n\s*\n')
+_WORD = re.compile(r'\S+')
+
+
+@dataclass
+class Chunk:
+    text: str
+    start_char: int
+    end_char: int
+    token_count: int
+
+
+class TextChunker:
+    """Split text into token windows that fit the embedding model.
+
+    Tokens come from the model's (fast) tokenizer with character offsets,
+    or from whitespace splitting when no tokenizer is available. Each
+    window holds at most ``window_tokens`` tokens; consecutive windows
+    start roughly ``stride_tokens`` apart, so ``window - stride`` tokens
+    overlap. Window ends prefer paragraph, then sentence boundaries, and
+    chunk text is sliced from the original string by offsets, so a text
+    is tokenized and scanned exactly once.
+    """
+
+    def __init__(self, tokenizer: Any = None, window_tokens: Optional[int] = None,
+                 stride_tokens: Optional[int] = None):
+        self.tokenizer = tokenizer
+        self.window_tokens = window_tokens or getattr(ChunkerConfig, 'WINDOW_TOKENS', 256)
+        self.stride_tokens = min(stride_tokens or getattr(ChunkerConfig, 'STRIDE_TOKENS', 192), self.window_tokens)
+        if self.window_tokens <= 0 or self.stride_tokens <= 0:
+            raise ValueError("window_tokens and stride_tokens must be positive")
+
+    @classmethod
+    def for_model(cls, model: Any, **kwargs) -> "TextChunker":
+        """Chunker using a SentenceTransformer's tokenizer, capped at its max sequence length."""
+        tokenizer = getattr(model, 'tokenizer', None)
+        window = kwargs.pop('window_tokens', None) or getattr(ChunkerConfig, 'WINDOW_TOKENS', 256)
+        max_seq_length = getattr(model, 'max_seq_length', None)
+        if max_seq_length:
+            # Leave room for the [CLS] / [SEP] special tokens the model adds
+            window = min(window, max_seq_length - 2)
+        return cls(tokenizer, window_tokens=window, **kwargs)
+
+    def _token_offsets(self, text: str) -> List[Tuple[int, int]]:
+        if self.tokenizer is not None and getattr(self.tokenizer, 'is_fast', False):
+            encoding = self.tokenizer(
+                text, add_special_tokens=False, return_offsets_mapping=True, truncation=False, verbose=False
+            )
+            return [(start, end) for start, end in encoding["offset_mapping"] if end > start]
+        return [match.span() for match in _WORD.finditer(text)]
+
+    def count_tokens(self, text: str) -> int:
+        return len(self._token_offsets(text))
+
+    def chunk(self, text: str) -> List[Chunk]:
+        offsets = self._token_offsets(text)
+        n = len(offsets)
+        if n == 0:
+            return []
+
+        starts = [start for start, _ in offsets]
+        # Token indices at which a new sentence / paragraph begins
+        sentence_starts = sorted({bisect_left(starts, m.end()) for m in _SENTENCE_END.finditer(text)} - {0, n})
+        paragraph_starts = sorted({bisect_left(starts, m.end()) for m in _PARAGRAPH_END.finditer(text)} - {0, n})
+
+        chunks: List[Chunk] = []
+        begin = 0
+        while begin < n:
+            end = min(begin + self.window_tokens, n)
+            if end < n:
+                # Prefer a boundary in the back half of the window; otherwise cut hard
+                lowest = begin + self.window_tokens // 2
+                end = (self._last_boundary(paragraph_starts, lowest, end)
+                       or self._last_boundary(sentence_starts, lowest, end)
+                       or end)
+
+            chunks.append(Chunk(
+                text=text[offsets[begin][0]:offsets[end - 1][1]],
+                start_char=offsets[begin][0],
+                end_char=offsets[end - 1][1],
+                token_count=end - begin
+            ))
+            if end >= n:
+                break
+
+            # Step forward by the stride, snapping to a sentence start inside the overlap
+            next_begin = max(begin + 1, end - (self.window_tokens - self.stride_tokens))
+            begin = self._first_boundary(sentence_starts, next_begin, end - 1) or next_begin
+        return chunks
+
+    @staticmethod
+    def _last_boundary(boundaries: List[int], low: int, high: int) -> Optional[int]:
+        """Largest boundary in ``[low, high]``, if any."""
+        i = bisect_right(boundaries, high)
+        if i and boundaries[i - 1] >= low:
+            return boundaries[i - 1]
+        return None
+
+    @staticmethod
+    def _first_boundary(boundaries: List[int], low: int, high: int) -> Optional[int]:
+        """Smallest boundary in ``[low, high]``, if any."""
+        i = bisect_left(boundaries, low)
+        if i < len(boundaries) and boundaries[i] <= high:
+            return boundaries[i]
+        return None
@@ -0,0 +1,178 @@
+import logging
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from utils.config_file import ContextConfig
+
+logger = logging.getLogger(__name__)
+
+# Same sentence boundary rule as the chunker
+_SENTENCE_END = re.compile(r'[.!?]["\')\]]*\s+')
+_WORD = re.compile(r'\w+')
+
+
+class TokenCounter:
+    """Counts tokens with the LLM's tokenizer (``tiktoken``).
+
+    When tiktoken's encoding cannot be loaded (e.g. offline, as its
+    encoding files are downloaded on first use) it counts with the
+    tokenizer returned by ``fallback_tokenizer`` (the embedding model's,
+    already loaded to embed the query) and, failing that, ~4 characters
+    per token. Either is an estimate; a warning is logged the first time
+    one is used.
+    """
+
+    _fallback_logged = False
+
+    def __init__(self, model_name: str, fallback_tokenizer: Optional[Callable[[], Any]] = None):
+        self.model_name = model_name
+        self.fallback_tokenizer = fallback_tokenizer
+        self._tokenizer = None
+        self._fallback_error: Optional[Exception] = None
+        self.encoding = None
+        try:
+            import tiktoken
+            try:
+                self.encoding = tiktoken.encoding_for_model(model_name)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # tiktoken missing, or its encoding files cannot be downloaded
+            self._fallback_error = e
+
+    @property
+    def exact(self) -> bool:
+        return self.encoding is not None
+
+    def _load_fallback(self):
+        tokenizer = None
+        if self.fallback_tokenizer is not None:
+            try:
+                tokenizer = self.fallback_tokenizer()
+            except Exception as e:
+                logger.debug("Fallback tokenizer unavailable: %s", e)
+        if not TokenCounter._fallback_logged:
+            TokenCounter._fallback_logged = True
+            logger.warning("No tiktoken encoding for %s (%s); estimating context tokens with %s",
+                           self.model_name, self._fallback_error,
+                           "the embedding model's tokenizer" if tokenizer is not None else "4 characters per token")
+        # False marks "looked, none available" so the loader is not retried on every count
+        self._tokenizer = tokenizer if tokenizer is not None else False
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        if self._tokenizer is None:
+            self._load_fallback()
+        if self._tokenizer:
+            return len(self._tokenizer(text, add_special_tokens=False, verbose=False)["input_ids"])
+        return math.ceil(len(text) / 4)
+
+
+@dataclass
+class PackedContext:
+    text: str
+    documents: List[Dict[str, Any]]
+    tokens_used: int
+    budget: int
+    dropped_duplicates: int = 0
+    dropped_over_budget: int = 0
+    trimmed: int = 0
+    exact_count: bool = True
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "tokens_used": self.tokens_used,
+            "token_budget": self.budget,
+            "documents_used": len(self.documents),
+            "dropped_duplicates": self.dropped_duplicates,
+            "dropped_over_budget": self.dropped_over_budget,
+            "trimmed": self.trimmed,
+            "exact_token_count": self.exact_count
+        }
+
+
+class ContextBuilder:
+    """Pack retrieved chunks into a token budget for the prompt.
+
+    Documents are taken in retrieval order (already ranked by relevance,
+    fusion or rerank). Near-duplicates, by word-shingle Jaccard similarity
+    to an already packed chunk, are skipped. A chunk that does not fit is
+    trimmed to the whole sentences that do, provided at least
+    ``min_trim_tokens`` of budget remain; otherwise it is dropped.
+    """
+
+    def __init__(self, model_name: str, max_tokens: Optional[int] = None,
+                 dedup_threshold: Optional[float] = None, min_trim_tokens: Optional[int] = None,
+                 fallback_tokenizer: Optional[Callable[[], Any]] = None):
+        self.counter = TokenCounter(model_name, fallback_tokenizer)
+        self.max_tokens = max_tokens or getattr(ContextConfig, 'MAX_CONTEXT_TOKENS', 3000)
+        self.dedup_threshold = dedup_threshold if dedup_threshold is not None else \
+            getattr(ContextConfig, 'DEDUP_THRESHOLD', 0.8)
+        self.min_trim_tokens = min_trim_tokens if min_trim_tokens is not None else \
+            getattr(ContextConfig, 'MIN_TRIM_TOKENS', 32)
+
+    @staticmethod
+    def _shingles(text: str, size: int = 3) -> Set[tuple]:
+        words = _WORD.findall(text.lower())
+        if len(words) < size:
+            return {tuple(words)}
+        return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+    def _is_duplicate(self, shingles: Set[tuple], kept: List[Set[tuple]]) -> bool:
+        for other in kept:
+            union = len(shingles | other)
+            if union and len(shingles & other) / union >= self.dedup_threshold:
+                return True
+        return False
+
+    def _trim(self, content: str, budget: int) -> str:
+        """Longest prefix of whole sentences that fits in ``budget`` tokens."""
+        ends = [match.end() for match in _SENTENCE_END.finditer(content)] + [len(content)]
+        cut, used = 0, 0
+        for end in ends:
+            used += self.counter.count(content[cut:end])
+            if used > budget:
+                break
+            cut = end
+        return content[:cut].strip()
+
+    def build(self, docs: List[Dict[str, Any]]) -> PackedContext:
+        parts: List[str] = []
+        packed: List[Dict[str, Any]] = []
+        kept_shingles: List[Set[tuple]] = []
+        used = 0
+        packed_context = PackedContext("", packed, 0, self.max_tokens, exact_count=self.counter.exact)
+
+        for doc in docs:
+            content = doc['content'].strip()
+            shingles = self._shingles(content)
+            if self._is_duplicate(shingles, kept_shingles):
+                packed_context.dropped_duplicates += 1
+                continue
+
+            header = f"Document {len(packed) + 1}:\n"
+            overhead = self.counter.count(header + "\n\n")
+            tokens = self.counter.count(content)
+            remaining = self.max_tokens - used - overhead
+            if tokens > remaining:
+                if remaining < self.min_trim_tokens:
+                    packed_context.dropped_over_budget += 1
+                    continue
+                content = self._trim(content, remaining)
+                if not content:
+                    packed_context.dropped_over_budget += 1
+                    continue
+                tokens = self.counter.count(content)
+                packed_context.trimmed += 1
+
+            parts.append(f"{header}{content}\n\n")
+            packed.append(doc if content == doc['content'].strip() else {**doc, 'content': content})
+            kept_shingles.append(shingles)
+            used += overhead + tokens
+
+        packed_context.text = "".join(parts)
+        packed_context.tokens_used = used
+        return packed_context
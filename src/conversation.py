@@ -0,0 +1,200 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+# One chat message, as kept in Streamlit's ``st.session_state.messages``
+Turn = Dict[str, str]
+
+# Words that point back at something said in an earlier turn
+_REFERRING_WORDS = {
+    "it", "its", "it's", "this", "that", "these", "those", "they", "them", "their", "theirs",
+    "he", "she", "him", "her", "his", "there", "former", "latter", "same", "above", "previous"
+}
+# Question words, auxiliaries, pronouns, particles and generic verbs: none of them names a topic
+_FUNCTION_WORDS = _REFERRING_WORDS | {
+    "what", "why", "how", "when", "where", "which", "who", "whom", "whose", "is", "are", "was", "were",
+    "be", "been", "being", "do", "does", "did", "can", "could", "would", "should", "will", "shall", "may",
+    "might", "must", "has", "have", "had", "a", "an", "the", "of", "in", "on", "at", "to", "for", "from",
+    "with", "by", "about", "as", "into", "than", "and", "or", "but", "not", "no", "yes", "so", "then",
+    "also", "more", "else", "again", "please", "i", "me", "my", "you", "your", "we", "us", "our",
+    "explain", "tell", "give", "show", "describe", "mean", "means", "say", "happen", "happens", "work",
+    "works", "matter", "example", "examples", "one", "ones", "other", "another", "really", "ok", "okay"
+}
+# Openings of questions that continue the previous one
+_CONTINUATIONS = (
+    "and", "but", "also", "so", "then", "how so", "why is that", "why not", "what about", "how about",
+    "what else", "what if", "more", "another", "example", "examples", "for example", "give an example",
+    "give me an example", "elaborate", "again", "continue", "go on", "tell me more", "in that case"
+)
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+def is_follow_up(question: str, max_content_words: int = 2, subject_window: int = 3) -> bool:
+    """Whether ``question`` leans on earlier turns rather than standing on its own.
+
+    A question is a follow-up when it names no topic of its own ("why?",
+    "can you explain more?"), opens like a continuation ("what about
+    meiosis?", "and in plants?"), or has a referring pronoun among its
+    first ``subject_window`` words and at most ``max_content_words``
+    content words ("is it reversible?", "how does that compare to
+    meiosis?"). A pronoun elsewhere, as in "what is the function of the
+    enzyme that breaks down starch?", does not make a question a follow-up.
+    """
+    words = _WORD.findall(question.lower())
+    content = [word for word in words if word not in _FUNCTION_WORDS]
+    if not content:
+        return True
+    opening = " ".join(words[:5])
+    if any(opening == phrase or opening.startswith(phrase + " ") for phrase in _CONTINUATIONS):
+        return True
+    subject_pronoun = any(word in _REFERRING_WORDS for word in words[:subject_window])
+    return subject_pronoun and len(content) <= max_content_words
+
+
+def condense_query(question: str, history: List[Turn], max_turns: int = 3) -> str:
+    """Standalone retrieval query for ``question`` asked after ``history``.
+
+    A follow-up is prefixed with the earlier user questions it builds on:
+    the latest standalone question, which anchors the topic, and the
+    follow-ups asked since (the most recent ones, ``max_turns`` questions
+    in all). Standalone questions are returned unchanged. ``history`` holds
+    the turns before ``question``.
+    """
+    if not is_follow_up(question):
+        return question
+    anchor: Optional[str] = None
+    follow_ups: List[str] = []
+    for turn in reversed(history):
+        content = (turn.get("content") or "").strip()
+        if turn.get("role") != "user" or not content:
+            continue
+        if not is_follow_up(content):
+            anchor = content
+            break
+        follow_ups.append(content)
+    earlier = [anchor] if anchor and max_turns > 0 else []
+    keep = max(0, max_turns - len(earlier))
+    earlier += follow_ups[:keep][::-1]
+    return " ".join(earlier + [question.strip()]) if earlier else question
+
+
+def format_history(history: List[Turn], max_turns: int = 4, max_chars: int = 500) -> str:
+    """The last ``max_turns`` messages as ``Role: text`` lines, each cut to ``max_chars``."""
+    lines = []
+    for turn in history[-max_turns:] if max_turns > 0 else []:
+        content = " ".join((turn.get("content") or "").split())
+        if not content:
+            continue
+        if len(content) > max_chars:
+            content = content[:max_chars].rsplit(" ", 1)[0] + " ..."
+        lines.append(f"{turn.get('role', 'user').capitalize()}: {content}")
+    return "\n".join(lines)
+
+
+def _normalize(embedding: np.ndarray) -> np.ndarray:
+    embedding = np.asarray(embedding, dtype=np.float32)
+    norms = np.linalg.norm(embedding, axis=-1, keepdims=True)
+    return embedding / np.where(norms == 0, 1, norms)
+
+
+@dataclass
+class SessionState:
+    """The candidate chunks a session's current topic was answered from."""
+    topic_embedding: np.ndarray  # normalised embedding of the query that retrieved ``candidates``
+    candidates: List[Dict[str, Any]]
+    version: Any
+    scope: Any
+    updated_at: float = field(default_factory=time.monotonic)
+    # Normalised candidate embeddings, computed on the first follow-up that reuses them
+    candidate_embeddings: Optional[np.ndarray] = None
+
+    def rank(self, embedding: np.ndarray, encode) -> List[Tuple[Dict[str, Any], float]]:
+        """Candidates ordered by cosine similarity to ``embedding``; ``encode`` embeds their texts once."""
+        if self.candidate_embeddings is None:
+            self.candidate_embeddings = _normalize(encode([doc['content'] for doc in self.candidates]))
+        similarities = self.candidate_embeddings @ _normalize(embedding)
+        order = np.argsort(-similarities, kind="stable")
+        return [(self.candidates[i], float(similarities[i])) for i in order]
+
+
+class SessionCache:
+    """Per-session candidate sets for multi-turn chats.
+
+    Each session remembers the embedding of the query that last went to the
+    index and the wider candidate set it returned. A later turn whose
+    condensed query stays within ``drift_threshold`` cosine similarity of
+    that topic is served by re-ranking the candidates instead of searching
+    again; the topic is not moved by such turns, so a conversation that
+    wanders off gradually still triggers a fresh search. Sessions are
+    dropped when the collection version or the metadata filter changes,
+    after ``ttl_seconds`` idle, and least-recently-used beyond
+    ``max_sessions``.
+    """
+
+    def __init__(self, drift_threshold: float = 0.6, max_sessions: int = 1000, ttl_seconds: float = 1800):
+        self.drift_threshold = drift_threshold
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.drifts = 0
+
+    def match(self, session_id: str, embedding: np.ndarray, version: Any,
+              scope: Any = None) -> Tuple[Optional[SessionState], Optional[float]]:
+        """The session's state if ``embedding`` is still on its topic, and the topic similarity.
+
+        The similarity is None when the session has no usable state.
+        """
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is not None and (state.version != version or state.scope != scope
+                                      or time.monotonic() - state.updated_at > self.ttl_seconds):
+                del self._sessions[session_id]
+                state = None
+            if state is None:
+                self.misses += 1
+                return None, None
+            similarity = float(state.topic_embedding @ _normalize(embedding))
+            if similarity < self.drift_threshold:
+                self.drifts += 1
+                return None, similarity
+            state.updated_at = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            self.hits += 1
+            return state, similarity
+
+    def put(self, session_id: str, embedding: np.ndarray, candidates: List[Dict[str, Any]],
+            version: Any, scope: Any = None):
+        """Start a new topic for the session from a fresh retrieval."""
+        state = SessionState(_normalize(embedding), list(candidates), version, scope)
+        with self._lock:
+            self._sessions[session_id] = state
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        lookups = self.hits + self.misses + self.drifts
+        return {
+            "sessions": len(self._sessions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "drifts": self.drifts,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "drift_threshold": self.drift_threshold
+        }
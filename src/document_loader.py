@@ -1,36 +1,184 @@
+import mmap
 import os
 import PyPDF2
-from typing import List
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.ingest_manifest import IngestManifest
+from src.page_cache import PageCache
+from utils.config_file import IngestConfig
+
+# (filename, page number starting at 1, page text)
+Page = Tuple[str, int, str]
+
+
+@contextmanager
+def open_pdf(file_path: str) -> Iterator[PyPDF2.PdfReader]:
+    """PdfReader over the file; large files are read through a read-only memory map.
+
+    With the map, PyPDF2's many small seeks and reads are served from the
+    page cache by the OS instead of going through buffered file reads.
+    """
+    with open(file_path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if 0 < size and size >= getattr(IngestConfig, 'MMAP_MIN_BYTES', 1 << 20):
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield PyPDF2.PdfReader(mapped)
+        else:
+            yield PyPDF2.PdfReader(file)
+
+
+def extract_pdf_pages(file_path: str, start: int = 0, stop: Optional[int] = None) -> List[Tuple[int, str]]:
+    """Extract ``(page_no, text)`` for pages ``[start, stop)`` of a PDF.
+
+    Module level so it can run inside a process pool worker.
+    """
+    try:
+        with open_pdf(file_path) as pdf_reader:
+            stop = len(pdf_reader.pages) if stop is None else stop
+            return [(n + 1, (pdf_reader.pages[n].extract_text() or "").strip()) for n in range(start, stop)]
+    except Exception as e:
+        raise ValueError(f"Failed to extract text from PDF {file_path}: {e}")
 
 
 class DocumentLoader:
-    def __init__(self, file_directory: str):
+    def __init__(self, file_directory: str, use_page_cache: bool = True):
         self.directory = file_directory
         self.data: List[str] = []
+        # Extracted PDF pages keyed by file hash and page number, shared across runs
+        cache_path = getattr(IngestConfig, 'PAGE_CACHE_PATH', None)
+        self.page_cache: Optional[PageCache] = PageCache(cache_path) if use_page_cache and cache_path else None
+
+    def _file_hash(self, file_path: str) -> Optional[str]:
+        return IngestManifest.file_hash(file_path) if self.page_cache is not None else None
+
+    def list_files(self) -> List[str]:
+        """Supported files in the directory, in a stable order."""
+        return sorted(
+            filename for filename in os.listdir(self.directory)
+            if filename.endswith('.txt') or filename.endswith('.pdf')
+        )
 
     def load_documents(self) -> List[str]:
         self.data = []
-        for filename in os.listdir(self.directory):
+        for filename in self.list_files():
             file_path = os.path.join(self.directory, filename)
             if filename.endswith('.txt'):
                 self.data.append(self.load_txt(file_path))
             elif filename.endswith('.pdf'):
                 self.data.append(self.load_pdf(file_path))
         return self.data
-    
+
     def load_txt(self, file_path: str) -> str:
         """Load text from .txt file"""
         with open(file_path, 'r', encoding='utf-8') as file:
             return file.read()
-    
+
     def load_pdf(self, file_path: str) -> str:
         """Extract text from PDF file"""
+        return "\n".join(text for _, text in self.iter_pdf_pages(file_path)).strip()
+
+    def iter_pdf_pages(self, file_path: str) -> Iterator[Tuple[int, str]]:
+        """Lazily yield ``(page_no, text)`` for the pages of a PDF.
+
+        Pages found in the page cache are not parsed again; newly extracted
+        pages are cached as they are yielded, so a run that crashes part way
+        through a file resumes from the first uncached page.
+        """
+        file_hash = self._file_hash(file_path)
+        num_pages = self.page_cache.num_pages(file_hash) if file_hash else None
+        cached: Dict[int, str] = {}
+        if num_pages is not None:
+            cached = self.page_cache.get_pages(file_hash, 1, num_pages)
+            if len(cached) >= num_pages:
+                for page_no in range(1, num_pages + 1):
+                    yield page_no, cached[page_no]
+                return
+
         try:
-            text = ""
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-            return text.strip()
+            with open_pdf(file_path) as pdf_reader:
+                if file_hash and num_pages is None:
+                    self.page_cache.set_num_pages(file_hash, len(pdf_reader.pages))
+                for n in range(len(pdf_reader.pages)):
+                    text = cached.get(n + 1)
+                    if text is None:
+                        text = (pdf_reader.pages[n].extract_text() or "").strip()
+                        if file_hash:
+                            self.page_cache.put_pages(file_hash, [(n + 1, text)])
+                    yield n + 1, text
         except Exception as e:
-            raise ValueError(f"Failed to extract text from PDF {file_path}: {e}")
\ No newline at end of file
+            raise ValueError(f"Failed to extract text from PDF {file_path}: {e}")
+
+    def iter_pages(self, max_workers: Optional[int] = None, pages_per_task: Optional[int] = None,
+                   filenames: Optional[List[str]] = None) -> Iterator[Page]:
+        """Stream ``(filename, page_no, text)`` for every document, in file and page order.
+
+        PDFs are split into page ranges that are extracted by a process pool.
+        At most ``2 * max_workers`` ranges are in flight, so memory is bounded
+        by the window, not by the size of the corpus. Ranges already in the
+        page cache are served from it without a worker. Text files count as
+        a single page. ``filenames`` restricts the stream to a subset of
+        files.
+        """
+        if max_workers is None:
+            max_workers = getattr(IngestConfig, 'MAX_WORKERS', 0) or os.cpu_count() or 1
+        if pages_per_task is None:
+            pages_per_task = getattr(IngestConfig, 'PAGES_PER_TASK', 16)
+        if filenames is None:
+            filenames = self.list_files()
+
+        if max_workers <= 1:
+            for filename in filenames:
+                file_path = os.path.join(self.directory, filename)
+                if filename.endswith('.txt'):
+                    yield filename, 1, self.load_txt(file_path)
+                else:
+                    for page_no, text in self.iter_pdf_pages(file_path):
+                        yield filename, page_no, text
+            return
+
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            pending = deque()
+            for task in self._iter_tasks(pool, filenames, pages_per_task):
+                pending.append(task)
+                if len(pending) >= 2 * max_workers:
+                    yield from self._drain(*pending.popleft())
+            while pending:
+                yield from self._drain(*pending.popleft())
+
+    def _iter_tasks(self, pool: ProcessPoolExecutor, filenames: List[str], pages_per_task: int):
+        """Submit extraction work lazily; text files and cached page ranges are read inline."""
+        for filename in filenames:
+            file_path = os.path.join(self.directory, filename)
+            if filename.endswith('.txt'):
+                yield filename, None, [(1, self.load_txt(file_path))]
+                continue
+
+            file_hash = self._file_hash(file_path)
+            num_pages = self.page_cache.num_pages(file_hash) if file_hash else None
+            if num_pages is None:
+                try:
+                    with open_pdf(file_path) as pdf_reader:
+                        num_pages = len(pdf_reader.pages)
+                except Exception as e:
+                    raise ValueError(f"Failed to extract text from PDF {file_path}: {e}")
+                if file_hash:
+                    self.page_cache.set_num_pages(file_hash, num_pages)
+            for start in range(0, num_pages, pages_per_task):
+                stop = min(start + pages_per_task, num_pages)
+                if file_hash:
+                    cached = self.page_cache.get_pages(file_hash, start + 1, stop)
+                    if len(cached) == stop - start:
+                        yield filename, None, sorted(cached.items())
+                        continue
+                yield filename, file_hash, pool.submit(extract_pdf_pages, file_path, start, stop)
+
+    def _drain(self, filename: str, file_hash: Optional[str], result) -> Iterator[Page]:
+        pages = result.result() if hasattr(result, 'result') else result
+        if file_hash:
+            # Only freshly extracted ranges carry a hash; cache them before handing them on
+            self.page_cache.put_pages(file_hash, pages)
+        for page_no, text in pages:
+            yield filename, page_no, text
@@ -0,0 +1,249 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: disk-tier writers are not serialised across processes
+    fcntl = None
+
+KEY_BYTES = 32  # SHA-256 digest
+FORMAT_VERSION = 2  # raw uint8 key rows; version 1 stored keys as 'S32', which drops trailing NUL bytes
+
+
+class EmbeddingCache:
+    """Two-tier cache of embeddings keyed by ``(model_name, sha256(text))``.
+
+    The memory tier is an LRU of recently used vectors. The disk tier is a
+    fixed-capacity ring buffer in ``<cache_dir>/<model>/``: a memory-mapped
+    ``vectors.npy`` of shape ``(capacity, dim)`` plus a parallel ``keys.npy``
+    of raw SHA-256 digests, shape ``(capacity, 32)``. When the ring is full
+    the oldest slot is overwritten. Each model gets its own directory, and
+    a header records the model name and dimension so a mismatching tier is
+    discarded instead of reused. With ``dim=None`` the dimension is taken
+    from a matching tier's header, or from the first vectors stored, so the
+    cache can be opened before the model is loaded.
+
+    Several processes (e.g. API workers) may share a directory: writes are
+    serialised by an ``flock`` on ``<dir>/lock``, the header counts every
+    write so each process picks up the slots others have filled, and a hit
+    is only served if the slot still holds the looked-up key.
+    """
+
+    def __init__(self, model_name: str, dim: Optional[int] = None, cache_dir: Optional[str] = None,
+                 memory_items: int = 10000, disk_items: int = 100000):
+        self.model_name = model_name
+        self.dim = dim
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.directory = None
+        self._vectors: Optional[np.ndarray] = None
+        self._keys: Optional[np.ndarray] = None
+        self._slots: Dict[bytes, int] = {}
+        self._written = 0  # slots ever written; the next one is _written % disk_items
+        self._lock_file = None
+        if cache_dir and disk_items > 0:
+            slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+            self.directory = os.path.join(cache_dir, slug)
+            self._open_disk_tier()
+
+    @staticmethod
+    def key(text: str) -> bytes:
+        return hashlib.sha256(text.encode('utf-8')).digest()
+
+    @property
+    def _header_path(self) -> str:
+        return os.path.join(self.directory, "header.json")
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock on the disk tier across processes (a no-op without ``fcntl``)."""
+        if fcntl is None or self.directory is None:
+            yield
+            return
+        if self._lock_file is None:
+            self._lock_file = open(os.path.join(self.directory, "lock"), 'a+')
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _read_header(self) -> Optional[dict]:
+        try:
+            with open(self._header_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _open_disk_tier(self):
+        os.makedirs(self.directory, exist_ok=True)
+        vectors_path = os.path.join(self.directory, "vectors.npy")
+        keys_path = os.path.join(self.directory, "keys.npy")
+
+        with self._file_lock():
+            header = self._read_header()
+            expected = {"model_name": self.model_name, "capacity": self.disk_items, "format": FORMAT_VERSION}
+            if self.dim is not None:
+                expected["dim"] = self.dim
+            if header is not None and all(header.get(k) == v for k, v in expected.items()):
+                self.dim = header["dim"]
+                self._vectors = np.load(vectors_path, mmap_mode='r+')
+                self._keys = np.load(keys_path, mmap_mode='r+')
+                self._written = header["written"]
+                self._index_slots()
+                return
+            if self.dim is None:
+                return  # created by the first put_many, once the dimension is known
+
+            # Missing, or built for another model / dimension / capacity / key format: start fresh
+            self._vectors = np.lib.format.open_memmap(
+                vectors_path, mode='w+', dtype=np.float32, shape=(self.disk_items, self.dim)
+            )
+            self._keys = np.lib.format.open_memmap(
+                keys_path, mode='w+', dtype=np.uint8, shape=(self.disk_items, KEY_BYTES)
+            )
+            self._written = 0
+            self._slots = {}
+            self._write_header()
+
+    def _index_slots(self):
+        # An all-zero row is an empty slot
+        occupied = np.flatnonzero(self._keys.any(axis=1))
+        self._slots = {self._keys[slot].tobytes(): int(slot) for slot in occupied}
+
+    def _write_header(self):
+        tmp = f"{self._header_path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"model_name": self.model_name, "dim": self.dim, "capacity": self.disk_items,
+                       "format": FORMAT_VERSION, "written": self._written}, f)
+        os.replace(tmp, self._header_path)
+
+    def _sync(self):
+        """Index the slots other processes have written since this one last looked."""
+        header = self._read_header()
+        written = header.get("written", 0) if header else 0
+        if written == self._written:
+            return
+        if written < self._written or written - self._written >= self.disk_items:
+            # Cleared, or the whole ring was rewritten
+            self._index_slots()
+        else:
+            for count in range(self._written, written):
+                slot = count % self.disk_items
+                key = self._keys[slot].tobytes()
+                if any(key):
+                    self._slots[key] = slot
+        self._written = written
+
+    def _read_slot(self, key: bytes) -> Optional[np.ndarray]:
+        slot = self._slots.get(key)
+        if slot is None:
+            return None
+        vector = np.array(self._vectors[slot])
+        # Checked after the copy: a writer zeroes the key before touching the vector
+        if self._keys[slot].tobytes() != key:
+            self._slots.pop(key, None)  # overwritten by another process
+            return None
+        return vector
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: List[bytes]) -> Tuple[Dict[int, np.ndarray], List[int]]:
+        """Look up keys; returns ``({position: vector}, missing positions)``."""
+        found: Dict[int, np.ndarray] = {}
+        missing: List[int] = []
+        with self._lock:
+            for position, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    found[position] = vector
+                    continue
+                missing.append(position)
+            if missing and self._vectors is None and self.directory is not None:
+                self._open_disk_tier()  # another process may have created it since
+            if missing and self._vectors is not None:
+                self._sync()
+                still_missing = []
+                for position in missing:
+                    vector = self._read_slot(keys[position])
+                    if vector is None:
+                        still_missing.append(position)
+                        continue
+                    self._remember(keys[position], vector)
+                    self.disk_hits += 1
+                    found[position] = vector
+                missing = still_missing
+            self.misses += len(missing)
+        return found, missing
+
+    def put_many(self, keys: List[bytes], vectors: np.ndarray):
+        """Store freshly computed vectors in both tiers."""
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector)
+            if self._vectors is None and self.directory is not None:
+                if self.dim is None:
+                    self.dim = vectors.shape[1]
+                self._open_disk_tier()
+            if self._vectors is None:
+                return
+            with self._file_lock():
+                self._sync()
+                for key, vector in zip(keys, vectors):
+                    slot = self._slots.get(key)
+                    if slot is not None and self._keys[slot].tobytes() == key:
+                        continue
+                    slot = self._written % self.disk_items
+                    evicted = self._keys[slot].tobytes()
+                    self._slots.pop(evicted, None)
+                    self._keys[slot] = 0
+                    self._vectors[slot] = vector
+                    self._keys[slot] = np.frombuffer(key, dtype=np.uint8)
+                    self._slots[key] = slot
+                    self._written += 1
+                self._vectors.flush()
+                self._keys.flush()
+                self._write_header()
+
+    def clear(self):
+        """Drop every cached vector, in memory and on disk."""
+        with self._lock:
+            self._memory.clear()
+            if self._keys is not None:
+                with self._file_lock():
+                    self._keys[:] = 0
+                    self._keys.flush()
+                    self._slots = {}
+                    self._written = 0
+                    self._write_header()
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_items": len(self._memory),
+            "disk_items": len(self._slots)
+        }
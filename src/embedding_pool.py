@@ -0,0 +1,183 @@
+import functools
+import logging
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import List, Optional
+
+import numpy as np
+
+from utils.config_file import EmbeddingsConfig
+
+logger = logging.getLogger(__name__)
+
+THREAD_VARIABLES = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+# Guards the parent's environment while a worker is launched with its thread variables
+_environ_lock = threading.Lock()
+
+# Per worker process: the model this worker serves
+_worker_model = None
+
+
+class _WorkerProcess(multiprocessing.context.SpawnProcess):
+    """Spawned process that starts with the BLAS/OpenMP thread variables set.
+
+    Those libraries read the variables once, when numpy or torch is first
+    imported, which in a spawned child happens while unpickling the
+    initializer, before any code of ours runs. The child inherits the
+    parent's environment at launch, so the variables are set in the parent
+    just for the duration of ``start``.
+    """
+
+    def __init__(self, *args, threads: int = 1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = threads
+
+    def start(self):
+        with _environ_lock:
+            saved = {variable: os.environ.get(variable) for variable in THREAD_VARIABLES}
+            os.environ.update({variable: str(self.threads) for variable in THREAD_VARIABLES})
+            try:
+                super().start()
+            finally:
+                for variable, value in saved.items():
+                    if value is None:
+                        os.environ.pop(variable, None)
+                    else:
+                        os.environ[variable] = value
+
+
+def _spawn_context(threads: int) -> multiprocessing.context.SpawnContext:
+    """Spawn context whose processes start with ``threads`` BLAS/OpenMP threads."""
+    context = multiprocessing.context.SpawnContext()
+    context.Process = functools.partial(_WorkerProcess, threads=threads)
+    return context
+
+
+def _init_worker(model_name: str, backend: str, threads: int):
+    """Pin torch's intra-op threads (in case it was imported already), then load the model."""
+    global _worker_model
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    from src import model_registry
+    _worker_model = model_registry.embedding_model(model_name, backend, threads=threads)
+
+
+def _worker_dimension() -> int:
+    return _worker_model.get_sentence_embedding_dimension()
+
+
+def _encode_shard(texts: List[str], batch_size: int, shm_name: str, rows: int, dim: int, start: int) -> int:
+    """Encode ``texts`` straight into rows ``[start, start + len(texts))`` of the shared output."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray((rows, dim), dtype=np.float32, buffer=shm.buf)
+        out[start:start + len(texts)] = _worker_model.encode(
+            texts, batch_size=batch_size, convert_to_numpy=True, convert_to_tensor=False
+        )
+        del out  # release the buffer export before closing
+    finally:
+        shm.close()
+    return len(texts)
+
+
+class EmbeddingPool:
+    """Shards encode calls across worker processes, each holding its own model copy.
+
+    Each call allocates one shared-memory block for the whole output.
+    Workers write their contiguous shard of rows into it, so only the input
+    texts and a row count cross the process boundary, never pickled
+    arrays. Output rows are in input order. Workers are spawned (not forked)
+    with the thread variables already in their environment, so every worker
+    starts with ``threads_per_worker`` intra-op threads and a clean torch
+    runtime.
+    """
+
+    def __init__(self, model_name: str, workers: Optional[int] = None, threads_per_worker: Optional[int] = None,
+                 backend: str = "torch"):
+        self.model_name = model_name
+        self.backend = backend
+        self.threads_per_worker = threads_per_worker or getattr(EmbeddingsConfig, 'POOL_THREADS_PER_WORKER', 1)
+        if workers is None:
+            workers = getattr(EmbeddingsConfig, 'POOL_WORKERS', 0)
+        if workers < 0:
+            workers = max(1, (os.cpu_count() or 1) // self.threads_per_worker)
+        if workers < 1:
+            raise ValueError("EmbeddingPool needs at least one worker")
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._dimension: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _start(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                logger.info("Starting %d embedding workers x %d threads", self.workers, self.threads_per_worker)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=_spawn_context(self.threads_per_worker),
+                    initializer=_init_worker,
+                    initargs=(self.model_name, self.backend, self.threads_per_worker)
+                )
+                try:
+                    self._dimension = self._executor.submit(_worker_dimension).result()
+                except Exception:
+                    self._executor.shutdown(cancel_futures=True)
+                    self._executor = None
+                    raise
+        return self._executor
+
+    def _shard_size(self, num_texts: int, batch_size: int) -> int:
+        # About two shards per worker to even out stragglers, in whole model batches
+        per_shard = math.ceil(num_texts / (2 * self.workers))
+        if per_shard > batch_size:
+            per_shard = math.ceil(per_shard / batch_size) * batch_size
+        return per_shard
+
+    def encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        executor = self._start()
+        dim = self._dimension
+        rows = len(texts)
+        if rows == 0:
+            return np.empty((0, dim), dtype=np.float32)
+
+        shm = shared_memory.SharedMemory(create=True, size=rows * dim * 4)
+        futures = []
+        try:
+            shard = self._shard_size(rows, batch_size)
+            for start in range(0, rows, shard):
+                futures.append(executor.submit(
+                    _encode_shard, texts[start:start + shard], batch_size, shm.name, rows, dim, start
+                ))
+            for future in futures:
+                future.result()
+            result = np.ndarray((rows, dim), dtype=np.float32, buffer=shm.buf).copy()
+        finally:
+            # If a shard failed, the others may still be writing: drop the queued ones and let the running ones finish
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            shm.close()
+            shm.unlink()
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "threads_per_worker": self.threads_per_worker,
+            "running": self._executor is not None
+        }
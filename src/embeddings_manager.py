@@ -3,28 +3,107 @@ import sys
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)) + '/../')
 
-from sentence_transformers import SentenceTransformer
+import logging
+import threading
 from dataclasses import dataclass, field
 from typing import Union, List, Optional, Dict
 import numpy as np
 from utils.config_file import EmbeddingsConfig
+from src import model_registry
+from src.embedding_cache import EmbeddingCache
+from src.embedding_pool import EmbeddingPool
+from src.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class EmbeddingsManager:
     # Use the best free model for ChromaDB
     model_name: str = field(default=getattr(EmbeddingsConfig, 'DEFAULT_MODEL', 'all-MiniLM-L6-v2'))
+    # "torch" (SentenceTransformer), "onnx" or "onnx_int8" (ONNX Runtime, see src/onnx_backend.py)
+    backend: str = field(default=getattr(EmbeddingsConfig, 'BACKEND', 'torch'))
     data: Optional[List[str]] = field(default=None, init=False)
 
     def __post_init__(self):
-        print(f"Loading embedding model: {self.model_name}")
-        self.model = SentenceTransformer(self.model_name)
-        print(f"Model loaded. Embedding dimension: {self.model.get_sentence_embedding_dimension()}")
+        # The model, and the sentence_transformers import, load on first use
+        self._model = None
+        self._cache: Optional[EmbeddingCache] = None
+        self._cache_key: Optional[tuple] = None
+        self._loaded_key: Optional[tuple] = None
+        self._lock = threading.Lock()
+        self._pool: Optional[EmbeddingPool] = None
+
+    @property
+    def model(self):
+        """The embedding model, loaded through the process-wide registry on first access."""
+        # Switching model_name or backend invalidates the model and its cache
+        if not self.is_loaded:
+            with self._lock:
+                if not self.is_loaded:
+                    self._load_model()
+        return self._model
+
+    @property
+    def cache(self) -> Optional[EmbeddingCache]:
+        """The embedding cache of the configured model; opening it does not load the model."""
+        if not getattr(EmbeddingsConfig, 'CACHE_ENABLED', False):
+            return None
+        key = (self.model_name, self.backend)
+        if self._cache is None or self._cache_key != key:
+            with self._lock:
+                if self._cache is None or self._cache_key != key:
+                    # ONNX (and above all int8) vectors differ slightly from torch ones, so they are cached apart
+                    self._cache = EmbeddingCache(
+                        self.model_name if self.backend == "torch" else f"{self.model_name}@{self.backend}",
+                        cache_dir=getattr(EmbeddingsConfig, 'CACHE_DIR', None),
+                        memory_items=getattr(EmbeddingsConfig, 'CACHE_MEMORY_ITEMS', 10000),
+                        disk_items=getattr(EmbeddingsConfig, 'CACHE_DISK_ITEMS', 100000)
+                    )
+                    self._cache_key = key
+        return self._cache
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None and (self.model_name, self.backend) == self._loaded_key
+
+    def _load_model(self):
+        """Load the model through the process-wide registry."""
+        model = model_registry.embedding_model(self.model_name, self.backend)
+        dimension = model.get_sentence_embedding_dimension()
+        logger.info("Model ready. Embedding dimension: %d", dimension)
+
+        self._model = model
+        self._loaded_key = (self.model_name, self.backend)
+
+    def _embedding_pool(self) -> Optional[EmbeddingPool]:
+        """Worker pool for large encode calls, started on first use when POOL_WORKERS is set."""
+        if not getattr(EmbeddingsConfig, 'POOL_WORKERS', 0):
+            return None
+        with self._lock:
+            if self._pool is not None and (self._pool.model_name, self._pool.backend) != (self.model_name, self.backend):
+                self._pool.shutdown()
+                self._pool = None
+            if self._pool is None:
+                self._pool = EmbeddingPool(self.model_name, backend=self.backend)
+            return self._pool
+
+    def close(self):
+        """Stop the embedding worker processes, if any."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def warm_up(self):
+        """Load the model and run one tiny batch so the first real request pays neither cost."""
+        self.model.encode(["warm up"], batch_size=1, convert_to_numpy=True)
 
     def set_data(self, data: List[str]):
         """Store data for embedding and downstream tasks."""
         self.data = data
 
-    def encode(self, texts: Union[str, List[str], None] = None) -> np.ndarray:
+    def encode(self, texts: Union[str, List[str], None] = None, batch_size: Optional[int] = None) -> np.ndarray:
         """Encode stored data or provided texts into embeddings."""
         if texts is None:
             if self.data is None:
@@ -35,8 +114,46 @@ class EmbeddingsManager:
         if isinstance(texts, str):
             texts = [texts]
             
+        if batch_size is None:
+            batch_size = getattr(EmbeddingsConfig, 'BATCH_SIZE', 32)
+
+        with metrics.stage("embed"):
+            return self._encode_cached(texts, batch_size)
+
+    def _encode_cached(self, texts: List[str], batch_size: int) -> np.ndarray:
+        if self.cache is None:
+            return self._encode_uncached(texts, batch_size)
+
+        keys = [EmbeddingCache.key(text) for text in texts]
+        found, missing = self.cache.get_many(keys)
+        if missing:
+            # Encode each distinct missing text once
+            unique: Dict[bytes, str] = {}
+            for position in missing:
+                unique.setdefault(keys[position], texts[position])
+            computed = self._encode_uncached(list(unique.values()), batch_size)
+            self.cache.put_many(list(unique.keys()), computed)
+            by_key = dict(zip(unique.keys(), computed))
+            for position in missing:
+                found[position] = by_key[keys[position]]
+
+        if not found:
+            return np.empty((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        return np.stack([found[position] for position in range(len(texts))]).astype(np.float32, copy=False)
+
+    def _encode_uncached(self, texts: List[str], batch_size: int) -> np.ndarray:
+        metrics.inc("rag_embedded_texts_total", len(texts))
         try:
-            embeddings = self.model.encode(texts, convert_to_numpy=True, convert_to_tensor=False)
+            if len(texts) >= getattr(EmbeddingsConfig, 'POOL_MIN_TEXTS', 64):
+                pool = self._embedding_pool()
+                if pool is not None:
+                    return pool.encode(texts, batch_size)
+            embeddings = self.model.encode(
+                texts,
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                convert_to_tensor=False
+            )
             return np.asarray(embeddings, dtype=np.float32)
         except Exception as e:
             raise ValueError(f"Failed to encode texts: {e}")
@@ -59,11 +176,17 @@ class EmbeddingsManager:
         except Exception as e:
             raise ValueError(f"Failed to calculate similarities matrix: {e}")
 
-    def get_model_info(self) -> Dict[str, Union[str, int]]:
-        """Get information about the current model."""
+    def get_model_info(self) -> Dict[str, Union[str, int, Dict]]:
+        """Get information about the current model, without loading it if nothing has used it yet."""
+        if not self.is_loaded:
+            return {"model_name": self.model_name, "backend": self.backend, "loaded": False}
         max_seq_length = getattr(self.model, 'max_seq_length', None)
         return {
             "model_name": self.model_name,
+            "backend": self.backend,
+            "loaded": True,
             "embedding_dimension": self.model.get_sentence_embedding_dimension(),
-            "max_sequence_length": max_seq_length if max_seq_length is not None else 'Unknown'
+            "max_sequence_length": max_seq_length if max_seq_length is not None else 'Unknown',
+            "cache": self.cache.stats() if self.cache is not None else "disabled",
+            "pool": self._pool.stats() if self._pool is not None else "disabled"
         }
\ No newline at end of file
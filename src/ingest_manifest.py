@@ -0,0 +1,72 @@
+import hashlib
+import json
+import mmap
+import os
+from typing import Dict, List, Optional, Tuple
+
+from utils.config_file import IngestConfig
+
+# (path, size, mtime_ns) -> hash, so the loader and the workflow hash each file once per run
+_hash_memo: Dict[Tuple[str, int, int], str] = {}
+
+
+class IngestManifest:
+    """Local record of which chunk IDs each ingested file produced.
+
+    Stored as JSON: ``{"files": {filename: {"file_hash": ..., "chunk_ids": [...]}}}``.
+    Comparing a file's current hash with the recorded one tells the ingest
+    workflow whether the file can be skipped, and the recorded chunk IDs
+    tell it which chunks went stale when the file changed or disappeared.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, Dict[str, object]] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.files = json.load(f).get("files", {})
+
+    @staticmethod
+    def file_hash(file_path: str, block_size: int = 1 << 20) -> str:
+        """SHA-256 of a file's bytes; large files are hashed straight from a memory map.
+
+        Results are memoised by path, size and modification time.
+        """
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        if key in _hash_memo:
+            return _hash_memo[key]
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            if 0 < stat.st_size and stat.st_size >= getattr(IngestConfig, 'MMAP_MIN_BYTES', 1 << 20):
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    digest.update(mapped)
+            else:
+                for block in iter(lambda: f.read(block_size), b""):
+                    digest.update(block)
+        _hash_memo[key] = digest.hexdigest()
+        return _hash_memo[key]
+
+    def is_unchanged(self, filename: str, file_hash: str) -> bool:
+        entry = self.files.get(filename)
+        return entry is not None and entry["file_hash"] == file_hash
+
+    def chunk_ids(self, filename: str) -> List[str]:
+        entry = self.files.get(filename)
+        return list(entry["chunk_ids"]) if entry else []
+
+    def update(self, filename: str, file_hash: str, chunk_ids: List[str]):
+        self.files[filename] = {"file_hash": file_hash, "chunk_ids": chunk_ids}
+
+    def remove(self, filename: str) -> Optional[Dict[str, object]]:
+        return self.files.pop(filename, None)
+
+    def save(self):
+        """Write the manifest atomically."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"files": self.files}, f)
+        os.replace(tmp, self.path)
@@ -0,0 +1,256 @@
+import json
+import os
+import re
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from src.append_log import AppendLog
+
+# Keeps course codes and dotted/dashed terms together: "cs-101", "v1.2", "h2o"
+_TOKEN = re.compile(r'[a-z0-9]+(?:[._-][a-z0-9]+)*')
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class LexicalIndex:
+    """Incremental BM25 inverted index with array-backed postings.
+
+    Each term maps to two parallel ``array`` objects: the rows containing
+    it and the term frequency in each row. Updates append a new row and
+    tombstone the old one; tombstoned rows are skipped at query time and
+    dropped by ``compact``, which runs automatically once half of the rows
+    are dead. A lock serialises writers and readers, since NumPy views over
+    the postings would otherwise block appends.
+
+    ``save`` writes a CSR snapshot of the postings plus a journal of the
+    adds and deletes made since; a save appends to the journal, and the
+    snapshot is rewritten only once the journal holds more records than
+    the index, as ``LocalBackend`` does with its metadata.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.doc_ids: List[str] = []
+        self.doc_lengths = array('I')
+        self.alive = bytearray()
+        self._rows: Dict[str, int] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+        self._pending: List[Dict[str, Any]] = []  # journal entries not yet saved
+        self._log: Optional[AppendLog] = None  # journal of the snapshot last saved or loaded
+        self._generation = 0  # snapshot number; a journal from another generation is stale
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, ids: Iterable[str], texts: Iterable[str]):
+        """Index texts under ids, replacing previous versions of the same ids."""
+        ids, texts = list(ids), list(texts)
+        with self._lock:
+            self._add(ids, texts)
+            self._journal({"op": "add", "ids": ids, "texts": texts})
+
+    def _add(self, ids: Iterable[str], texts: Iterable[str]):
+        for chunk_id, text in zip(ids, texts):
+            self._remove_row(chunk_id)
+            row = len(self.doc_ids)
+            terms = tokenize(text)
+            counts: Dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                posting = self.postings.get(term)
+                if posting is None:
+                    posting = self.postings[term] = (array('I'), array('H'))
+                posting[0].append(row)
+                posting[1].append(min(count, 65535))
+            self.doc_ids.append(chunk_id)
+            self.doc_lengths.append(len(terms))
+            self.alive.append(1)
+            self._rows[chunk_id] = row
+            self._total_length += len(terms)
+
+    def delete(self, ids: Iterable[str]):
+        ids = list(ids)
+        with self._lock:
+            self._delete(ids)
+            self._journal({"op": "delete", "ids": ids})
+
+    def _delete(self, ids: Iterable[str]):
+        for chunk_id in ids:
+            self._remove_row(chunk_id)
+        if len(self.doc_ids) > 1000 and len(self._rows) < len(self.doc_ids) // 2:
+            self._compact()
+
+    def _journal(self, entry: Dict[str, Any]):
+        # Without a journal the next save writes a full snapshot, so there is nothing to keep
+        if self._log is not None:
+            self._pending.append(entry)
+
+    def _remove_row(self, chunk_id: str):
+        row = self._rows.pop(chunk_id, None)
+        if row is not None:
+            self.alive[row] = 0
+            self._total_length -= self.doc_lengths[row]
+
+    def compact(self):
+        """Rebuild postings without tombstoned rows."""
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        alive = np.frombuffer(bytes(self.alive), dtype=np.uint8).astype(bool)
+        new_rows = np.cumsum(alive) - 1
+        postings: Dict[str, Tuple[array, array]] = {}
+        for term, (rows, tfs) in self.postings.items():
+            rows_np = np.frombuffer(rows, dtype=np.uint32)
+            keep = alive[rows_np]
+            if keep.any():
+                postings[term] = (
+                    array('I', new_rows[rows_np[keep]].astype(np.uint32).tobytes()),
+                    array('H', np.frombuffer(tfs, dtype=np.uint16)[keep].tobytes())
+                )
+        self.postings = postings
+        self.doc_ids = [chunk_id for chunk_id, keep in zip(self.doc_ids, alive) if keep]
+        self.doc_lengths = array('I', np.frombuffer(self.doc_lengths, dtype=np.uint32)[alive].tobytes())
+        self.alive = bytearray(b'\x01' * len(self.doc_ids))
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(self.doc_ids)}
+
+    def search(self, query: str, k: int, allowed_ids: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """Top-k ``(id, bm25_score)`` for the query, best first."""
+        with self._lock:
+            return self._search(query, k, allowed_ids)
+
+    def _search(self, query: str, k: int, allowed_ids: Optional[Set[str]]) -> List[Tuple[str, float]]:
+        num_docs = len(self._rows)
+        if num_docs == 0:
+            return []
+        alive = np.frombuffer(self.alive, dtype=np.uint8)
+        lengths = np.frombuffer(self.doc_lengths, dtype=np.uint32)
+        avg_length = self._total_length / num_docs or 1.0
+
+        all_rows, all_scores = [], []
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            rows = np.frombuffer(posting[0], dtype=np.uint32)
+            tfs = np.frombuffer(posting[1], dtype=np.uint16).astype(np.float32)
+            live = alive[rows] == 1
+            rows, tfs = rows[live], tfs[live]
+            if len(rows) == 0:
+                continue
+            df = len(rows)
+            idf = np.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[rows] / avg_length)
+            all_rows.append(rows)
+            all_scores.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+        if not all_rows:
+            return []
+
+        # Sum per-term contributions per row without a corpus-sized buffer
+        unique_rows, inverse = np.unique(np.concatenate(all_rows), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(all_scores))
+        if allowed_ids is not None:
+            mask = np.fromiter((self.doc_ids[r] in allowed_ids for r in unique_rows), dtype=bool,
+                               count=len(unique_rows))
+            unique_rows, scores = unique_rows[mask], scores[mask]
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self.doc_ids[unique_rows[i]], float(scores[i])) for i in top]
+
+    @staticmethod
+    def journal_path(path: str) -> str:
+        """The journal kept next to the snapshot at ``path``."""
+        return os.path.splitext(path)[0] + ".log"
+
+    @classmethod
+    def delete_files(cls, path: str):
+        """Remove the snapshot at ``path`` and its journal."""
+        for file_path in (path, cls.journal_path(path)):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def save(self, path: str, compact: bool = False):
+        """Persist the changes since the last save.
+
+        They are appended to the journal, unless ``compact`` is set or the
+        journal would outgrow the index: then the postings are rewritten as
+        CSR arrays (atomic replace) and the journal is dropped.
+        """
+        with self._lock:
+            pending = sum(len(entry["ids"]) for entry in self._pending)
+            if compact or not os.path.exists(path) or self._log is None \
+                    or self._log.path != self.journal_path(path) or self._log.records + pending > len(self):
+                self._save(path)
+            else:
+                self._log.append(self._generation, self._pending)
+                self._pending = []
+
+    def _save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._generation += 1
+        if len(self._rows) < len(self.doc_ids):
+            self._compact()
+        terms = list(self.postings.keys())
+        lengths = [len(self.postings[t][0]) for t in terms]
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        rows = np.concatenate([np.frombuffer(self.postings[t][0], dtype=np.uint32) for t in terms]) \
+            if terms else np.empty(0, dtype=np.uint32)
+        tfs = np.concatenate([np.frombuffer(self.postings[t][1], dtype=np.uint16) for t in terms]) \
+            if terms else np.empty(0, dtype=np.uint16)
+        tmp = path + ".tmp.npz"
+        np.savez(
+            tmp,
+            terms=np.array(json.dumps(terms)),
+            doc_ids=np.array(json.dumps(self.doc_ids)),
+            offsets=offsets,
+            rows=rows,
+            tfs=tfs,
+            doc_lengths=np.frombuffer(self.doc_lengths, dtype=np.uint32),
+            generation=np.array([self._generation])
+        )
+        os.replace(tmp, path)
+        # The journal's generation no longer matches, so a crash here leaves it ignored
+        self._log = AppendLog(self.journal_path(path))
+        self._log.reset()
+        self._pending = []
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "LexicalIndex":
+        index = cls(**kwargs)
+        if not os.path.exists(path):
+            return index
+        with np.load(path) as data:
+            terms = json.loads(str(data["terms"]))
+            offsets, rows, tfs = data["offsets"], data["rows"], data["tfs"]
+            for i, term in enumerate(terms):
+                index.postings[term] = (
+                    array('I', rows[offsets[i]:offsets[i + 1]].tobytes()),
+                    array('H', tfs[offsets[i]:offsets[i + 1]].tobytes())
+                )
+            index.doc_ids = json.loads(str(data["doc_ids"]))
+            index.doc_lengths = array('I', data["doc_lengths"].astype(np.uint32).tobytes())
+            index._generation = int(data["generation"][0]) if "generation" in data else 0
+        index.alive = bytearray(b'\x01' * len(index.doc_ids))
+        index._rows = {chunk_id: row for row, chunk_id in enumerate(index.doc_ids)}
+        index._total_length = int(sum(index.doc_lengths))
+        index._log = AppendLog(cls.journal_path(path))
+        for entry in index._log.read(index._generation):
+            if entry["op"] == "add":
+                index._add(entry["ids"], entry["texts"])
+            else:
+                index._delete(entry["ids"])
+        return index
@@ -0,0 +1,77 @@
+import os
+from types import SimpleNamespace
+from typing import Any, Dict, List, Tuple
+
+from utils.config_file import LLMConfig
+
+
+def create_llm_clients(provider: str, api_key: str | None) -> Tuple[Any, Any]:
+    """Build the ``(sync, async)`` chat clients for the configured provider.
+
+    ``openai`` clients share pooled, keep-alive HTTP connections sized by
+    ``LLMConfig.MAX_CONNECTIONS``. ``stub`` returns offline clients with the
+    same ``chat.completions.create`` interface, for local runs and tests.
+    """
+    if provider == "stub":
+        return StubLLMClient(), AsyncStubLLMClient()
+    if provider != "openai":
+        raise ValueError(f"Unknown LLM provider: {provider}")
+    if not api_key:
+        raise ValueError("OpenAI API key not found. Set OPENAI_API_KEY environment variable.")
+
+    import httpx
+    from openai import AsyncOpenAI, OpenAI
+
+    limits = httpx.Limits(
+        max_connections=getattr(LLMConfig, 'MAX_CONNECTIONS', 100),
+        max_keepalive_connections=getattr(LLMConfig, 'MAX_KEEPALIVE_CONNECTIONS', 20)
+    )
+    timeout = getattr(LLMConfig, 'TIMEOUT_SECONDS', 60.0)
+    return (
+        OpenAI(api_key=api_key, http_client=httpx.Client(limits=limits, timeout=timeout)),
+        AsyncOpenAI(api_key=api_key, http_client=httpx.AsyncClient(limits=limits, timeout=timeout))
+    )
+
+
+def llm_provider() -> str:
+    return os.getenv("LLM_PROVIDER", getattr(LLMConfig, 'PROVIDER', 'openai'))
+
+
+def _stub_answer(messages: List[Dict[str, str]], max_tokens: int | None) -> str:
+    """Deterministic answer echoing the start of the prompt."""
+    prompt = " ".join(messages[-1]["content"].split())
+    words = f"[stub answer] {prompt}".split()
+    return " ".join(words[:max_tokens or 50])
+
+
+class StubLLMClient:
+    """Offline stand-in for ``openai.OpenAI`` (non-streaming chat completions)."""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    @staticmethod
+    def _create(model: str, messages: List[Dict[str, str]], max_tokens: int | None = None, **kwargs):
+        message = SimpleNamespace(content=_stub_answer(messages, max_tokens))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class AsyncStubLLMClient:
+    """Offline stand-in for ``openai.AsyncOpenAI``, including ``stream=True``."""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    @staticmethod
+    async def _create(model: str, messages: List[Dict[str, str]], max_tokens: int | None = None,
+                      stream: bool = False, **kwargs):
+        answer = _stub_answer(messages, max_tokens)
+        if not stream:
+            message = SimpleNamespace(content=answer)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+        async def chunks():
+            for i, word in enumerate(answer.split(" ")):
+                delta = SimpleNamespace(content=word if i == 0 else " " + word)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+        return chunks()
@@ -0,0 +1,156 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# ChromaDB ``where`` operators
+COMPARISON_OPERATORS = ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte", "$in", "$nin")
+LOGICAL_OPERATORS = ("$and", "$or")
+
+Where = Dict[str, Any]
+
+
+def validate_where(where: Optional[Where]):
+    """Raise ValueError unless ``where`` is a ChromaDB-style metadata filter.
+
+    ``{"source": "notes.pdf"}`` is shorthand for
+    ``{"source": {"$eq": "notes.pdf"}}``; one field or logical operator per
+    dict, combined with ``{"$and": [...]}`` / ``{"$or": [...]}``.
+    """
+    if where is None:
+        return
+    if not isinstance(where, dict) or len(where) != 1:
+        raise ValueError(f"Metadata filter must be a dict with exactly one field or operator, got {where!r}")
+    key, condition = next(iter(where.items()))
+    if key in LOGICAL_OPERATORS:
+        if not isinstance(condition, list) or len(condition) < 2:
+            raise ValueError(f"{key} expects a list of at least two filters, got {condition!r}")
+        for clause in condition:
+            validate_where(clause)
+        return
+    if key.startswith("$"):
+        raise ValueError(f"Unknown logical operator {key}, expected one of {LOGICAL_OPERATORS}")
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+    if len(condition) != 1:
+        raise ValueError(f"Filter on '{key}' must have exactly one operator, got {condition!r}")
+    operator, value = next(iter(condition.items()))
+    if operator not in COMPARISON_OPERATORS:
+        raise ValueError(f"Unknown operator {operator} on '{key}', expected one of {COMPARISON_OPERATORS}")
+    if operator in ("$in", "$nin"):
+        if not isinstance(value, list):
+            raise ValueError(f"{operator} on '{key}' expects a list, got {value!r}")
+    elif operator in ("$gt", "$gte", "$lt", "$lte"):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{operator} on '{key}' expects a number, got {value!r}")
+    elif not isinstance(value, (str, int, float, bool)):
+        raise ValueError(f"{operator} on '{key}' expects a string, number or bool, got {value!r}")
+
+
+def filter_key(where: Where) -> str:
+    """Canonical form of a filter, for caching results per filter."""
+    return json.dumps(where, sort_keys=True)
+
+
+def _typed(value: Any) -> tuple:
+    """Posting key for ``value``; typed so ``True``, ``1`` and ``1.0`` stay apart, as in ChromaDB."""
+    return type(value), value
+
+
+class MetadataIndex:
+    """Posting lists from each ``(field, value)`` to the rows that carry it.
+
+    Filters are evaluated as bitmaps (one bool per row) built from the
+    postings, so the rows a query may return are known before any vector
+    is scored. Appends extend the postings in place; updates that change a
+    row's metadata and deletes (which renumber rows) mark the index stale,
+    and it is rebuilt from the metadata on the next filtered query. The
+    row sets of recent filters are cached until the next write.
+    """
+
+    def __init__(self, cache_size: int = 64):
+        self.cache_size = cache_size
+        self._postings: Dict[str, Dict[tuple, List[int]]] = {}  # field -> _typed(value) -> rows
+        self._size = 0
+        self._stale = True
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._stale = True
+            self._cache.clear()
+
+    def add(self, row: int, metadata: Dict[str, Any]):
+        """Index a row appended at the end; ignored while the index is stale."""
+        with self._lock:
+            self._cache.clear()
+            if self._stale:
+                return
+            for field, value in metadata.items():
+                self._postings.setdefault(field, {}).setdefault(_typed(value), []).append(row)
+            self._size = row + 1
+
+    def _rebuild(self, metadatas: List[Dict[str, Any]]):
+        self._postings = {}
+        for row, metadata in enumerate(metadatas):
+            for field, value in (metadata or {}).items():
+                self._postings.setdefault(field, {}).setdefault(_typed(value), []).append(row)
+        self._size = len(metadatas)
+        self._stale = False
+
+    def rows(self, where: Where, metadatas: List[Dict[str, Any]]) -> np.ndarray:
+        """Sorted rows whose metadata matches ``where``."""
+        key = filter_key(where)
+        with self._lock:
+            if self._stale or self._size != len(metadatas):
+                self._rebuild(metadatas)
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            rows = np.flatnonzero(self._evaluate(where))
+            self._cache[key] = rows
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return rows
+
+    def _bitmap(self, postings: List[List[int]]) -> np.ndarray:
+        mask = np.zeros(self._size, dtype=bool)
+        for rows in postings:
+            mask[rows] = True
+        return mask
+
+    def _evaluate(self, where: Where) -> np.ndarray:
+        key, condition = next(iter(where.items()))
+        if key == "$and":
+            mask = self._evaluate(condition[0])
+            for clause in condition[1:]:
+                mask &= self._evaluate(clause)
+            return mask
+        if key == "$or":
+            mask = self._evaluate(condition[0])
+            for clause in condition[1:]:
+                mask |= self._evaluate(clause)
+            return mask
+
+        operator, value = next(iter(condition.items())) if isinstance(condition, dict) else ("$eq", condition)
+        values = self._postings.get(key, {})
+        if operator in ("$eq", "$ne"):
+            mask = self._bitmap([values.get(_typed(value), [])])
+        elif operator in ("$in", "$nin"):
+            mask = self._bitmap([values.get(_typed(v), []) for v in value])
+        else:
+            compare = {"$gt": lambda v: v > value, "$gte": lambda v: v >= value,
+                       "$lt": lambda v: v < value, "$lte": lambda v: v <= value}[operator]
+            mask = self._bitmap([rows for (kind, v), rows in values.items()
+                                 if kind in (int, float) and compare(v)])
+        # $ne / $nin also match rows without the field
+        return ~mask if operator in ("$ne", "$nin") else mask
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"fields": len(self._postings),
+                    "postings": sum(len(values) for values in self._postings.values()),
+                    "cached_filters": len(self._cache)}
@@ -0,0 +1,192 @@
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from utils.config_file import MetricsConfig
+
+T = TypeVar("T")
+Labels = Tuple[Tuple[str, str], ...]
+
+# Stage durations of the query being traced, if any (see Metrics.trace)
+_current_trace: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "rag_trace", default=None
+)
+
+
+class _NullTimer:
+    """Shared no-op context manager returned while metrics are disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record_stage(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Process-wide counters, histograms and per-query stage traces.
+
+    ``stage(name)`` times a block into the ``rag_stage_duration_seconds``
+    histogram and, inside ``trace()``, into the traced query's timings.
+    ``render()`` returns the Prometheus text exposition format. While
+    disabled every call returns immediately (``stage`` hands back a shared
+    no-op context manager), so instrumentation can stay on hot paths.
+    """
+
+    def __init__(self, enabled: bool = True, buckets: Optional[List[float]] = None):
+        self.enabled = enabled
+        self.buckets = sorted(buckets or getattr(MetricsConfig, 'LATENCY_BUCKETS', (0.01, 0.1, 1.0, 10.0)))
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], _Histogram] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _labels(labels: Dict[str, str]) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add ``value`` to a counter."""
+        if not self.enabled:
+            return
+        key = (name, self._labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record ``value`` in a histogram."""
+        if not self.enabled:
+            return
+        key = (name, self._labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(self.buckets)
+            histogram.observe(value)
+
+    def stage(self, name: str):
+        """Context manager timing one pipeline stage."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, name)
+
+    def record_stage(self, name: str, seconds: float):
+        self.observe("rag_stage_duration_seconds", seconds, stage=name)
+        timings = _current_trace.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + seconds * 1000
+
+    def timed_iter(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """Yield from ``iterable``, charging the time spent producing each item to stage ``name``."""
+        if not self.enabled:
+            yield from iterable
+            return
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.record_stage(name, time.perf_counter() - start)
+            yield item
+
+    @contextmanager
+    def trace(self) -> Iterator[Optional[Dict[str, float]]]:
+        """Collect stage timings (milliseconds) of the enclosed query; yields None when disabled."""
+        if not self.enabled:
+            yield None
+            return
+        timings: Dict[str, float] = {}
+        token = _current_trace.set(timings)
+        try:
+            yield timings
+        finally:
+            _current_trace.reset(token)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Counters and histogram summaries as plain dicts (e.g. for JSON)."""
+        with self._lock:
+            counters = {self._series(name, labels): value for (name, labels), value in self._counters.items()}
+            histograms = {
+                self._series(name, labels): {"count": h.count, "sum": h.sum}
+                for (name, labels), h in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    @staticmethod
+    def _series(name: str, labels: Labels, extra: Labels = ()) -> str:
+        pairs = labels + extra
+        if not pairs:
+            return name
+        return name + "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+    def render(self) -> str:
+        """Prometheus text exposition of every counter and histogram."""
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (series_name, labels), value in sorted(self._counters.items()):
+                    if series_name == name:
+                        lines.append(f"{self._series(name, labels)} {value}")
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (series_name, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+                    if series_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + [float("inf")], histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{self._series(name + '_bucket', labels, (('le', le),))} {cumulative}")
+                    lines.append(f"{self._series(name + '_sum', labels)} {histogram.sum}")
+                    lines.append(f"{self._series(name + '_count', labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry used by the pipeline modules
+metrics = Metrics(enabled=getattr(MetricsConfig, 'ENABLED', True))
@@ -0,0 +1,92 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from utils.config_file import EmbeddingsConfig
+
+logger = logging.getLogger(__name__)
+
+# Loaded models keyed by (kind, name, options); shared by every manager in the process
+_models: Dict[Tuple[Hashable, ...], Any] = {}
+_load_seconds: Dict[Tuple[Hashable, ...], float] = {}
+_locks: Dict[Tuple[Hashable, ...], threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+
+def get_model(key: Tuple[Hashable, ...], loader: Callable[[], Any]) -> Any:
+    """Return the model registered under ``key``, calling ``loader`` on first use only.
+
+    Concurrent first calls for the same key wait for a single load instead of
+    loading the model twice; different keys load independently.
+    """
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _registry_lock:
+        lock = _locks.setdefault(key, threading.Lock())
+    with lock:
+        model = _models.get(key)
+        if model is None:
+            start = time.perf_counter()
+            model = loader()
+            _load_seconds[key] = time.perf_counter() - start
+            _models[key] = model
+    return model
+
+
+def sentence_transformer(model_name: str):
+    """Shared ``SentenceTransformer``; the library is imported on first load."""
+    def load():
+        from sentence_transformers import SentenceTransformer
+        logger.info("Loading embedding model: %s", model_name)
+        return SentenceTransformer(model_name)
+    return get_model(("sentence_transformer", model_name), load)
+
+
+def onnx_encoder(model_name: str, quantized: bool = False, threads: Optional[int] = None):
+    """Shared ONNX Runtime encoder, exporting (and quantizing) the model on first use."""
+    if threads is None:
+        threads = getattr(EmbeddingsConfig, 'ONNX_THREADS', 0)
+
+    def load():
+        from src.onnx_backend import OnnxEncoder, ensure_exported
+        model_dir = ensure_exported(model_name, quantized)
+        logger.info("Loading ONNX embedding model: %s (%s)", model_dir, "int8" if quantized else "fp32")
+        return OnnxEncoder(model_dir, quantized=quantized, threads=threads)
+    return get_model(("onnx", model_name, quantized, threads), load)
+
+
+def embedding_model(model_name: str, backend: str = "torch", threads: Optional[int] = None):
+    """Embedding model for ``EmbeddingsConfig.BACKEND``: ``torch``, ``onnx`` or ``onnx_int8``."""
+    if backend == "torch":
+        return sentence_transformer(model_name)
+    if backend in ("onnx", "onnx_int8"):
+        return onnx_encoder(model_name, quantized=backend == "onnx_int8", threads=threads)
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def cross_encoder(model_name: str, max_length: int):
+    """Shared ``CrossEncoder``; the library is imported on first load."""
+    def load():
+        from sentence_transformers import CrossEncoder
+        logger.info("Loading reranker model: %s", model_name)
+        return CrossEncoder(model_name, max_length=max_length)
+    return get_model(("cross_encoder", model_name, max_length), load)
+
+
+def is_loaded(key: Tuple[Hashable, ...]) -> bool:
+    return key in _models
+
+
+def loaded_models() -> Dict[str, float]:
+    """Loaded model keys with the seconds each took to load."""
+    return {"/".join(str(part) for part in key): round(seconds, 3) for key, seconds in _load_seconds.items()}
+
+
+def clear():
+    """Drop every loaded model (the next use reloads it)."""
+    with _registry_lock:
+        _models.clear()
+        _load_seconds.clear()
+        _locks.clear()
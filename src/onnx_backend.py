@@ -0,0 +1,228 @@
+import json
+import logging
+import os
+from typing import List, Optional
+
+import numpy as np
+
+from utils.config_file import EmbeddingsConfig
+
+logger = logging.getLogger(__name__)
+
+FP32_FILE = "model.onnx"
+INT8_FILE = "model_int8.onnx"
+CONFIG_FILE = "sentence_config.json"
+POOLING_MODES = ("mean", "cls", "max")
+INSTALL_HINT = "pip install 'rag-project[onnx]'"
+
+
+def model_dir_for(model_name: str, onnx_dir: Optional[str] = None) -> str:
+    onnx_dir = onnx_dir or getattr(EmbeddingsConfig, 'ONNX_DIR', 'data/onnx_models')
+    return os.path.join(onnx_dir, model_name.replace("/", "__"))
+
+
+def export_onnx(model_name: str, output_dir: str, opset: int = 17) -> str:
+    """Export a SentenceTransformer's transformer to ONNX, with its tokenizer and pooling settings.
+
+    Pooling and normalisation are not part of the graph; ``OnnxEncoder``
+    applies them in NumPy from ``sentence_config.json``. Needs ``torch`` and
+    ``sentence_transformers``, and ``onnx`` to write the graph, but only at
+    export time.
+    """
+    try:
+        import onnx  # noqa: F401  (torch.onnx.export needs it)
+    except ImportError as e:
+        raise ValueError(f"Exporting to ONNX needs the onnx package ({INSTALL_HINT}): {e}")
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    modules = [type(module).__name__ for module in model]
+    unsupported = [name for name in modules if name not in ("Transformer", "Pooling", "Normalize")]
+    if modules[0] != "Transformer" or unsupported:
+        raise ValueError(f"Cannot export {model_name} to ONNX: unsupported modules {unsupported or modules}")
+    pooling = "mean"
+    if "Pooling" in modules:
+        pooling = model[modules.index("Pooling")].get_pooling_mode_str()
+        if pooling not in POOLING_MODES:
+            raise ValueError(f"Cannot export {model_name} to ONNX: unsupported pooling mode {pooling}")
+
+    sample = model.tokenizer(["warm up export"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class TokenEmbeddings(torch.nn.Module):
+        def __init__(self, auto_model):
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, *inputs):
+            return self.auto_model(**dict(zip(input_names, inputs)), return_dict=False)[0]
+
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, FP32_FILE)
+    logger.info("Exporting %s to ONNX: %s", model_name, path)
+    with torch.no_grad():
+        torch.onnx.export(
+            TokenEmbeddings(model[0].auto_model.eval()),
+            tuple(sample[name] for name in input_names),
+            path,
+            input_names=input_names,
+            output_names=["token_embeddings"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in input_names + ["token_embeddings"]},
+            opset_version=opset,
+            dynamo=False
+        )
+
+    model.tokenizer.save_pretrained(output_dir)
+    with open(os.path.join(output_dir, CONFIG_FILE), 'w') as f:
+        json.dump({
+            "model_name": model_name,
+            "input_names": input_names,
+            "pooling": pooling,
+            "normalize": "Normalize" in modules,
+            "max_seq_length": model.max_seq_length,
+            "dimension": model.get_sentence_embedding_dimension()
+        }, f, indent=2)
+    return path
+
+
+def quantize_onnx(model_dir: str) -> str:
+    """Write an int8 dynamically quantized copy of the exported model (weights int8, activations quantized at run time)."""
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError as e:
+        raise ValueError(f"int8 quantization needs onnxruntime and onnx ({INSTALL_HINT}): {e}")
+
+    path = os.path.join(model_dir, INT8_FILE)
+    logger.info("Quantizing %s to int8: %s", os.path.join(model_dir, FP32_FILE), path)
+    quantize_dynamic(os.path.join(model_dir, FP32_FILE), path, weight_type=QuantType.QInt8)
+    return path
+
+
+def ensure_exported(model_name: str, quantized: bool = False, onnx_dir: Optional[str] = None) -> str:
+    """Directory of the exported model, exporting (and quantizing) it on first use."""
+    model_dir = model_dir_for(model_name, onnx_dir)
+    if not os.path.exists(os.path.join(model_dir, CONFIG_FILE)):
+        export_onnx(model_name, model_dir)
+    if quantized and not os.path.exists(os.path.join(model_dir, INT8_FILE)):
+        quantize_onnx(model_dir)
+    return model_dir
+
+
+class FastTokenizer:
+    """The part of a Hugging Face fast tokenizer the pipeline calls, on the bare ``tokenizers`` library.
+
+    ``transformers`` imports torch when it is installed, which would undo
+    most of the load-time and memory savings of the ONNX backend.
+    """
+
+    is_fast = True
+
+    def __init__(self, model_dir: str, max_length: int):
+        from tokenizers import Tokenizer
+
+        path = os.path.join(model_dir, "tokenizer.json")
+        if not os.path.exists(path):
+            raise ValueError(f"{model_dir} has no tokenizer.json; the ONNX backend needs a fast tokenizer")
+        pad_token = "[PAD]"
+        config_path = os.path.join(model_dir, "tokenizer_config.json")
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                configured = json.load(f).get("pad_token") or pad_token
+            # Older tokenizer configs store special tokens as AddedToken dicts
+            pad_token = configured["content"] if isinstance(configured, dict) else configured
+        # Separate instances: padding and truncation are tokenizer-wide settings
+        self._plain = Tokenizer.from_file(path)
+        self._plain.no_padding()
+        self._plain.no_truncation()
+        self._batch = Tokenizer.from_file(path)
+        self._batch.enable_truncation(max_length)
+        self._batch.enable_padding(pad_id=self._batch.token_to_id(pad_token) or 0, pad_token=pad_token)
+
+    def __call__(self, text: str, add_special_tokens: bool = True, return_offsets_mapping: bool = False,
+                 **kwargs) -> dict:
+        encoding = self._plain.encode(text, add_special_tokens=add_special_tokens)
+        result = {"input_ids": encoding.ids, "attention_mask": encoding.attention_mask}
+        if return_offsets_mapping:
+            result["offset_mapping"] = encoding.offsets
+        return result
+
+    def encode_batch(self, texts: List[str]) -> dict:
+        """Padded, truncated model inputs as int64 arrays."""
+        encodings = self._batch.encode_batch(texts)
+        return {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64)
+        }
+
+
+class OnnxEncoder:
+    """Runs an exported sentence embedding model with ONNX Runtime on CPU.
+
+    Mirrors the parts of ``SentenceTransformer`` that the pipeline uses
+    (``encode``, ``tokenizer``, ``max_seq_length``, ``similarity`` and
+    ``get_sentence_embedding_dimension``), so it can replace it in
+    ``EmbeddingsManager`` without torch or transformers being imported. Like
+    ``SentenceTransformer``, texts are batched in order of length so
+    batches carry little padding.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = False, threads: int = 0):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ValueError(f"The ONNX embedding backend needs onnxruntime ({INSTALL_HINT}): {e}")
+
+        with open(os.path.join(model_dir, CONFIG_FILE)) as f:
+            config = json.load(f)
+        self.model_name = config["model_name"]
+        self.input_names: List[str] = config["input_names"]
+        self.pooling: str = config["pooling"]
+        self.normalize: bool = config["normalize"]
+        self.max_seq_length: int = config["max_seq_length"]
+        self.dimension: int = config["dimension"]
+        self.quantized = quantized
+        self.tokenizer = FastTokenizer(model_dir, self.max_seq_length)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        path = os.path.join(model_dir, INT8_FILE if quantized else FP32_FILE)
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def _pool(self, token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        if self.pooling == "cls":
+            return token_embeddings[:, 0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        if self.pooling == "max":
+            return np.where(mask > 0, token_embeddings, -1e9).max(axis=1)
+        return (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(self, texts, batch_size: int = 32, **kwargs) -> np.ndarray:
+        if isinstance(texts, str):
+            texts = [texts]
+        out = np.empty((len(texts), self.dimension), dtype=np.float32)
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            encoded = self.tokenizer.encode_batch([texts[row] for row in rows])
+            feed = {name: encoded[name] for name in self.input_names}
+            token_embeddings = self.session.run(None, feed)[0]
+            out[rows] = self._pool(token_embeddings, encoded["attention_mask"])
+        if self.normalize:
+            out /= np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+        return out
+
+    @staticmethod
+    def similarity(emb1: np.ndarray, emb2: np.ndarray) -> np.ndarray:
+        """Cosine similarity matrix, as ``SentenceTransformer.similarity`` computes by default."""
+        a = np.atleast_2d(emb1).astype(np.float32)
+        b = np.atleast_2d(emb2).astype(np.float32)
+        a = a / np.clip(np.linalg.norm(a, axis=1, keepdims=True), 1e-12, None)
+        b = b / np.clip(np.linalg.norm(b, axis=1, keepdims=True), 1e-12, None)
+        return a @ b.T
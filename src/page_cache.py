@@ -0,0 +1,81 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+class PageCache:
+    """Persistent cache of extracted PDF page text keyed by ``(file_hash, page_no)``.
+
+    A single SQLite file holds every page ever extracted, plus the page
+    count of each file. The key is the content hash, so a renamed or copied
+    textbook is still a hit and an edited one is a miss. Only the ingest
+    process talks to the database; extraction workers return their pages
+    and the loader stores them.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection shared by the threads that drive ingestion, serialised by the lock
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "file_hash TEXT NOT NULL, page_no INTEGER NOT NULL, text TEXT NOT NULL, "
+                "PRIMARY KEY (file_hash, page_no)) WITHOUT ROWID"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS files (file_hash TEXT PRIMARY KEY, num_pages INTEGER NOT NULL)"
+            )
+
+    def num_pages(self, file_hash: str) -> Optional[int]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT num_pages FROM files WHERE file_hash = ?", (file_hash,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_num_pages(self, file_hash: str, num_pages: int):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO files (file_hash, num_pages) VALUES (?, ?)", (file_hash, num_pages)
+            )
+
+    def get_pages(self, file_hash: str, first: int, last: int) -> Dict[int, str]:
+        """Cached pages numbered ``first`` to ``last`` (1-based, inclusive)."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT page_no, text FROM pages WHERE file_hash = ? AND page_no BETWEEN ? AND ?",
+                (file_hash, first, last)
+            ).fetchall()
+        pages = dict(rows)
+        self.hits += len(pages)
+        self.misses += (last - first + 1) - len(pages)
+        return pages
+
+    def put_pages(self, file_hash: str, pages: List[Tuple[int, str]]):
+        if not pages:
+            return
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO pages (file_hash, page_no, text) VALUES (?, ?, ?)",
+                [(file_hash, page_no, text) for page_no, text in pages]
+            )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            files, pages = self._connection.execute(
+                "SELECT (SELECT COUNT(*) FROM files), (SELECT COUNT(*) FROM pages)"
+            ).fetchone()
+        return {"files": files, "pages": pages, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
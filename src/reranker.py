@@ -0,0 +1,108 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Union
+
+from src import model_registry
+from utils.config_file import RerankerConfig
+
+
+class Reranker:
+    """Cross-encoder reranking with a score cache and a latency budget.
+
+    Candidates are scored in batches in their retrieval order. Before each
+    batch the expected batch time (a running average of past batches) is
+    checked against the remaining ``budget_ms``; once the budget would be
+    exceeded, the remaining candidates keep their retrieval order behind
+    the reranked ones. Scores are cached per ``(query, document)`` pair.
+    """
+
+    def __init__(self, model_name: Optional[str] = None, batch_size: Optional[int] = None,
+                 budget_ms: Optional[float] = None, cache_items: Optional[int] = None):
+        self.model_name = model_name or getattr(RerankerConfig, 'MODEL', 'cross-encoder/ms-marco-MiniLM-L-6-v2')
+        self.batch_size = batch_size or getattr(RerankerConfig, 'BATCH_SIZE', 16)
+        self.budget_ms = budget_ms if budget_ms is not None else getattr(RerankerConfig, 'BUDGET_MS', 150)
+        self.cache_items = cache_items if cache_items is not None else getattr(RerankerConfig, 'CACHE_ITEMS', 10000)
+        self._scores: "OrderedDict[bytes, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._batch_ms: Optional[float] = None
+        self.pairs_scored = 0
+        self.cache_hits = 0
+        self.budget_cutoffs = 0
+        self.max_length = getattr(RerankerConfig, 'MAX_LENGTH', 512)
+
+    @property
+    def model(self):
+        """The cross-encoder, loaded through the process-wide registry on first use."""
+        return model_registry.cross_encoder(self.model_name, self.max_length)
+
+    def warm_up(self):
+        """Load the model and score one pair so the first query's budget is not spent on loading."""
+        self.model.predict([("warm up", "warm up")], show_progress_bar=False)
+
+    @staticmethod
+    def _key(query: str, document: str) -> bytes:
+        return hashlib.sha256(f"{query}\0{document}".encode('utf-8')).digest()
+
+    def score(self, query: str, documents: List[str]) -> List[Optional[float]]:
+        """Relevance scores in input order; None for pairs cut off by the budget."""
+        model = self.model  # a first-use load is not charged to the budget
+        start = time.perf_counter()
+        keys = [self._key(query, document) for document in documents]
+        scores: List[Optional[float]] = [None] * len(documents)
+        with self._lock:
+            for position, key in enumerate(keys):
+                cached = self._scores.get(key)
+                if cached is not None:
+                    self._scores.move_to_end(key)
+                    scores[position] = cached
+                    self.cache_hits += 1
+
+        pending = [position for position, value in enumerate(scores) if value is None]
+        for i in range(0, len(pending), self.batch_size):
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if self._batch_ms is not None and elapsed_ms + self._batch_ms > self.budget_ms:
+                self.budget_cutoffs += 1
+                break
+
+            batch = pending[i:i + self.batch_size]
+            batch_start = time.perf_counter()
+            predicted = model.predict(
+                [(query, documents[position]) for position in batch],
+                batch_size=self.batch_size,
+                show_progress_bar=False
+            )
+            batch_ms = (time.perf_counter() - batch_start) * 1000
+            # Running estimate of one batch's cost, used for the budget check
+            self._batch_ms = batch_ms if self._batch_ms is None else 0.8 * self._batch_ms + 0.2 * batch_ms
+
+            with self._lock:
+                for position, value in zip(batch, predicted):
+                    scores[position] = float(value)
+                    self._scores[keys[position]] = float(value)
+                    self._scores.move_to_end(keys[position])
+                while len(self._scores) > self.cache_items:
+                    self._scores.popitem(last=False)
+            self.pairs_scored += len(batch)
+        return scores
+
+    def rerank(self, query: str, docs: List[Dict[str, Any]], n_results: int) -> List[Dict[str, Any]]:
+        """Top ``n_results`` retrieved docs ordered by cross-encoder score."""
+        scores = self.score(query, [doc['content'] for doc in docs])
+        scored = [{**doc, 'rerank_score': value} for doc, value in zip(docs, scores) if value is not None]
+        scored.sort(key=lambda doc: doc['rerank_score'], reverse=True)
+        unscored = [doc for doc, value in zip(docs, scores) if value is None]
+        return (scored + unscored)[:n_results]
+
+    def stats(self) -> Dict[str, Union[str, int, float]]:
+        return {
+            "model_name": self.model_name,
+            "loaded": model_registry.is_loaded(("cross_encoder", self.model_name, self.max_length)),
+            "pairs_scored": self.pairs_scored,
+            "cache_hits": self.cache_hits,
+            "cached_scores": len(self._scores),
+            "budget_ms": self.budget_ms,
+            "budget_cutoffs": self.budget_cutoffs,
+            "batch_ms_estimate": round(self._batch_ms, 2) if self._batch_ms is not None else 0.0
+        }
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+
+
+class SemanticCache:
+    """Answer cache keyed by query embedding.
+
+    A lookup hits when a cached query's cosine similarity to the new query
+    reaches ``threshold``, the entry is younger than ``ttl_seconds`` and it
+    was produced against the current collection version and for the same
+    ``scope`` (e.g. a metadata filter). Expired entries are dropped by the
+    lookup that finds them, before the best match is picked. Entries are
+    evicted least-recently-used beyond ``max_entries``; a version change
+    drops every entry.
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl_seconds: float = 3600, max_entries: int = 1000):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: list = []
+        self._matrix_scopes: list = []
+        self._matrix_created: Optional[np.ndarray] = None
+        self._next_key = 0
+        self._version: Any = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved_s = 0.0
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        embedding = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def _sync_version(self, version: Any):
+        if version != self._version:
+            self._entries.clear()
+            self._matrix = None
+            self._version = version
+
+    def lookup(self, embedding: np.ndarray, version: Any, scope: Any = None) -> Optional[Dict[str, Any]]:
+        """Cached result for a semantically equivalent query in the same scope, or None."""
+        with self._lock:
+            self._sync_version(version)
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            if self._matrix is None:
+                self._matrix_keys = list(self._entries.keys())
+                self._matrix = np.stack([self._entries[k]["embedding"] for k in self._matrix_keys])
+                self._matrix_scopes = [self._entries[k]["scope"] for k in self._matrix_keys]
+                self._matrix_created = np.array([self._entries[k]["created_at"] for k in self._matrix_keys])
+            similarities = self._matrix @ self._normalize(embedding)
+            usable = np.array([entry_scope == scope for entry_scope in self._matrix_scopes])
+            expired = time.monotonic() - self._matrix_created > self.ttl_seconds
+            if expired.any():
+                for row in np.flatnonzero(expired):
+                    del self._entries[self._matrix_keys[row]]
+                self._matrix = None
+                usable &= ~expired
+            if not usable.all():
+                similarities = np.where(usable, similarities, -np.inf)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            key = self._matrix_keys[best]
+            entry = self._entries[key]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.latency_saved_s += entry["latency_s"]
+            return {**entry["result"], "cache_similarity": float(similarities[best])}
+
+    def put(self, embedding: np.ndarray, result: Dict[str, Any], version: Any, latency_s: float,
+            scope: Any = None):
+        """Cache ``result``; ``latency_s`` is what a future hit saves."""
+        with self._lock:
+            self._sync_version(version)
+            self._entries[self._next_key] = {
+                "embedding": self._normalize(embedding),
+                "scope": scope,
+                "result": result,
+                "created_at": time.monotonic(),
+                "latency_s": latency_s
+            }
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "latency_saved_s": round(self.latency_saved_s, 3),
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds
+        }
@@ -0,0 +1,355 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from src.ingest_manifest import IngestManifest
+
+SNAPSHOT_FORMAT = "edurag-snapshot"
+SNAPSHOT_VERSION = 1
+MANIFEST_FILE = "snapshot.json"
+LEXICAL_FILE = "lexical.npz"
+INGEST_MANIFEST_FILE = "ingest_manifest.json"
+VECTOR_DTYPES = ("float32", "int8")
+_TYPED_COLUMNS = {"int": np.int64, "float": np.float64, "bool": np.bool_}
+
+# (ids, embeddings, documents, metadatas) for a run of consecutive records
+Block = Tuple[List[str], np.ndarray, List[str], List[Dict[str, Any]]]
+
+
+def _kind_of(value: Any) -> str:
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    return "json"
+
+
+class _StringWriter:
+    """Values as UTF-8 concatenated in ``<name>.bin``, with ``uint64`` end offsets in ``<name>.offsets.npy``."""
+
+    def __init__(self, directory: str, name: str):
+        self.directory = directory
+        self.name = name
+        self._data = open(os.path.join(directory, name + ".bin"), 'wb')
+        self._ends = array('Q')
+        self._position = 0
+
+    def append(self, values: List[str]):
+        for value in values:
+            encoded = value.encode('utf-8')
+            self._data.write(encoded)
+            self._position += len(encoded)
+            self._ends.append(self._position)
+
+    def close(self) -> List[str]:
+        self._data.close()
+        np.save(os.path.join(self.directory, self.name + ".offsets.npy"), np.frombuffer(self._ends, dtype=np.uint64))
+        return [self.name + ".bin", self.name + ".offsets.npy"]
+
+
+class _StringReader:
+    def __init__(self, directory: str, name: str):
+        path = os.path.join(directory, name + ".bin")
+        self._data = np.memmap(path, dtype=np.uint8, mode='r') if os.path.getsize(path) else np.empty(0, np.uint8)
+        self._ends = np.load(os.path.join(directory, name + ".offsets.npy"), mmap_mode='r')
+
+    def slice(self, start: int, stop: int) -> List[str]:
+        if start >= stop:
+            return []
+        begin = int(self._ends[start - 1]) if start else 0
+        ends = np.asarray(self._ends[start:stop], dtype=np.int64) - begin
+        raw = bytes(self._data[begin:begin + int(ends[-1])])
+        starts = np.concatenate([[0], ends[:-1]])
+        return [raw[s:e].decode('utf-8') for s, e in zip(starts.tolist(), ends.tolist())]
+
+
+class _MetadataWriter:
+    """One metadata field, streamed to disk as a column.
+
+    The column is typed (int64, float64 or bool, fixed width in
+    ``<name>.values.bin``) while every value fits, and becomes JSON strings
+    the first time one does not. ``<name>.mask.npy`` marks the rows that
+    carry the field.
+    """
+
+    def __init__(self, directory: str, name: str, rows_before: int):
+        self.directory = directory
+        self.name = name
+        self.kind: Optional[str] = None
+        self.mask = bytearray(rows_before)
+        self._values = None
+        self._strings: Optional[_StringWriter] = None
+
+    @property
+    def _values_path(self) -> str:
+        return os.path.join(self.directory, self.name + ".values.bin")
+
+    def _widen(self, kinds: Set[str]):
+        kinds = kinds | ({self.kind} if self.kind else set())
+        kind = kinds.pop() if len(kinds) == 1 else "float" if kinds <= {"int", "float"} else "json"
+        if kind == self.kind:
+            return
+        previous, self.kind = self.kind, kind
+        if previous is None:
+            # Rows before the field first appeared are placeholders
+            self._open()
+            self._write([None] * len(self.mask), [False] * len(self.mask))
+            return
+        self._values.close()
+        written = np.fromfile(self._values_path, dtype=_TYPED_COLUMNS[previous])
+        os.remove(self._values_path)
+        self._open()
+        mask = np.frombuffer(bytes(self.mask), dtype=np.uint8).astype(bool)
+        self._write(written.tolist(), mask.tolist())
+
+    def _open(self):
+        if self.kind == "json":
+            self._strings = _StringWriter(self.directory, self.name)
+        else:
+            self._values = open(self._values_path, 'wb')
+
+    def _write(self, values: List[Any], present: List[bool]):
+        if self.kind == "json":
+            self._strings.append([json.dumps(v) if has else "" for v, has in zip(values, present)])
+        else:
+            typed = np.array([v if has else 0 for v, has in zip(values, present)], dtype=_TYPED_COLUMNS[self.kind])
+            self._values.write(typed.tobytes())
+
+    def append(self, values: List[Any], present: List[bool]):
+        kinds = {_kind_of(value) for value, has in zip(values, present) if has}
+        if kinds:
+            self._widen(kinds)
+        if self.kind is not None:
+            self._write(values, present)
+        self.mask.extend(1 if has else 0 for has in present)
+
+    def close(self) -> Tuple[str, List[str]]:
+        np.save(os.path.join(self.directory, self.name + ".mask.npy"), np.frombuffer(bytes(self.mask), dtype=np.uint8))
+        files = [self.name + ".mask.npy"]
+        if self.kind == "json":
+            files += self._strings.close()
+        elif self.kind is not None:
+            self._values.close()
+            files.append(self.name + ".values.bin")
+        return self.kind or "json", files
+
+
+class _MetadataReader:
+    def __init__(self, directory: str, name: str, kind: str):
+        self.kind = kind
+        self.mask = np.load(os.path.join(directory, name + ".mask.npy"), mmap_mode='r')
+        if kind == "json":
+            self._strings = _StringReader(directory, name) if os.path.exists(
+                os.path.join(directory, name + ".bin")) else None
+        else:
+            path = os.path.join(directory, name + ".values.bin")
+            dtype = _TYPED_COLUMNS[kind]
+            self._values = np.memmap(path, dtype=dtype, mode='r') if os.path.getsize(path) else np.empty(0, dtype)
+
+    def slice(self, start: int, stop: int) -> List[Tuple[bool, Any]]:
+        present = np.asarray(self.mask[start:stop], dtype=bool).tolist()
+        if self.kind == "json":
+            values = [json.loads(s) if s else None for s in self._strings.slice(start, stop)] \
+                if self._strings is not None else [None] * len(present)
+        else:
+            values = np.asarray(self._values[start:stop]).tolist()
+        return list(zip(present, values))
+
+
+class SnapshotWriter:
+    """Streams a collection into a snapshot directory one block at a time.
+
+    Vectors go into a preallocated, memory-mapped ``vectors.npy`` (float32,
+    or int8 codes plus per-row scales in ``vector_scales.npy``); ids, texts
+    and each metadata field are written as separate columns. Memory use is
+    one block plus a few bytes of offsets and masks per record. The
+    snapshot is built in ``<path>.tmp`` and renamed into place by ``close``.
+    """
+
+    def __init__(self, path: str, dimension: int, count: int, vector_dtype: str = "float32",
+                 overwrite: bool = False):
+        if vector_dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unsupported snapshot vector dtype '{vector_dtype}', expected one of {VECTOR_DTYPES}")
+        if os.path.exists(path) and os.listdir(path) and not overwrite:
+            raise ValueError(f"Snapshot directory {path} already exists and is not empty")
+        self.path = path
+        self.dimension = dimension
+        self.count = count
+        self.vector_dtype = vector_dtype
+        self.directory = path.rstrip(os.sep) + ".tmp"
+        if os.path.exists(self.directory):
+            shutil.rmtree(self.directory)
+        os.makedirs(self.directory)
+
+        self._vectors = np.lib.format.open_memmap(
+            os.path.join(self.directory, "vectors.npy"), mode='w+',
+            dtype=np.float32 if vector_dtype == "float32" else np.int8, shape=(count, dimension)
+        ) if count else None
+        self._scales = np.lib.format.open_memmap(
+            os.path.join(self.directory, "vector_scales.npy"), mode='w+', dtype=np.float32, shape=(count,)
+        ) if count and vector_dtype == "int8" else None
+        self._ids = _StringWriter(self.directory, "ids")
+        self._documents = _StringWriter(self.directory, "documents")
+        self._fields: Dict[str, _MetadataWriter] = {}
+        self.written = 0
+
+    def write(self, block: Block):
+        ids, embeddings, documents, metadatas = block
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.shape != (len(ids), self.dimension):
+            raise ValueError(f"Expected embeddings of shape {(len(ids), self.dimension)}, got {embeddings.shape}")
+        start, stop = self.written, self.written + len(ids)
+        if stop > self.count:
+            raise ValueError(f"Collection grew during export: more than {self.count} records")
+
+        if self.vector_dtype == "int8":
+            scales = np.abs(embeddings).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self._vectors[start:stop] = np.clip(np.rint(embeddings / scales[:, None]), -127, 127)
+            self._scales[start:stop] = scales
+        elif len(ids):
+            self._vectors[start:stop] = embeddings
+        self._ids.append(ids)
+        self._documents.append(documents)
+
+        metadatas = [metadata or {} for metadata in metadatas]
+        for field in sorted({field for metadata in metadatas for field in metadata}):
+            if field not in self._fields:
+                self._fields[field] = _MetadataWriter(self.directory, f"meta_{len(self._fields)}", start)
+        for field, column in self._fields.items():
+            column.append([metadata.get(field) for metadata in metadatas],
+                          [field in metadata for metadata in metadatas])
+        self.written = stop
+
+    def add_file(self, source: str, name: str):
+        """Copy an auxiliary file (lexical index, ingest manifest) into the snapshot."""
+        shutil.copyfile(source, os.path.join(self.directory, name))
+
+    def close(self, info: Dict[str, Any]) -> Dict[str, Any]:
+        """Finish the files, record checksums and ``info`` (model name, metric...) and move the snapshot into place."""
+        if self.written != self.count:
+            raise ValueError(f"Collection changed during export: expected {self.count} records, got {self.written}")
+        for mapped in (self._vectors, self._scales):
+            if mapped is not None:
+                mapped.flush()
+        self._vectors = self._scales = None
+
+        self._ids.close()
+        self._documents.close()
+        columns = {}
+        for field, column in self._fields.items():
+            kind, _ = column.close()
+            columns[field] = {"file": column.name, "kind": kind}
+
+        names = sorted(name for name in os.listdir(self.directory) if name != MANIFEST_FILE)
+        files = {name: IngestManifest.file_hash(os.path.join(self.directory, name)) for name in names}
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_VERSION,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "count": self.count,
+            "dimension": self.dimension,
+            "vector_dtype": self.vector_dtype,
+            "columns": columns,
+            "files": files,
+            "checksum": _combined_checksum(files),
+            **info
+        }
+        with open(os.path.join(self.directory, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.replace(self.directory, self.path)
+        return manifest
+
+
+def _combined_checksum(files: Dict[str, str]) -> str:
+    digest = hashlib.sha256()
+    for name in sorted(files):
+        digest.update(f"{name}:{files[name]}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class Snapshot:
+    """Read side of a snapshot directory; every column is memory-mapped, nothing is read up front."""
+
+    def __init__(self, path: str):
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            raise ValueError(f"{path} is not a snapshot: {MANIFEST_FILE} is missing")
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+        if self.manifest.get("format") != SNAPSHOT_FORMAT or self.manifest.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot format {self.manifest.get('format')} "
+                             f"version {self.manifest.get('version')}")
+        self.path = path
+        self.count: int = self.manifest["count"]
+        self.dimension: int = self.manifest["dimension"]
+        self.model_name: Optional[str] = self.manifest.get("model_name")
+        self._vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode='r') if self.count else None
+        self._scales = np.load(os.path.join(path, "vector_scales.npy"), mmap_mode='r') \
+            if self.count and self.manifest["vector_dtype"] == "int8" else None
+        self._ids = _StringReader(path, "ids")
+        self._documents = _StringReader(path, "documents")
+        self._columns = {field: _MetadataReader(path, column["file"], column["kind"])
+                         for field, column in self.manifest["columns"].items()}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def verify(self):
+        """Recompute every file's SHA-256 and raise ValueError on any mismatch."""
+        files = self.manifest["files"]
+        if _combined_checksum(files) != self.manifest["checksum"]:
+            raise ValueError(f"Snapshot {self.path}: manifest checksum mismatch")
+        for name, expected in files.items():
+            path = os.path.join(self.path, name)
+            if not os.path.exists(path):
+                raise ValueError(f"Snapshot {self.path}: {name} is missing")
+            if IngestManifest.file_hash(path) != expected:
+                raise ValueError(f"Snapshot {self.path}: checksum mismatch in {name}")
+
+    def check_compatible(self, model_name: str, dimension: int):
+        """Raise ValueError unless the snapshot was built with this embedding model and dimension."""
+        if self.model_name != model_name:
+            raise ValueError(f"Snapshot {self.path} was built with embedding model '{self.model_name}', "
+                             f"not '{model_name}'; re-embed instead of importing it")
+        if self.dimension != dimension:
+            raise ValueError(f"Snapshot {self.path} has dimension {self.dimension}, expected {dimension}")
+
+    def vectors(self, start: int, stop: int) -> np.ndarray:
+        """float32 vectors of rows ``start:stop`` (int8 snapshots are dequantized)."""
+        if self._vectors is None:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        block = np.asarray(self._vectors[start:stop], dtype=np.float32)
+        if self._scales is not None:
+            block *= np.asarray(self._scales[start:stop])[:, None]
+        return block
+
+    def metadatas(self, start: int, stop: int) -> List[Dict[str, Any]]:
+        rows: List[Dict[str, Any]] = [{} for _ in range(start, stop)]
+        for field, column in self._columns.items():
+            for row, (present, value) in zip(rows, column.slice(start, stop)):
+                if present:
+                    row[field] = value
+        return rows
+
+    def iter_blocks(self, block_size: int = 4096) -> Iterator[Block]:
+        for start in range(0, self.count, block_size):
+            stop = min(start + block_size, self.count)
+            yield (self._ids.slice(start, stop), self.vectors(start, stop),
+                   self._documents.slice(start, stop), self.metadatas(start, stop))
+
+    def file(self, name: str) -> Optional[str]:
+        """Path of an auxiliary file in the snapshot, or None when it was not exported."""
+        path = os.path.join(self.path, name)
+        return path if name in self.manifest["files"] and os.path.exists(path) else None
@@ -0,0 +1,703 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: a local index is not guarded against a second process
+    fcntl = None
+
+from src.ann_index import FlatIndex, IVFIndex, QuantizedIndex, create_index, recall_report
+from src.append_log import AppendLog
+from src.metadata_filter import MetadataIndex, Where
+
+logger = logging.getLogger(__name__)
+
+Metadata = Dict[str, Union[str, int, float, bool]]
+
+
+class BackendRequestError(Exception):
+    """A backend request the server answered with an HTTP error ``status_code``."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class VectorBackend(ABC):
+    """Storage and search interface used by VectorStore.
+
+    Query results use the ChromaDB layout: a dict of ``ids``, ``documents``,
+    ``metadatas`` and ``distances``, each holding one list per query.
+    """
+
+    # Largest number of chunks accepted per upsert() call; None means unlimited
+    max_batch_size: Optional[int] = None
+    # Largest upsert request payload in bytes; None means unlimited
+    max_batch_bytes: Optional[int] = None
+    # Upsert calls that may run at once; 1 for backends that are not thread-safe
+    max_concurrency: Optional[int] = None
+    # Request bytes per embedding dimension, used to estimate batch payloads
+    embedding_bytes_per_dim: int = 4
+
+    def __init__(self, collection_name: str):
+        self.collection_name = collection_name
+
+    @abstractmethod
+    def connect(self) -> None:
+        """Open (or create) the collection."""
+
+    @abstractmethod
+    def upsert(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Metadata]):
+        """Insert chunks with their precomputed embeddings, replacing any with the same id."""
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        """Remove chunks by id; unknown ids are ignored."""
+
+    @abstractmethod
+    def query(self, query_embeddings: np.ndarray, n_results: int,
+              where: Optional[Where] = None) -> Dict[str, List[List[Any]]]:
+        """Return the ``n_results`` nearest chunks for every query embedding, among chunks matching ``where``."""
+
+    @abstractmethod
+    def get(self, ids: Optional[List[str]] = None) -> Dict[str, List[Any]]:
+        """Fetch chunks by id (all chunks when ``ids`` is None) as flat ``ids`` / ``documents`` / ``metadatas`` lists."""
+
+    @abstractmethod
+    def iter_records(self, batch_size: int) -> Iterator[Tuple[List[str], np.ndarray, List[str], List[Metadata]]]:
+        """Yield every chunk as ``(ids, embeddings, documents, metadatas)`` blocks of at most ``batch_size``."""
+
+    def iter_documents(self, batch_size: int) -> Iterator[Tuple[List[str], List[str]]]:
+        """Yield every chunk as ``(ids, documents)`` blocks of at most ``batch_size``."""
+        for ids, _, documents, _ in self.iter_records(batch_size):
+            yield ids, documents
+
+    @abstractmethod
+    def filter_ids(self, where: Where) -> List[str]:
+        """Ids of every chunk whose metadata matches ``where``."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of chunks in the collection."""
+
+    @abstractmethod
+    def delete_collection(self):
+        """Drop the collection and everything stored in it."""
+
+    @abstractmethod
+    def list_collections(self) -> List[str]:
+        """Names of all collections reachable from this backend."""
+
+    def persist(self):
+        """Flush pending writes to durable storage. No-op for remote backends."""
+
+    def info(self) -> Dict[str, Union[str, int]]:
+        """Backend specific details reported by get_collection_info."""
+        return {}
+
+
+class ChromaCloudBackend(VectorBackend):
+    """Collection hosted on ChromaDB Cloud."""
+
+    # Used when the server does not report its own limit (see connect)
+    max_batch_size = 10
+    max_batch_bytes = 4 * 2**20
+    # Embeddings travel as JSON float lists, ~20 characters per dimension
+    embedding_bytes_per_dim = 20
+
+    def __init__(self, collection_name: str, api_key: Optional[str], tenant: str, database: str,
+                 metric: str = "cosine"):
+        super().__init__(collection_name)
+        self.metric = metric
+        self.api_key = api_key
+        self.tenant = tenant
+        self.database = database
+        self.client = None
+        self.collection = None
+
+    def connect(self):
+        import chromadb
+
+        if not self.api_key:
+            raise ValueError("ChromaDB API key not set.")
+
+        self.client = chromadb.CloudClient(
+            api_key=self.api_key,
+            tenant=self.tenant,
+            database=self.database
+        )
+
+        try:
+            self.max_batch_size = self.client.get_max_batch_size()
+        except Exception:
+            pass
+
+        try:
+            collections = self.client.list_collections()
+            logger.info("Connected to ChromaDB. Available collections: %s", [c.name for c in collections])
+        except Exception as e:
+            raise PermissionError(f"ChromaDB authentication error: {e}")
+
+        try:
+            # Embeddings are always computed locally by EmbeddingsManager,
+            # so the collection must not carry an embedding function of its own.
+            self.collection = self.client.get_collection(name=self.collection_name, embedding_function=None)
+            logger.info("Using existing collection: '%s'", self.collection_name)
+        except:
+            self.collection = self.client.create_collection(
+                name=self.collection_name,
+                embedding_function=None,
+                metadata={"hnsw:space": self.metric}
+            )
+            logger.info("Created new collection: '%s'", self.collection_name)
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.collection.upsert(
+            ids=ids,
+            embeddings=np.asarray(embeddings, dtype=np.float32).tolist(),
+            documents=documents,
+            metadatas=metadatas
+        )
+
+    def delete(self, ids):
+        self.collection.delete(ids=ids)
+
+    def query(self, query_embeddings, n_results, where=None):
+        # The server applies the filter inside its index, before ranking
+        return self.collection.query(
+            query_embeddings=np.asarray(query_embeddings, dtype=np.float32).tolist(),
+            n_results=n_results,
+            where=where,
+            include=['documents', 'metadatas', 'distances']
+        )
+
+    def get(self, ids=None):
+        return self.collection.get(ids=ids, include=['documents', 'metadatas'])
+
+    def filter_ids(self, where):
+        return self.collection.get(where=where, include=[])["ids"]
+
+    def iter_records(self, batch_size):
+        for offset in range(0, self.collection.count(), batch_size):
+            page = self.collection.get(limit=batch_size, offset=offset,
+                                       include=['embeddings', 'documents', 'metadatas'])
+            yield (page["ids"], np.asarray(page["embeddings"], dtype=np.float32).reshape(len(page["ids"]), -1),
+                   page["documents"], [metadata or {} for metadata in page["metadatas"]])
+
+    def iter_documents(self, batch_size):
+        # Without the embeddings, which make up most of each page
+        for offset in range(0, self.collection.count(), batch_size):
+            page = self.collection.get(limit=batch_size, offset=offset, include=['documents'])
+            yield page["ids"], page["documents"]
+
+    def count(self):
+        return self.collection.count()
+
+    def delete_collection(self):
+        self.client.delete_collection(name=self.collection_name)
+
+    def list_collections(self):
+        return [collection.name for collection in self.client.list_collections()]
+
+    def info(self):
+        return {"database": self.database, "tenant": self.tenant, "metric": self.metric}
+
+
+class ReadWriteLock:
+    """Any number of readers or one writer; a waiting writer holds back new readers."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._condition:
+            while self._writer or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+
+# Index files this process has claimed: path -> (lock file, LocalBackend instances using it)
+_claimed_indexes: Dict[str, List[Any]] = {}
+_claimed_lock = threading.Lock()
+
+
+def _claim_index(path: str):
+    """Take an exclusive, process-wide lock on a local index so a second process cannot open it."""
+    path = os.path.abspath(path)
+    with _claimed_lock:
+        if path in _claimed_indexes:
+            _claimed_indexes[path][1] += 1
+            return
+        lock_file = open(path, 'a+')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                raise ConnectionError(
+                    f"Local index lock {path} is held by another process. A local index belongs to "
+                    f"one process: run the API with a single worker, or use Chroma Cloud."
+                )
+        _claimed_indexes[path] = [lock_file, 1]
+
+
+def _release_index(path: str):
+    path = os.path.abspath(path)
+    with _claimed_lock:
+        claim = _claimed_indexes.get(path)
+        if claim is None:
+            return
+        claim[1] -= 1
+        if claim[1] == 0:
+            claim[0].close()  # closing the file drops the flock
+            del _claimed_indexes[path]
+
+
+class LocalBackend(VectorBackend):
+    """In-process vector index (exact or IVF, see ``src/ann_index.py``).
+
+    Vectors live in ``<index_dir>/<collection>.npy`` and are memory-mapped on
+    load; ids, documents and metadata live in the ``.meta.json`` snapshot
+    plus the ``.meta.log`` journal (``src/append_log.py``) of upserts and
+    deletes made since it was written. A persist after appends writes the
+    new rows into the index files' spare capacity and appends to the
+    journal. Updates and deletes rewrite the index files, and the snapshot
+    is rewritten (and the journal emptied) once the journal holds more
+    records than the collection, so a persist stays proportional to the
+    change and a run of appending persists costs amortised linear I/O.
+
+    Queries run concurrently with each other; upserts, deletes and persists
+    take the write side of a readers-writer lock, so a query never sees the
+    index and the id lists out of step. The index belongs to one process:
+    ``connect`` locks ``<collection>.lock`` and fails if another process
+    holds it.
+    """
+
+    # BulkWriter sends one upsert at a time; each takes the write lock anyway
+    max_concurrency = 1
+
+    def __init__(self, collection_name: str, index_dir: str, dim: int, metric: str = "cosine",
+                 index_type: str = "flat", **index_options):
+        super().__init__(collection_name)
+        self.index_dir = index_dir
+        self.index: FlatIndex = create_index(index_type, dim, metric, **index_options)
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Metadata] = []
+        self._id_to_row: Dict[str, int] = {}
+        self.metadata_index = MetadataIndex()
+        self._dirty = False
+        self._pending: List[Dict[str, Any]] = []  # journal entries not yet persisted
+        self._log = AppendLog(self.index_prefix + ".meta.log")
+        self._generation = 0  # snapshot number; a journal from another generation is stale
+        self._rw_lock = ReadWriteLock()
+        self._claimed = False
+
+    @property
+    def index_prefix(self) -> str:
+        return os.path.join(self.index_dir, self.collection_name)
+
+    @property
+    def lock_path(self) -> str:
+        return self.index_prefix + ".lock"
+
+    def close(self):
+        """Release the process lock on the index files."""
+        if self._claimed:
+            _release_index(self.lock_path)
+            self._claimed = False
+
+    @property
+    def meta_path(self) -> str:
+        return self.index_prefix + ".meta.json"
+
+    @property
+    def log_path(self) -> str:
+        return self._log.path
+
+    def connect(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        if not self._claimed:
+            _claim_index(self.lock_path)
+            self._claimed = True
+        with self._rw_lock.write():
+            self._connect()
+
+    def _connect(self):
+        if not os.path.exists(self.meta_path):
+            logger.info("Created new local collection: '%s'", self.collection_name)
+            return
+
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        stored_metric = meta.get("metric", self.index.metric)
+        stored_dim = meta.get("dimension", self.index.dim)
+        if (stored_metric, stored_dim) != (self.index.metric, self.index.dim):
+            raise ValueError(
+                f"Local collection '{self.collection_name}' was built with metric={stored_metric}, "
+                f"dimension={stored_dim}; config expects metric={self.index.metric}, dimension={self.index.dim}"
+            )
+
+        self.ids = meta["ids"]
+        self.documents = meta["documents"]
+        self.metadatas = meta["metadatas"]
+        self._generation = meta.get("generation", 0)
+        self._id_to_row = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+        self._replay_log()
+        self.metadata_index.invalidate()
+        self.index.load(self.index_prefix, len(self.ids))
+        logger.info("Using existing local collection: '%s' (%d chunks)", self.collection_name, len(self.ids))
+
+    def _replay_log(self):
+        """Apply the journal entries written since the snapshot to the id lists."""
+        for entry in self._log.read(self._generation):
+            if entry["op"] == "upsert":
+                self._apply_upsert(entry["ids"], entry["documents"], entry["metadatas"])
+            else:
+                self._apply_delete(entry["ids"])
+
+    def _apply_upsert(self, ids, documents, metadatas) -> Tuple[List[int], List[int], List[int]]:
+        """Update the id lists; returns the new positions and the existing positions and rows."""
+        new_positions: List[int] = []
+        existing_positions: List[int] = []
+        existing_rows: List[int] = []
+        for position, (chunk_id, document, metadata) in enumerate(zip(ids, documents, metadatas)):
+            row = self._id_to_row.get(chunk_id)
+            if row is None:
+                self._id_to_row[chunk_id] = len(self.ids)
+                self.ids.append(chunk_id)
+                self.documents.append(document)
+                self.metadatas.append(metadata)
+                self.metadata_index.add(len(self.ids) - 1, metadata)
+                new_positions.append(position)
+            else:
+                if metadata != self.metadatas[row]:
+                    self.metadata_index.invalidate()
+                self.documents[row] = document
+                self.metadatas[row] = metadata
+                existing_positions.append(position)
+                existing_rows.append(row)
+        return new_positions, existing_positions, existing_rows
+
+    def _apply_delete(self, ids) -> np.ndarray:
+        """Drop ``ids`` from the id lists; returns the keep mask over the old rows."""
+        keep = np.ones(len(self.ids), dtype=bool)
+        keep[[self._id_to_row[chunk_id] for chunk_id in ids]] = False
+        self.ids = [chunk_id for chunk_id, kept in zip(self.ids, keep) if kept]
+        self.documents = [document for document, kept in zip(self.documents, keep) if kept]
+        self.metadatas = [metadata for metadata, kept in zip(self.metadatas, keep) if kept]
+        self._id_to_row = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+        self.metadata_index.invalidate()
+        return keep
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        with self._rw_lock.write():
+            self._upsert(ids, embeddings, documents, metadatas)
+
+    def _upsert(self, ids, embeddings, documents, metadatas):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        ids, documents, metadatas = list(ids), list(documents), list(metadatas)
+        new_positions, existing_positions, existing_rows = self._apply_upsert(ids, documents, metadatas)
+        if new_positions:
+            self.index.add(embeddings[new_positions])
+        if existing_rows:
+            self.index.update(np.asarray(existing_rows), embeddings[existing_positions])
+        self._pending.append({"op": "upsert", "ids": ids, "documents": documents, "metadatas": metadatas})
+        self._dirty = True
+
+    def delete(self, ids):
+        with self._rw_lock.write():
+            self._delete(ids)
+
+    def _delete(self, ids):
+        ids = [chunk_id for chunk_id in dict.fromkeys(ids) if chunk_id in self._id_to_row]
+        if not ids:
+            return
+        self.index.remove(np.asarray([self._id_to_row[chunk_id] for chunk_id in ids]))
+        self._apply_delete(ids)
+        self._pending.append({"op": "delete", "ids": ids})
+        self._dirty = True
+
+    def _format_results(self, distances: np.ndarray, rows: np.ndarray) -> Dict[str, List[List[Any]]]:
+        results: Dict[str, List[List[Any]]] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for row_distances, row_ids in zip(distances, rows):
+            keep = row_ids >= 0
+            row_ids = row_ids[keep].tolist()
+            results["ids"].append([self.ids[r] for r in row_ids])
+            results["documents"].append([self.documents[r] for r in row_ids])
+            results["metadatas"].append([self.metadatas[r] for r in row_ids])
+            results["distances"].append(row_distances[keep].tolist())
+        return results
+
+    def query(self, query_embeddings, n_results, where=None):
+        with self._rw_lock.read():
+            if where is None:
+                distances, rows = self.index.search(query_embeddings, n_results)
+                return self._format_results(distances, rows)
+            # Pre-filter: only rows that match are scored
+            subset = self.metadata_index.rows(where, self.metadatas)
+            distances, rows = self.index.search(query_embeddings, n_results, subset=subset)
+            return self._format_results(distances, rows)
+
+    def filter_ids(self, where):
+        with self._rw_lock.read():
+            return [self.ids[row] for row in self.metadata_index.rows(where, self.metadatas)]
+
+    def iter_records(self, batch_size):
+        # Holds the read lock until exhausted, so an export sees one consistent collection
+        with self._rw_lock.read():
+            for start in range(0, len(self.ids), batch_size):
+                stop = min(start + batch_size, len(self.ids))
+                yield (self.ids[start:stop], np.asarray(self.index.vectors[start:stop]),
+                       self.documents[start:stop], self.metadatas[start:stop])
+
+    def load_records(self, count: int, blocks: Iterator[Tuple[List[str], np.ndarray, List[str], List[Metadata]]]):
+        """Replace the collection with ``count`` records streamed from ``blocks``.
+
+        Vectors are written straight into the index file in bounded memory
+        and memory-mapped, instead of being appended in RAM and saved.
+        """
+        with self._rw_lock.write():
+            self._load_records(count, blocks)
+
+    def _load_records(self, count: int, blocks: Iterator[Tuple[List[str], np.ndarray, List[str], List[Metadata]]]):
+        self._delete_collection()
+        os.makedirs(self.index_dir, exist_ok=True)
+        ids, documents, metadatas = [], [], []
+
+        def vectors():
+            for block_ids, embeddings, block_documents, block_metadatas in blocks:
+                ids.extend(block_ids)
+                documents.extend(block_documents)
+                metadatas.extend(block_metadatas)
+                yield embeddings
+
+        self.index.write_file(self.index_prefix, vectors(), count)
+        if len(ids) != count:
+            raise ValueError(f"Expected {count} records, got {len(ids)}")
+        self.ids, self.documents, self.metadatas = ids, documents, metadatas
+        self._id_to_row = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+        self.metadata_index.invalidate()
+        self._save_meta()
+        self.index.load(self.index_prefix, count)
+        if type(self.index) is not FlatIndex:
+            # Save the IVF lists or quantized codes built while loading, so the next start reuses them
+            self.index.save(self.index_prefix)
+
+    def recall_report(self, query_embeddings: np.ndarray, k: int = 10) -> Dict[str, float]:
+        """Recall@k of the configured index against exact search."""
+        with self._rw_lock.read():
+            return recall_report(self.index, query_embeddings, k)
+
+    def get(self, ids=None):
+        with self._rw_lock.read():
+            if ids is None:
+                rows = range(len(self.ids))
+            else:
+                rows = [self._id_to_row[chunk_id] for chunk_id in ids if chunk_id in self._id_to_row]
+            return {
+                "ids": [self.ids[r] for r in rows],
+                "documents": [self.documents[r] for r in rows],
+                "metadatas": [self.metadatas[r] for r in rows]
+            }
+
+    def count(self):
+        return len(self.ids)
+
+    def persist(self):
+        with self._rw_lock.write():
+            if not self._dirty:
+                return
+            os.makedirs(self.index_dir, exist_ok=True)
+
+            # Index files first: rows past the recorded count, or a torn temporary file, are ignored on load
+            self.index.save(self.index_prefix)
+            pending = sum(len(entry["ids"]) for entry in self._pending)
+            if not os.path.exists(self.meta_path) or self._log.records + pending > len(self.ids):
+                self._save_meta()
+            else:
+                self._log.append(self._generation, self._pending)
+                self._pending = []
+            self._dirty = False
+
+    def _save_meta(self):
+        """Compact: write the whole id lists as a new snapshot and drop the journal."""
+        self._generation += 1
+        tmp_meta = self.meta_path + ".tmp"
+        with open(tmp_meta, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({
+                "metric": self.index.metric,
+                "dimension": self.index.dim,
+                "generation": self._generation,
+                "ids": self.ids,
+                "documents": self.documents,
+                "metadatas": self.metadatas
+            }))
+        os.replace(tmp_meta, self.meta_path)
+        # The journal's generation no longer matches, so a crash here leaves it ignored
+        self._log.reset()
+        self._pending = []
+
+    def delete_collection(self):
+        with self._rw_lock.write():
+            self._delete_collection()
+
+    def _delete_collection(self):
+        for suffix in (".npy", ".ivf.npz", ".assignments.npy", ".codes.npy", ".scales.npy", ".meta.json",
+                       ".meta.log"):
+            if os.path.exists(self.index_prefix + suffix):
+                os.remove(self.index_prefix + suffix)
+        self.index = create_index(self.index.index_type, self.index.dim, self.index.metric,
+                                  **self._index_options())
+        self.ids, self.documents, self.metadatas = [], [], []
+        self._id_to_row = {}
+        self.metadata_index.invalidate()
+        self._pending = []
+        self._log.records = 0
+        self._dirty = False
+
+    def _index_options(self) -> Dict[str, Any]:
+        if isinstance(self.index, IVFIndex):
+            return {"nlist": self.index.nlist, "nprobe": self.index.nprobe,
+                    "min_train_size": self.index.min_train_size}
+        if isinstance(self.index, QuantizedIndex):
+            return {"quantization": self.index.quantization, "rescore_factor": self.index.rescore_factor}
+        return {}
+
+    def list_collections(self):
+        if not os.path.isdir(self.index_dir):
+            return []
+        suffix = ".meta.json"
+        return sorted(name[:-len(suffix)] for name in os.listdir(self.index_dir) if name.endswith(suffix))
+
+    def info(self):
+        with self._rw_lock.read():
+            return {"index_dir": self.index_dir, **self.index.info(),
+                    "metadata_index": self.metadata_index.stats()}
+
+
+class FaultInjectingBackend(VectorBackend):
+    """Wraps another backend and makes its upserts slow and unreliable, for exercising BulkWriter.
+
+    Each upsert waits ``latency_ms``, then fails with a retryable HTTP 503
+    with probability ``failure_rate``, and is rejected as too large (HTTP
+    413) when it exceeds ``max_records`` records. Upserts that get
+    through are forwarded under a lock, so a non-thread-safe backend such
+    as ``LocalBackend`` can sit behind concurrent writers. ``fail_after``
+    makes every upsert after the first ``fail_after`` successful ones fail
+    permanently, to simulate an ingest that dies part way.
+    """
+
+    def __init__(self, inner: VectorBackend, failure_rate: float = 0.1, latency_ms: float = 0.0,
+                 max_records: Optional[int] = None, fail_after: Optional[int] = None, seed: int = 0):
+        super().__init__(inner.collection_name)
+        self.inner = inner
+        self.failure_rate = failure_rate
+        self.latency_ms = latency_ms
+        self.max_records = max_records
+        self.fail_after = fail_after
+        self.max_batch_size = inner.max_batch_size
+        self.max_batch_bytes = inner.max_batch_bytes
+        self.embedding_bytes_per_dim = inner.embedding_bytes_per_dim
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.injected_failures = 0
+        self.rejected_batches = 0
+        self.successful_upserts = 0
+
+    def connect(self):
+        self.inner.connect()
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        with self._lock:
+            self.calls += 1
+            if self.fail_after is not None and self.successful_upserts >= self.fail_after:
+                raise PermissionError("Injected permanent failure")
+            if self.max_records is not None and len(ids) > self.max_records:
+                self.rejected_batches += 1
+                raise BackendRequestError(f"Payload too large: {len(ids)} records, limit {self.max_records}", 413)
+            if self._random.random() < self.failure_rate:
+                self.injected_failures += 1
+                raise BackendRequestError("Injected failure: service unavailable", 503)
+            self.inner.upsert(ids, embeddings, documents, metadatas)
+            self.successful_upserts += 1
+
+    def delete(self, ids):
+        with self._lock:
+            self.inner.delete(ids)
+
+    def query(self, query_embeddings, n_results, where=None):
+        return self.inner.query(query_embeddings, n_results, where)
+
+    def get(self, ids=None):
+        return self.inner.get(ids)
+
+    def filter_ids(self, where):
+        return self.inner.filter_ids(where)
+
+    def iter_records(self, batch_size):
+        return self.inner.iter_records(batch_size)
+
+    def iter_documents(self, batch_size):
+        return self.inner.iter_documents(batch_size)
+
+    def count(self):
+        return self.inner.count()
+
+    def delete_collection(self):
+        self.inner.delete_collection()
+
+    def list_collections(self):
+        return self.inner.list_collections()
+
+    def persist(self):
+        with self._lock:
+            self.inner.persist()
+
+    def info(self):
+        return {
+            **self.inner.info(),
+            "fault_injection": {
+                "calls": self.calls,
+                "injected_failures": self.injected_failures,
+                "rejected_batches": self.rejected_batches
+            }
+        }
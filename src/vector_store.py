@@ -1,12 +1,28 @@
-import chromadb
+import hashlib
+import logging
 import os
-from utils.config_file import VectorStoreConfig
-from typing import List, Dict, Union
+import shutil
+from utils.config_file import SnapshotConfig, VectorStoreConfig
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 import numpy as np
 from dotenv import load_dotenv, find_dotenv
+from src.bulk_writer import BulkWriteError, BulkWriter, UpsertProgress
+from src.chunker import TextChunker
+from src.lexical_index import LexicalIndex
+from src.metadata_filter import Where, filter_key, validate_where
+from src.metrics import metrics
+from src.snapshot import INGEST_MANIFEST_FILE, LEXICAL_FILE, Snapshot, SnapshotWriter
+from src.vector_backends import VectorBackend, ChromaCloudBackend, LocalBackend
 
 load_dotenv(find_dotenv())
 
+logger = logging.getLogger(__name__)
+
+def chunk_id_for(source: str, text: str) -> str:
+    """Stable chunk ID derived from the chunk's source and content."""
+    return hashlib.sha256(f"{source}\0{text}".encode('utf-8')).hexdigest()[:32]
+
+
 class VectorStore:
     def __init__(self):
         # Collection name is separate from database connection
@@ -14,161 +30,422 @@ class VectorStore:
         self.api_key = os.getenv("CHROMADB_API_KEY")
         self.tenant = getattr(VectorStoreConfig, 'TENANT', 'd8058fce-0e9b-431f-9577-bb1a4de75a4f')
         self.database = "data-gathering"
-        self.client = None
-        self.collection = None
-        self.max_chunk_size = 15000
-
-    def chunk_text(self, text: str, max_size: int | None = None) -> List[str]:
-        """Split text into chunks that fit within ChromaDB's size limits."""
-        if max_size is None:
-            max_size = self.max_chunk_size
-        
-        words = text.split()
-        chunks: List[str] = []
-        current_chunk = []
-        current_size = 0
-        
-        for word in words:
-            word_size = len(word.encode('utf-8')) + 1
-            
-            if current_size + word_size > max_size and current_chunk:
-                chunks.append(' '.join(current_chunk))
-                current_chunk = [word]
-                current_size = word_size
+        self.backend_type = os.getenv("VECTOR_STORE_BACKEND", getattr(VectorStoreConfig, 'BACKEND', 'chroma_cloud'))
+        self.local_index_dir = getattr(VectorStoreConfig, 'LOCAL_INDEX_DIR', 'data/vector_index')
+        self.distance_metric = getattr(VectorStoreConfig, 'DISTANCE_METRIC', 'cosine')
+        self.vector_size = getattr(VectorStoreConfig, 'VECTOR_SIZE', 384)
+        self.index_type = getattr(VectorStoreConfig, 'INDEX_TYPE', 'flat')
+        self.client: VectorBackend | None = None
+        # BM25 index over the same chunks, kept beside the local vector index
+        self.lexical_index: LexicalIndex | None = None
+        self._lexical_dirty = False
+        # Bumped on every write so caches built on search results can invalidate
+        self.collection_version = 0
+        # Whitespace tokens until the ingest workflow plugs in the model's tokenizer
+        self.chunker = TextChunker()
+        # Journal of persisted chunk ids for a resumable ingest, set by the ingest workflow
+        self.progress: Optional[UpsertProgress] = None
+        self.writer: Optional[BulkWriter] = None
+        # Chunk ids per metadata filter for the BM25 leg, valid for one collection version
+        self._filter_ids: Dict[str, Set[str]] = {}
+        self._filter_ids_version = -1
+
+    def chunk_text(self, text: str) -> List[str]:
+        """Split text into token windows sized for the embedding model."""
+        return [chunk.text for chunk in self.chunker.chunk(text)]
+
+    def create_client(self) -> VectorBackend:
+        """Create or recreate the configured vector backend and validate access."""
+        try:
+            if self.backend_type == "local":
+                index_options = {}
+                quantization = getattr(VectorStoreConfig, 'QUANTIZATION', 'none')
+                if quantization != "none":
+                    index_options = {
+                        "quantization": quantization,
+                        "rescore_factor": getattr(VectorStoreConfig, 'RESCORE_FACTOR', 4)
+                    }
+                if self.index_type == "ivf":
+                    index_options.update({
+                        "nlist": getattr(VectorStoreConfig, 'IVF_NLIST', 0),
+                        "nprobe": getattr(VectorStoreConfig, 'IVF_NPROBE', 8),
+                        "min_train_size": getattr(VectorStoreConfig, 'IVF_MIN_TRAIN_SIZE', 10000)
+                    })
+                backend: VectorBackend = LocalBackend(
+                    self.collection_name, self.local_index_dir, self.vector_size,
+                    self.distance_metric, self.index_type, **index_options
+                )
+            elif self.backend_type == "chroma_cloud":
+                backend = ChromaCloudBackend(
+                    self.collection_name, self.api_key, self.tenant, self.database, self.distance_metric
+                )
             else:
-                current_chunk.append(word)
-                current_size += word_size
-        
-        # Add final chunk
-        if current_chunk:
-            chunks.append(' '.join(current_chunk))
-        
+                raise ValueError(f"Unknown vector store backend: {self.backend_type}")
+
+            backend.connect()
+            self.client = backend
+            self._load_lexical_index()
+            return self.client
+
+        except Exception as e:
+            raise ConnectionError(f"Failed to connect to vector store ({self.backend_type}): {e}")
+
+    @property
+    def lexical_index_path(self) -> str:
+        return os.path.join(self.local_index_dir, f"{self.collection_name}.lexical.npz")
+
+    def _load_lexical_index(self):
+        """Load the BM25 index, rebuilding it from the backend when it is missing."""
+        if os.path.exists(self.lexical_index_path):
+            self.lexical_index = LexicalIndex.load(self.lexical_index_path)
+            return
+        self.lexical_index = LexicalIndex()
+        if self.client.count() > 0:
+            # Page through the collection rather than fetching it in one request
+            batch_size = self.client.max_batch_size or getattr(SnapshotConfig, 'BLOCK_SIZE', 4096)
+            for ids, documents in self.client.iter_documents(batch_size):
+                self.lexical_index.add(ids, documents)
+            self._lexical_dirty = True
+            logger.info("Rebuilt lexical index for '%s' (%d chunks)", self.collection_name, len(self.lexical_index))
+
+    def prepare_chunks(self, documents: List[str], metadatas: Optional[List[Dict[str, Union[str, int]]]] = None
+                       ) -> Tuple[List[str], List[Dict[str, Union[str, int]]], List[str]]:
+        """Split documents into chunks and build the matching metadata and IDs.
+
+        Each chunk carries its document's entry of ``metadatas``; ``source``
+        defaults to ``"upload"`` and ``document_id`` to the document's
+        position only when that entry does not set them.
+        """
+        all_chunks: List[str] = []
+        all_metadatas: List[Dict[str, Union[str, int]]] = []
+        all_ids: List[str] = []
+        seen_ids = set()
+
+        for i, doc in enumerate(documents):
+            document_metadata = dict(metadatas[i]) if metadatas else {}
+            document_metadata.setdefault("source", "upload")
+            document_metadata.setdefault("document_id", i)
+            num_chunks = 0
+            for chunk, metadata, chunk_id in self.iter_chunks([(str(document_metadata["source"]), 1, doc)]):
+                num_chunks += 1
+                if chunk_id in seen_ids:
+                    continue  # identical content is stored once
+                seen_ids.add(chunk_id)
+                metadata.update(document_metadata)
+                all_chunks.append(chunk)
+                all_metadatas.append(metadata)
+                all_ids.append(chunk_id)
+            logger.debug("Document %d chunked into %d pieces", i, num_chunks)
+
+        return all_chunks, all_metadatas, all_ids
+
+    def iter_chunks(self, pages: Iterable[Tuple[str, int, str]]) -> Iterator[Tuple[str, Dict[str, Union[str, int]], str]]:
+        """Lazily chunk a stream of ``(source, page_no, text)`` pages.
+
+        Yields ``(chunk, metadata, id)`` so chunks can be embedded and stored
+        in batches without holding whole documents in memory. Chunks never
+        cross a page, so each carries its page number. IDs are content
+        hashes, so repeated text within one source (running headers, blank
+        template pages) is yielded once.
+        """
+        current_source, seen_ids = None, set()
+        for source, page_no, text in pages:
+            if source != current_source:
+                current_source, seen_ids = source, set()
+            document_id = hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]
+            with metrics.stage("chunk"):
+                chunks = self.chunker.chunk(text)
+            if metrics.enabled:
+                metrics.inc("rag_chunks_total", len(chunks))
+                metrics.inc("rag_tokens_total", sum(chunk.token_count for chunk in chunks), stage="chunk")
+            for j, chunk in enumerate(chunks):
+                chunk_id = chunk_id_for(source, chunk.text)
+                if chunk_id in seen_ids:
+                    continue
+                seen_ids.add(chunk_id)
+                metadata = {
+                    "source": source,
+                    "document_id": document_id,
+                    "page": page_no,
+                    "chunk_id": j,
+                    "total_chunks": len(chunks),
+                    "token_count": chunk.token_count,
+                    "start_char": chunk.start_char
+                }
+                yield chunk.text, metadata, chunk_id
+
+    def add_chunks(self, chunks: List[str], metadatas: List[Dict[str, Union[str, int]]],
+                   ids: List[str], embeddings: np.ndarray):
+        """Upsert pre-chunked documents with their precomputed embeddings."""
+        if self.client is None:
+            self.create_client()
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or embeddings.shape[0] != len(chunks):
+            raise ValueError(
+                f"Expected one embedding per chunk ({len(chunks)}), got array of shape {embeddings.shape}"
+            )
+        self._check_dimension(embeddings)
+
+        if self.writer is None or self.writer.backend is not self.client:
+            self.writer = BulkWriter(self.client)
+        try:
+            with metrics.stage("upsert"):
+                committed = self.writer.write(ids, embeddings, chunks, metadatas)
+        except BulkWriteError as e:
+            # Keep what did get written consistent with the lexical index and the journal
+            self._record_upserted(e.committed, dict(zip(ids, chunks)))
+            if "Quota exceeded" in str(e):
+                logger.warning("ChromaDB quota exceeded. Consider smaller documents, a paid plan, "
+                               "or the local backend (VECTOR_STORE_BACKEND=local)")
+                raise ConnectionError(f"ChromaDB quota exceeded: {e}")
+            raise ConnectionError(f"Failed to update vector store collection: {e}")
+        self._record_upserted(committed, dict(zip(ids, chunks)))
+        logger.debug("Upserted %d chunks (%s)", len(committed), self.writer.stats)
+
+    def _record_upserted(self, ids: List[str], texts: Dict[str, str]):
+        if not ids:
+            return
+        self.lexical_index.add(ids, [texts[chunk_id] for chunk_id in ids])
+        if self.progress is not None:
+            self.progress.stage(ids)
+        metrics.inc("rag_upserted_chunks_total", len(ids))
+        self._lexical_dirty = True
+        self.collection_version += 1
+
+    def delete_chunks(self, ids: List[str]):
+        """Remove chunks by id, e.g. stale chunks of a re-ingested file."""
+        if not ids:
+            return
+        if self.client is None:
+            self.create_client()
+
+        try:
+            batch_size = self.client.max_batch_size or len(ids)
+            for i in range(0, len(ids), batch_size):
+                self.client.delete(ids[i:i+batch_size])
+            self.lexical_index.delete(ids)
+            self._lexical_dirty = True
+            self.collection_version += 1
+            logger.info("Deleted %d stale chunks", len(ids))
+        except Exception as e:
+            raise ConnectionError(f"Failed to delete chunks from vector store: {e}")
+
+    def update_collection(self, documents: List[str], embeddings: np.ndarray | None = None, *,
+                          encode: Optional[Callable[[List[str]], np.ndarray]] = None,
+                          metadatas: Optional[List[Dict[str, Union[str, int]]]] = None) -> List[str]:
+        """Chunk ``documents`` and add the chunks; returns them.
+
+        ``embeddings`` are precomputed, one row per returned chunk (e.g.
+        from a previous ``prepare_chunks`` call). Otherwise ``encode``,
+        typically ``EmbeddingsManager.encode``, embeds exactly the chunks
+        that are stored. ``metadatas`` gives per-document metadata, as in
+        ``prepare_chunks``.
+        """
+        if embeddings is None and encode is None:
+            raise ValueError("update_collection needs precomputed embeddings or an encode function")
+        chunks, chunk_metadatas, ids = self.prepare_chunks(documents, metadatas)
+        self.add_chunks(chunks, chunk_metadatas, ids, encode(chunks) if embeddings is None else embeddings)
+        self.persist()
+        logger.info("Added %d chunks from %d documents", len(chunks), len(documents))
         return chunks
 
-    def create_client(self):
-        """Create or recreate the ChromaDB client and validate access."""
+    def persist(self):
+        """Flush buffered writes (local backend, lexical index) after a batch of add_chunks calls."""
+        if self.client is not None:
+            self.client.persist()
+        if self.lexical_index is not None and self._lexical_dirty:
+            self.lexical_index.save(self.lexical_index_path)
+            self._lexical_dirty = False
+        # Only now are the staged chunks durable in both indexes
+        if self.progress is not None:
+            self.progress.commit()
+
+    def search(self, query_embedding: np.ndarray, n_results: int = 5, where: Optional[Where] = None):
+        """Search for documents similar to a precomputed query embedding.
+
+        ``where`` is a ChromaDB-style metadata filter, e.g.
+        ``{"source": "week3.pdf"}`` or ``{"$and": [{"source": {"$in": [...]}}, {"page": {"$lte": 40}}]}``.
+        """
+        return self.search_many(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1), n_results, where)
+
+    def search_many(self, query_embeddings: np.ndarray, n_results: int = 5, where: Optional[Where] = None):
+        """Search for many query embeddings in one backend call.
+
+        Results use the ChromaDB layout with one inner list per query.
+        Chunks not matching ``where`` are excluded before scoring.
+        """
+        validate_where(where)
+        if self.client is None:
+            self.create_client()
+        
         try:
-            if not self.api_key:
-                raise ValueError("ChromaDB API key not set.")
-            
-            self.client = chromadb.CloudClient(
-                api_key=self.api_key,
-                tenant=self.tenant,
-                database=self.database
-            )
-            
+            query_embeddings = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+            self._check_dimension(query_embeddings)
+            return self.client.query(query_embeddings, n_results=n_results, where=where)
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ConnectionError(f"Failed to search in vector store: {e}")
+
+    def lexical_search(self, query: str, n_results: int = 5,
+                       where: Optional[Where] = None) -> List[Tuple[str, float]]:
+        """BM25 search over chunk text; returns ``(chunk_id, score)`` pairs, best first."""
+        validate_where(where)
+        if self.client is None:
+            self.create_client()
+        allowed_ids = self.filter_ids(where) if where is not None else None
+        return self.lexical_index.search(query, n_results, allowed_ids)
+
+    def filter_ids(self, where: Where) -> Set[str]:
+        """Ids of the chunks matching a metadata filter, cached until the collection changes."""
+        if self.client is None:
+            self.create_client()
+        if self._filter_ids_version != self.collection_version:
+            self._filter_ids = {}
+            self._filter_ids_version = self.collection_version
+        key = filter_key(where)
+        if key not in self._filter_ids:
             try:
-                collections = self.client.list_collections()
-                print(f"Connected to ChromaDB. Available collections: {[c.name for c in collections]}")
+                self._filter_ids[key] = set(self.client.filter_ids(where))
             except Exception as e:
-                raise PermissionError(f"ChromaDB authentication error: {e}")
-            
-            try:
-                self.collection = self.client.get_collection(name=self.collection_name)
-                print(f"Using existing collection: '{self.collection_name}'")
-            except:
-                self.collection = self.client.create_collection(name=self.collection_name)
-                print(f"Created new collection: '{self.collection_name}'")
-            
-            return self.client
-            
+                raise ConnectionError(f"Failed to filter chunks in vector store: {e}")
+        return self._filter_ids[key]
+
+    def get_chunks(self, ids: List[str]) -> Dict[str, List]:
+        """Fetch stored chunks by id (flat ``ids`` / ``documents`` / ``metadatas`` lists)."""
+        if self.client is None:
+            self.create_client()
+
+        try:
+            return self.client.get(ids)
         except Exception as e:
-            raise ConnectionError(f"Failed to connect to ChromaDB: {e}")
+            raise ConnectionError(f"Failed to fetch chunks from vector store: {e}")
+
+    def export_snapshot(self, path: str, model_name: str, vector_dtype: Optional[str] = None,
+                        ingest_manifest_path: Optional[str] = None, overwrite: bool = False) -> Dict:
+        """Write the collection to a snapshot directory that ``import_snapshot`` can load elsewhere.
 
-    def update_collection(self, documents: List[str], embeddings: np.ndarray | None = None):
-        """Update collection with documents, chunking large documents."""
+        Records stream out of the backend in ``SnapshotConfig.BLOCK_SIZE``
+        blocks into a columnar snapshot (``src/snapshot.py``) with per-file
+        checksums and ``model_name``. The BM25 index and, when given, the
+        ingest manifest are copied along, so the importing side needs no
+        rebuild and can keep ingesting incrementally. Returns the snapshot
+        manifest.
+        """
         if self.client is None:
             self.create_client()
-        
+        self.persist()
+
+        writer = None
         try:
-            all_chunks: List[str] = []
-            all_metadatas: List[Dict[str, Union[str, int]]] = []
-            all_ids: List[str] = []
-
-            
-            for i, doc in enumerate(documents):
-                # Check document size
-                doc_size = len(doc.encode('utf-8'))
-                print(f"Document {i} size: {doc_size} bytes")
-                
-                if doc_size > self.max_chunk_size:
-                    # Chunk large documents
-                    chunks = self.chunk_text(doc)
-                    print(f"Document {i} chunked into {len(chunks)} pieces")
-                    
-                    for j, chunk in enumerate(chunks):
-                        all_chunks.append(chunk)
-                        all_metadatas.append({
-                            "source": "upload",
-                            "document_id": i,
-                            "chunk_id": j,
-                            "total_chunks": len(chunks),
-                            "original_size": doc_size
-                        })
-                        all_ids.append(f"doc_{i}_chunk_{j}")
-                else:
-                    all_chunks.append(doc)
-                    all_metadatas.append({
-                        "source": "upload",
-                        "document_id": i,
-                        "chunk_id": 0,
-                        "total_chunks": 1,
-                        "original_size": doc_size
-                    })
-                    all_ids.append(f"doc_{i}_chunk_0")
-            
-            # Add chunks in batches to avoid overwhelming the API
-            batch_size = 10
-            for i in range(0, len(all_chunks), batch_size):
-                batch_chunks = all_chunks[i:i+batch_size]
-                batch_metadatas = all_metadatas[i:i+batch_size]
-                batch_ids = all_ids[i:i+batch_size]
-                
-                self.collection.add(
-                    documents=batch_chunks,
-                    metadatas=batch_metadatas,
-                    ids=batch_ids
-                )
-                print(f"Added batch {i//batch_size + 1}: {len(batch_chunks)} chunks")
-            
-            print(f"Successfully added {len(all_chunks)} chunks from {len(documents)} documents")
-            
+            writer = SnapshotWriter(path, self.vector_size, self.client.count(),
+                                    vector_dtype or getattr(SnapshotConfig, 'VECTOR_DTYPE', 'float32'), overwrite)
+            for block in self.client.iter_records(getattr(SnapshotConfig, 'BLOCK_SIZE', 4096)):
+                writer.write(block)
+            if self.lexical_index is not None:
+                # Fold the journal into the snapshot file, which is all that gets copied
+                self.lexical_index.save(self.lexical_index_path, compact=True)
+                writer.add_file(self.lexical_index_path, LEXICAL_FILE)
+            if ingest_manifest_path and os.path.exists(ingest_manifest_path):
+                writer.add_file(ingest_manifest_path, INGEST_MANIFEST_FILE)
+            manifest = writer.close({
+                "model_name": model_name,
+                "collection_name": self.collection_name,
+                "metric": self.distance_metric,
+                "source_backend": self.backend_type
+            })
         except Exception as e:
-            if "Quota exceeded" in str(e):
-                print(f"ChromaDB quota exceeded. Consider:")
-                print("1. Using smaller documents")
-                print("2. Upgrading to a paid plan")
-                print("3. Using a local vector store like FAISS")
-                raise ConnectionError(f"ChromaDB quota exceeded: {e}")
-            raise ConnectionError(f"Failed to update ChromaDB collection: {e}")
+            if writer is not None and os.path.exists(writer.directory):
+                shutil.rmtree(writer.directory, ignore_errors=True)
+            if isinstance(e, ValueError):
+                raise
+            raise ConnectionError(f"Failed to export collection '{self.collection_name}': {e}")
+        logger.info("Exported %d chunks to snapshot %s", manifest["count"], path)
+        return manifest
 
-    def search(self, query: str, n_results: int = 5):
-        """Search for similar documents in the collection."""
+    def import_snapshot(self, path: str, model_name: str, replace: bool = False, verify: Optional[bool] = None,
+                        ingest_manifest_path: Optional[str] = None) -> Dict:
+        """Load a snapshot written by ``export_snapshot`` into this collection, without re-embedding.
+
+        Raises ValueError when a checksum does not match, when the snapshot
+        was built with another embedding model, dimension or distance
+        metric, or when the collection already holds chunks and ``replace``
+        is not set. The local backend writes the vectors straight into its
+        memory-mapped index file; other backends receive bulk upserts.
+        Returns the snapshot manifest.
+        """
+        snapshot = Snapshot(path)
+        if verify if verify is not None else getattr(SnapshotConfig, 'VERIFY_ON_IMPORT', True):
+            snapshot.verify()
+        snapshot.check_compatible(model_name, self.vector_size)
+        if snapshot.manifest.get("metric", self.distance_metric) != self.distance_metric:
+            raise ValueError(f"Snapshot {path} uses distance metric '{snapshot.manifest['metric']}', "
+                             f"collection uses '{self.distance_metric}'")
         if self.client is None:
             self.create_client()
-        
+        if self.client.count() and not replace:
+            raise ValueError(f"Collection '{self.collection_name}' is not empty; pass replace=True to overwrite it")
+
+        block_size = getattr(SnapshotConfig, 'BLOCK_SIZE', 4096)
         try:
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results,
-                include=['documents', 'metadatas', 'distances']
-            )
-            return results
+            if isinstance(self.client, LocalBackend):
+                self.client.load_records(len(snapshot), snapshot.iter_blocks(block_size))
+            else:
+                if self.client.count():
+                    self.client.delete_collection()
+                    self.client.connect()
+                writer = BulkWriter(self.client)
+                for ids, embeddings, documents, metadatas in snapshot.iter_blocks(block_size):
+                    writer.write(ids, embeddings, documents, metadatas)
+        except ValueError:
+            raise
         except Exception as e:
-            raise ConnectionError(f"Failed to search in ChromaDB: {e}")
+            raise ConnectionError(f"Failed to import snapshot into '{self.collection_name}': {e}")
+
+        # Take the snapshot's BM25 index as is; without one it is rebuilt from the backend
+        lexical_path = snapshot.file(LEXICAL_FILE)
+        LexicalIndex.delete_files(self.lexical_index_path)
+        if lexical_path:
+            os.makedirs(os.path.dirname(self.lexical_index_path) or ".", exist_ok=True)
+            shutil.copyfile(lexical_path, self.lexical_index_path)
+        self._load_lexical_index()
+        manifest_copy = snapshot.file(INGEST_MANIFEST_FILE)
+        if ingest_manifest_path and manifest_copy:
+            os.makedirs(os.path.dirname(ingest_manifest_path) or ".", exist_ok=True)
+            shutil.copyfile(manifest_copy, ingest_manifest_path)
+        self.collection_version += 1
+        self.persist()
+        logger.info("Imported %d chunks from snapshot %s", len(snapshot), path)
+        return snapshot.manifest
+
+    def recall_report(self, query_embeddings: np.ndarray, k: int = 10) -> Dict[str, float]:
+        """Recall@k of the local ANN index measured against exact search."""
+        if self.client is None:
+            self.create_client()
+        if not isinstance(self.client, LocalBackend):
+            raise ValueError("Recall reports are only available for the local backend")
+        return self.client.recall_report(query_embeddings, k)
+
+    def _check_dimension(self, embeddings: np.ndarray):
+        """Reject vectors that do not match VectorStoreConfig.VECTOR_SIZE."""
+        if embeddings.shape[1] != self.vector_size:
+            raise ValueError(
+                f"Embedding dimension {embeddings.shape[1]} does not match VECTOR_SIZE={self.vector_size}"
+            )
 
     def get_collection_info(self) -> Dict[str, Union[str, int]]:
         """Get information about the current collection."""
-        if self.client is None or self.collection is None:
+        if self.client is None:
             self.create_client()
         
         try:
-            count = self.collection.count()
+            count = self.client.count()
             return {
                 "collection_name": self.collection_name,
                 "document_count": count,
-                "database": self.database,
-                "tenant": self.tenant
+                "backend": self.backend_type,
+                **self.client.info()
             }
         except Exception as e:
             raise ConnectionError(f"Failed to get collection info: {e}")
@@ -179,8 +456,12 @@ class VectorStore:
             self.create_client()
         
         try:
-            self.client.delete_collection(name=self.collection_name)
-            print(f"Collection '{self.collection_name}' deleted successfully from database '{self.database}'")
+            self.client.delete_collection()
+            self.lexical_index = LexicalIndex()
+            self._lexical_dirty = False
+            LexicalIndex.delete_files(self.lexical_index_path)
+            self.collection_version += 1
+            logger.info("Deleted collection '%s' from the %s backend", self.collection_name, self.backend_type)
         except Exception as e:
             raise ConnectionError(f"Failed to delete collection: {e}")
 
@@ -190,7 +471,6 @@ class VectorStore:
             self.create_client()
         
         try:
-            collections = self.client.list_collections()
-            return [collection.name for collection in collections]
+            return self.client.list_collections()
         except Exception as e:
             raise ConnectionError(f"Failed to list collections: {e}")
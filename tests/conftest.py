@@ -0,0 +1,85 @@
+import hashlib
+import re
+
+import numpy as np
+import pytest
+
+from src import model_registry
+from utils.config_file import EmbeddingsConfig, IngestConfig, VectorStoreConfig
+
+DIM = 64
+
+
+class HashingModel:
+    """Bag-of-hashed-words encoder with the SentenceTransformer surface the pipeline uses."""
+
+    tokenizer = None
+    max_seq_length = 256
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return DIM
+
+    def encode(self, texts, batch_size: int = 32, **kwargs) -> np.ndarray:
+        out = np.zeros((len(texts), DIM), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+                out[i, int.from_bytes(digest[:4], "little") % DIM] += 1.0 if digest[4] & 1 else -1.0
+        return out
+
+    def similarity(self, a, b):
+        a = a / np.clip(np.linalg.norm(a, axis=1, keepdims=True), 1e-12, None)
+        b = b / np.clip(np.linalg.norm(b, axis=1, keepdims=True), 1e-12, None)
+        return a @ b.T
+
+
+@pytest.fixture
+def offline(tmp_path, monkeypatch):
+    """Stub LLM, local index under ``tmp_path`` and a hashing embedder in place of the configured model.
+
+    The hashing model is registered in the model registry under the
+    default model's key, so every EmbeddingsManager picks it up without
+    downloading anything.
+    """
+    monkeypatch.setenv("LLM_PROVIDER", "stub")
+    monkeypatch.setenv("VECTOR_STORE_BACKEND", "local")
+    monkeypatch.setattr(VectorStoreConfig, "LOCAL_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setattr(VectorStoreConfig, "VECTOR_SIZE", DIM)
+    monkeypatch.setattr(IngestConfig, "MANIFEST_DIR", str(tmp_path / "manifests"))
+    monkeypatch.setattr(IngestConfig, "PAGE_CACHE_PATH", str(tmp_path / "page_cache.sqlite"))
+    monkeypatch.setattr(EmbeddingsConfig, "CACHE_DIR", None)
+    model_registry.clear()
+    model_registry.get_model(("sentence_transformer", EmbeddingsConfig.DEFAULT_MODEL), HashingModel)
+    yield tmp_path
+    model_registry.clear()
+
+
+def _write_pdf(path, pages):
+    """A minimal PDF with one line of Helvetica text per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects)} 0 R "
+                       f"/Resources << /Font << /F1 3 0 R >> >> >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+@pytest.fixture
+def write_pdf():
+    """``write_pdf(path, pages)`` writes a text PDF with one page per string, so tests need no fixture files."""
+    return _write_pdf
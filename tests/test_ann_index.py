@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.ann_index import FlatIndex, IVFIndex, QuantizedIndex
+
+DIM = 16
+
+
+def saved_index(tmp_path, quantization):
+    vectors = np.random.default_rng(0).normal(size=(200, DIM)).astype(np.float32)
+    index = QuantizedIndex(DIM, quantization=quantization)
+    index.add(vectors)
+    prefix = str(tmp_path / "docs")
+    index.save(prefix)
+    return index, prefix, vectors
+
+
+@pytest.mark.parametrize("missing", [".codes.npy", ".scales.npy"])
+def test_int8_load_reencodes_when_a_code_file_is_missing(tmp_path, missing):
+    index, prefix, vectors = saved_index(tmp_path, "int8")
+    os.remove(prefix + missing)
+
+    loaded = QuantizedIndex(DIM, quantization="int8")
+    loaded.load(prefix, len(vectors))
+    np.testing.assert_array_equal(loaded._codes[:len(vectors)], index._codes[:len(vectors)])
+    np.testing.assert_allclose(loaded._scales[:len(vectors)], index._scales[:len(vectors)])
+    np.testing.assert_array_equal(loaded.search(vectors[:5], 3)[1], index.search(vectors[:5], 3)[1])
+
+
+def test_load_reencodes_codes_of_another_size(tmp_path):
+    _, prefix, vectors = saved_index(tmp_path, "int8")
+    np.save(prefix + ".scales.npy", np.ones(10, dtype=np.float32))  # torn write: codes and scales disagree
+
+    loaded = QuantizedIndex(DIM, quantization="int8")
+    loaded.load(prefix, len(vectors))
+    assert loaded._scales[:len(vectors)].shape == (len(vectors),)
+    assert loaded.search(vectors[7:8], 1)[1][0, 0] == 7
+
+
+def test_binary_load_needs_no_scales(tmp_path):
+    index, prefix, vectors = saved_index(tmp_path, "binary")
+    assert not os.path.exists(prefix + ".scales.npy")
+
+    loaded = QuantizedIndex(DIM, quantization="binary")
+    loaded.load(prefix, len(vectors))
+    np.testing.assert_array_equal(loaded._codes, index._codes[:len(vectors)])
+
+
+@pytest.mark.parametrize("index_type", [FlatIndex, IVFIndex, QuantizedIndex])
+def test_save_appends_new_rows_in_place(tmp_path, index_type):
+    options = {"min_train_size": 100, "retrain_factor": 100} if index_type is IVFIndex else {}
+    vectors = np.random.default_rng(0).normal(size=(300, DIM)).astype(np.float32)
+    index = index_type(DIM, **options)
+    index.add(vectors[:200])
+    prefix = str(tmp_path / "docs")
+    index.save(prefix)
+    files = sorted(p for p in os.listdir(tmp_path) if p.endswith(".npy"))
+    inodes = {name: os.stat(tmp_path / name).st_ino for name in files}
+
+    index.add(vectors[200:300])
+    index.save(prefix)
+    # Written into the spare rows, not replaced by a new file
+    assert {name: os.stat(tmp_path / name).st_ino for name in files} == inodes
+    assert np.load(prefix + ".npy", mmap_mode='r').shape[0] > 300
+
+    for size in (200, 300):  # rows past the recorded count are ignored
+        loaded = index_type(DIM, **options)
+        loaded.load(prefix, size)
+        assert len(loaded) == size
+        np.testing.assert_allclose(loaded.vectors, index.vectors[:size])
+        assert loaded.search(vectors[size - 1:size], 1)[1][0, 0] == size - 1
+
+    # Changing a saved row rewrites the files
+    index.update(np.array([5]), vectors[6:7])
+    index.save(prefix)
+    assert os.stat(prefix + ".npy").st_ino != inodes["docs.npy"]
+    loaded = index_type(DIM, **options)
+    loaded.load(prefix, 300)
+    np.testing.assert_allclose(loaded.vectors, index.vectors)
@@ -0,0 +1,65 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")  # fastapi.testclient needs it
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from api.server import app  # noqa: E402
+from utils.config_file import IngestConfig, RAGSystemConfig  # noqa: E402
+
+BIOLOGY = "Mitosis divides one cell into two identical daughter cells. Its phases are prophase, metaphase and anaphase."
+PHYSICS = "Newton's second law says force equals mass times acceleration."
+
+
+@pytest.fixture
+def client(offline, monkeypatch):
+    root = offline / "uploads"
+    (root / "course").mkdir(parents=True)
+    (root / "course" / "physics.txt").write_text(PHYSICS)
+    monkeypatch.setattr(IngestConfig, "API_INGEST_ROOT", str(root))
+    monkeypatch.setattr(RAGSystemConfig, "WARM_UP_ON_START", False)
+    with TestClient(app) as client:
+        yield client
+        client.app.state.vector_store.client.close()
+
+
+def test_ingest_search_and_ask(client):
+    response = client.post("/ingest", json={"documents": [{"source": "biology.txt", "text": BIOLOGY}],
+                                             "directory": "course"})
+    assert response.status_code == 200, response.text
+    assert response.json()["chunks_from_documents"] == 1
+
+    hits = client.post("/search", json={"query": "force mass acceleration", "n_results": 2}).json()
+    assert [hit["metadata"]["source"] for hit in hits["retrieved_documents"]] == ["physics.txt", "biology.txt"]
+    scoped = client.post("/search", json={"query": "force", "where": {"source": "biology.txt"}}).json()
+    assert {hit["metadata"]["source"] for hit in scoped["retrieved_documents"]} == {"biology.txt"}
+
+    answer = client.post("/ask", json={"query": "What are the phases of mitosis?"}).json()
+    assert answer["response"].startswith("[stub answer]")
+    assert answer["retrieved_documents"][0]["metadata"]["source"] == "biology.txt"
+
+    with client.stream("POST", "/ask/stream", json={"query": "What are the phases of mitosis?"}) as stream:
+        assert stream.status_code == 200
+        streamed = "".join(stream.iter_text())
+    assert streamed.startswith("[stub answer]")
+    assert "prophase" in streamed
+
+
+@pytest.mark.parametrize("directory", ["..", "../..", "/etc", "course/../../index", "escape"])
+def test_ingest_rejects_directories_outside_the_root(client, offline, directory):
+    (offline / "uploads" / "escape").symlink_to(offline / "index", target_is_directory=True)
+    response = client.post("/ingest", json={"directory": directory})
+    assert response.status_code == 400
+    assert "inside the ingest root" in response.json()["detail"]
+
+
+def test_directory_ingest_can_be_disabled(client, monkeypatch):
+    monkeypatch.setattr(IngestConfig, "API_INGEST_ROOT", None)
+    assert client.post("/ingest", json={"directory": "course"}).status_code == 403
+
+
+def test_bad_requests(client):
+    assert client.post("/ingest", json={}).status_code == 400
+    assert client.post("/ingest", json={"directory": "missing"}).status_code == 400
+    assert client.post("/search", json={"query": "x", "where": {"page": {"$gt": "one"}}}).status_code == 400
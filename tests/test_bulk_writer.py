@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from src.bulk_writer import BulkWriteError, BulkWriter, UpsertProgress, is_retryable, is_too_large
+from src.lexical_index import LexicalIndex
+from src.vector_backends import BackendRequestError, FaultInjectingBackend, LocalBackend
+from src.vector_store import VectorStore
+
+DIM = 4
+
+
+def records(count: int):
+    ids = [f"chunk-{i}" for i in range(count)]
+    embeddings = np.random.default_rng(0).normal(size=(count, DIM)).astype(np.float32)
+    return ids, embeddings, [f"text {i}" for i in range(count)], [{"n": i} for i in range(count)]
+
+
+class ScriptedBackend(LocalBackend):
+    """Local backend whose next upserts raise the queued errors."""
+
+    def __init__(self, path, errors=(), reject_over=None):
+        super().__init__("docs", str(path), DIM)
+        self.errors = list(errors)
+        self.reject_over = reject_over
+        self.calls = 0
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.calls += 1
+        if self.reject_over is not None and len(ids) > self.reject_over:
+            raise BackendRequestError("Request entity too large", 413)
+        if self.errors:
+            raise self.errors.pop(0)
+        super().upsert(ids, embeddings, documents, metadatas)
+
+
+class ChromaQuotaError(Exception):
+    """Shaped like chromadb.errors.QuotaError: the status comes from a code() method."""
+
+    def code(self):
+        return 400
+
+
+class RateLimitError(Exception):
+    pass
+
+
+def writer(backend, **options) -> BulkWriter:
+    return BulkWriter(backend, concurrency=1, sleep=lambda seconds: None, **options)
+
+
+@pytest.mark.parametrize("error, retryable, too_large", [
+    (TimeoutError("read timed out"), True, False),
+    (ConnectionResetError("reset by peer"), True, False),
+    (BackendRequestError("service unavailable", 503), True, False),
+    (BackendRequestError("slow down", 429), True, False),
+    (RateLimitError("slow down"), True, False),
+    (BackendRequestError("too large", 413), False, True),
+    (ChromaQuotaError("Quota exceeded: records per collection"), False, False),
+    (ValueError("Invalid id chunk-503 exceeds payload quota exceeded timeout"), False, False),
+])
+def test_classification_ignores_message_text(error, retryable, too_large):
+    assert is_retryable(error) is retryable
+    assert is_too_large(error) is too_large
+
+
+def test_transient_errors_are_retried(tmp_path):
+    backend = ScriptedBackend(tmp_path, errors=[BackendRequestError("unavailable", 503), TimeoutError()])
+    backend.connect()
+    bulk = writer(backend)
+    assert bulk.write(*records(10)) == [f"chunk-{i}" for i in range(10)]
+    assert bulk.stats["retries"] == 2
+    assert backend.count() == 10
+
+
+def test_permanent_errors_fail_at_once(tmp_path):
+    backend = ScriptedBackend(tmp_path, errors=[ChromaQuotaError("Quota exceeded")])
+    backend.connect()
+    with pytest.raises(BulkWriteError):
+        writer(backend).write(*records(10))
+    assert backend.calls == 1
+
+
+def test_too_large_batches_are_split(tmp_path):
+    backend = ScriptedBackend(tmp_path, reject_over=10)
+    backend.connect()
+    backend.max_batch_size = 40
+    bulk = writer(backend)
+    assert len(bulk.write(*records(100))) == 100
+    assert bulk.stats["splits"] > 0
+    assert bulk.max_batch_size <= 10
+    assert backend.count() == 100
+
+
+def test_splitting_stops_at_the_floor(tmp_path):
+    backend = ScriptedBackend(tmp_path, reject_over=1)
+    backend.connect()
+    backend.max_batch_size = 32
+    with pytest.raises(BulkWriteError):
+        writer(backend, min_split_size=8).write(*records(32))
+    # 32 -> 16 -> 8 and then the 8-record batch fails
+    assert backend.calls == 3
+    assert backend.count() == 0
+
+
+def test_interrupted_ingest_resumes_from_the_journal(tmp_path):
+    journal = str(tmp_path / "docs.progress")
+    ids, embeddings, documents, metadatas = records(50)
+
+    store = VectorStore()
+    store.local_index_dir = str(tmp_path)
+    store.vector_size = DIM
+    inner = LocalBackend("docs", str(tmp_path / "index"), DIM)
+    inner.connect()
+    store.client = FaultInjectingBackend(inner, failure_rate=0.0, fail_after=3)
+    store.client.max_batch_size = 10
+    store.lexical_index = LexicalIndex()
+    store.progress = UpsertProgress(journal)
+    store.writer = writer(store.client)
+    with pytest.raises(ConnectionError):
+        store.add_chunks(documents, metadatas, ids, embeddings)
+    store.persist()
+
+    done = UpsertProgress(journal).done
+    assert done == set(ids[:30]) == set(inner.get()["ids"])
+
+    # Re-run with a healthy backend, skipping what the journal says is stored
+    remaining = [i for i, chunk_id in enumerate(ids) if chunk_id not in done]
+    store.client = inner
+    store.writer = writer(inner)
+    store.add_chunks([documents[i] for i in remaining], [metadatas[i] for i in remaining],
+                     [ids[i] for i in remaining], embeddings[remaining])
+    store.persist()
+    assert inner.count() == 50
+    assert UpsertProgress(journal).done == set(ids)
+    UpsertProgress(journal).clear()
+    assert UpsertProgress(journal).done == set()
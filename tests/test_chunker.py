@@ -0,0 +1,103 @@
+import re
+
+import pytest
+
+from src.chunker import TextChunker
+
+WORDS = [f"w{i}" for i in range(100)]
+
+
+def covered(text, chunks):
+    """Every token of ``text`` lies inside some chunk, and chunks move forward."""
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous.start_char < chunk.start_char and previous.end_char < chunk.end_char
+    for match in re.finditer(r"\S+", text):
+        assert any(c.start_char <= match.start() and match.end() <= c.end_char for c in chunks), match.group()
+
+
+def test_windows_step_by_the_stride():
+    text = " ".join(WORDS)
+    chunks = TextChunker(window_tokens=20, stride_tokens=15).chunk(text)
+
+    assert [chunk.text.split() for chunk in chunks] == \
+        [WORDS[0:20], WORDS[15:35], WORDS[30:50], WORDS[45:65], WORDS[60:80], WORDS[75:95], WORDS[90:100]]
+    assert all(chunk.token_count == len(chunk.text.split()) for chunk in chunks)
+    for chunk in chunks:
+        assert text[chunk.start_char:chunk.end_char] == chunk.text
+    covered(text, chunks)
+
+
+def test_stride_equal_to_window_has_no_overlap():
+    chunks = TextChunker(window_tokens=25, stride_tokens=40).chunk(" ".join(WORDS))
+    assert [chunk.text.split() for chunk in chunks] == [WORDS[i:i + 25] for i in range(0, 100, 25)]
+
+
+@pytest.mark.parametrize("text", ["", "   \n\n  ", "\t"])
+def test_empty_input_has_no_chunks(text):
+    assert TextChunker(window_tokens=20, stride_tokens=15).chunk(text) == []
+
+
+def test_short_input_is_one_chunk():
+    text = "  Mitosis has four phases.\n"
+    chunks = TextChunker(window_tokens=20, stride_tokens=15).chunk(text)
+    assert len(chunks) == 1
+    assert chunks[0].text == "Mitosis has four phases."
+    assert (chunks[0].start_char, chunks[0].token_count) == (2, 4)
+
+
+def test_windows_end_on_sentences_and_paragraphs_without_losing_text():
+    sentences = [" ".join(f"s{i}t{j}" for j in range(7)) + "." for i in range(12)]
+    text = " ".join(sentences[:5]) + "\n\n" + " ".join(sentences[5:])
+    chunks = TextChunker(window_tokens=20, stride_tokens=15).chunk(text)
+
+    assert all(chunk.token_count <= 20 for chunk in chunks)
+    assert all(chunk.text.endswith(".") for chunk in chunks)
+    assert chunks[2].text.endswith(sentences[4])  # stops at the paragraph rather than crossing it
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous.text.split()[-5:] == chunk.text.split()[:5]  # window - stride tokens of overlap
+    covered(text, chunks)
+
+
+def test_next_window_snaps_to_a_sentence_start_in_the_overlap():
+    sentences = [" ".join(f"s{i}t{j}" for j in range(4)) + "." for i in range(20)]
+    text = " ".join(sentences)
+    chunks = TextChunker(window_tokens=20, stride_tokens=15).chunk(text)
+
+    assert [chunk.text for chunk in chunks] == [" ".join(sentences[i:i + 5]) for i in range(0, 20, 4)]
+    covered(text, chunks)
+
+
+def test_text_without_boundaries_is_cut_hard():
+    text = "x" * 10 + " " + " ".join(WORDS[:45])
+    chunks = TextChunker(window_tokens=10, stride_tokens=10).chunk(text)
+    assert [chunk.token_count for chunk in chunks] == [10, 10, 10, 10, 6]
+    covered(text, chunks)
+
+
+def test_for_model_caps_the_window_at_the_model_length():
+    class Model:
+        tokenizer = None
+        max_seq_length = 16
+
+    chunker = TextChunker.for_model(Model(), window_tokens=64, stride_tokens=10)
+    assert (chunker.window_tokens, chunker.stride_tokens) == (14, 10)
+    assert max(chunk.token_count for chunk in chunker.chunk(" ".join(WORDS))) == 14
+
+
+def test_invalid_sizes_are_rejected():
+    with pytest.raises(ValueError):
+        TextChunker(window_tokens=-5)
+
+
+def test_fast_tokenizer_offsets(tmp_path):
+    transformers = pytest.importorskip("transformers")
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "cell", "##s", "divide", "."]
+    (tmp_path / "vocab.txt").write_text("\n".join(vocab))
+    tokenizer = transformers.BertTokenizerFast(vocab_file=str(tmp_path / "vocab.txt"))
+    text = " ".join(["cells divide."] * 12)
+    chunks = TextChunker(tokenizer, window_tokens=8, stride_tokens=6).chunk(text)
+
+    assert all(chunk.token_count <= 8 for chunk in chunks)
+    assert all(text[chunk.start_char:chunk.end_char] == chunk.text for chunk in chunks)
+    assert chunks[0].text == "cells divide. cells divide."  # 4 tokens each sentence, ending on the second
+    covered(text, chunks)
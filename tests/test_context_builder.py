@@ -0,0 +1,60 @@
+import logging
+import sys
+
+import pytest
+
+from src.context_builder import ContextBuilder, TokenCounter
+
+
+class WordTokenizer:
+    """Stands in for the embedding model's tokenizer: one token per word."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text, add_special_tokens=True, **kwargs):
+        self.calls += 1
+        return {"input_ids": list(range(len(text.split())))}
+
+
+@pytest.fixture
+def no_tiktoken(monkeypatch):
+    monkeypatch.setitem(sys.modules, "tiktoken", None)  # import tiktoken raises ImportError
+    monkeypatch.setattr(TokenCounter, "_fallback_logged", False)
+
+
+def test_falls_back_to_the_embedding_tokenizer_and_warns_once(no_tiktoken, caplog):
+    tokenizer = WordTokenizer()
+    loads = []
+
+    def load():
+        loads.append(1)
+        return tokenizer
+
+    with caplog.at_level(logging.WARNING, logger="src.context_builder"):
+        counter = TokenCounter("gpt-4.1-mini", load)
+        assert not counter.exact
+        assert counter.count("mitosis splits one cell into two") == 6
+        assert counter.count("a b") == 2
+        TokenCounter("gpt-4.1-mini", load).count("again")
+    assert len(loads) == 2  # once per counter, not per count
+    assert [record.getMessage() for record in caplog.records if "tiktoken" in record.getMessage()] == [
+        "No tiktoken encoding for gpt-4.1-mini (import of tiktoken halted; None in sys.modules); "
+        "estimating context tokens with the embedding model's tokenizer"
+    ]
+
+
+def test_character_estimate_without_any_tokenizer(no_tiktoken):
+    def unavailable():
+        raise RuntimeError("model not loaded")
+
+    assert TokenCounter("gpt-4.1-mini").count("x" * 10) == 3
+    assert TokenCounter("gpt-4.1-mini", unavailable).count("x" * 10) == 3
+
+
+def test_budget_uses_the_fallback_count(no_tiktoken):
+    builder = ContextBuilder("gpt-4.1-mini", max_tokens=10, min_trim_tokens=2, fallback_tokenizer=WordTokenizer)
+    packed = builder.build([{"content": "one two three four five six. seven eight nine ten eleven twelve."}])
+    assert packed.tokens_used <= 10
+    assert packed.trimmed == 1
+    assert not packed.exact_count
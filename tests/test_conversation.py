@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from src.conversation import SessionCache, condense_query, is_follow_up
+
+
+def user(text: str):
+    return {"role": "user", "content": text}
+
+
+def assistant(text: str):
+    return {"role": "assistant", "content": text}
+
+
+@pytest.mark.parametrize("question", [
+    "What is the function of the enzyme that breaks down starch?",
+    "Define photosynthesis",
+    "Explain photosynthesis",
+    "Why is the sky blue?",
+    "Is there a difference between mitosis and meiosis?",
+    "What is mitosis and its phases?",
+    "How do plants make their food?",
+    "Which organelles have their own DNA?",
+])
+def test_standalone_questions(question):
+    assert not is_follow_up(question)
+
+
+@pytest.mark.parametrize("question", [
+    "why?",
+    "Is it reversible?",
+    "Why does it matter?",
+    "How does that compare to meiosis?",
+    "What are these structures called?",
+    "What about meiosis?",
+    "and in plants?",
+    "Give an example",
+    "Can you explain more?",
+])
+def test_follow_up_questions(question):
+    assert is_follow_up(question)
+
+
+def test_standalone_question_is_not_condensed():
+    history = [user("What is mitosis?"), assistant("Cell division.")]
+    question = "What is the function of the enzyme that breaks down starch?"
+    assert condense_query(question, history) == question
+
+
+def test_follow_up_is_condensed_with_its_anchor():
+    history = [user("What is osmosis?"), assistant("..."), user("What is mitosis?"), assistant("..."),
+               user("Why does it matter?"), assistant("...")]
+    assert condense_query("Give an example", history) == "What is mitosis? Why does it matter? Give an example"
+
+
+def test_condensing_keeps_the_anchor_within_max_turns():
+    history = [user("What is mitosis?"), user("why?"), user("and then?"), user("what else?")]
+    assert condense_query("ok, more?", history, max_turns=2) == "What is mitosis? what else? ok, more?"
+    assert condense_query("why?", [], max_turns=2) == "why?"
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_session_cache_reuses_candidates_until_the_topic_drifts():
+    cache = SessionCache(drift_threshold=0.8)
+    candidates = [{"id": "a", "content": "x", "metadata": {}}]
+    assert cache.match("s", unit(1, 0), version=1) == (None, None)
+    cache.put("s", unit(1, 0), candidates, version=1)
+
+    state, similarity = cache.match("s", unit(1, 0.2), version=1)
+    assert state is not None and state.candidates == candidates and similarity > 0.8
+    state, similarity = cache.match("s", unit(0, 1), version=1)
+    assert state is None and similarity == pytest.approx(0.0)
+    assert cache.stats()["hits"] == 1 and cache.stats()["drifts"] == 1
+
+
+def test_session_cache_drops_sessions_on_version_or_scope_change():
+    cache = SessionCache(drift_threshold=0.5)
+    cache.put("s", unit(1, 0), [], version=1, scope=None)
+    assert cache.match("s", unit(1, 0), version=1, scope='{"source": "a.pdf"}') == (None, None)
+    cache.put("s", unit(1, 0), [], version=1)
+    assert cache.match("s", unit(1, 0), version=2) == (None, None)
+
+
+def test_session_cache_is_bounded():
+    cache = SessionCache(max_sessions=2)
+    for session in ("a", "b", "c"):
+        cache.put(session, unit(1, 0), [], version=1)
+    assert cache.stats()["sessions"] == 2
+    assert cache.match("a", unit(1, 0), version=1) == (None, None)
@@ -0,0 +1,74 @@
+import PyPDF2
+import pytest
+
+from src.document_loader import DocumentLoader
+from utils.config_file import IngestConfig
+
+
+@pytest.fixture
+def library(tmp_path, write_pdf, monkeypatch):
+    monkeypatch.setattr(IngestConfig, "PAGE_CACHE_PATH", str(tmp_path / "page_cache.sqlite"))
+    directory = tmp_path / "docs"
+    directory.mkdir()
+    write_pdf(directory / "biology.pdf", [f"biology page {n}" for n in range(1, 8)])
+    write_pdf(directory / "chemistry.pdf", [f"chemistry page {n}" for n in range(1, 4)])
+    (directory / "notes.txt").write_text("revision notes")
+    (directory / "ignored.md").write_text("not a supported format")
+    return directory
+
+
+@pytest.fixture
+def extractions(monkeypatch):
+    """Pages parsed in this process (the serial loader's), in order."""
+    calls = []
+    extract_text = PyPDF2.PageObject.extract_text
+
+    def counted(page, *args, **kwargs):
+        text = extract_text(page, *args, **kwargs)
+        calls.append(text)
+        return text
+
+    monkeypatch.setattr(PyPDF2.PageObject, "extract_text", counted)
+    return calls
+
+
+EXPECTED = [("biology.pdf", n, f"biology page {n}") for n in range(1, 8)] \
+    + [("chemistry.pdf", n, f"chemistry page {n}") for n in range(1, 4)] + [("notes.txt", 1, "revision notes")]
+
+
+@pytest.mark.parametrize("use_page_cache", [False, True])
+def test_parallel_extraction_matches_the_serial_order(library, use_page_cache):
+    loader = DocumentLoader(str(library), use_page_cache=use_page_cache)
+    assert list(loader.iter_pages(max_workers=1)) == EXPECTED
+    assert list(loader.iter_pages(max_workers=2, pages_per_task=2)) == EXPECTED
+    assert list(loader.iter_pages(max_workers=2, pages_per_task=3, filenames=["notes.txt", "chemistry.pdf"])) == \
+        [EXPECTED[-1]] + EXPECTED[7:10]
+
+
+def test_parallel_ranges_fill_the_page_cache(library, extractions):
+    loader = DocumentLoader(str(library))
+    list(loader.iter_pages(max_workers=2, pages_per_task=2))
+    assert loader.page_cache.stats()["pages"] == 10
+
+    # Everything is cached now: no worker is needed and nothing is parsed again
+    again = DocumentLoader(str(library))
+    assert list(again.iter_pages(max_workers=2, pages_per_task=2)) == EXPECTED
+    assert list(again.iter_pages(max_workers=1)) == EXPECTED
+    assert extractions == []
+
+
+def test_interrupted_extraction_resumes_from_the_cache(library, extractions):
+    path = str(library / "biology.pdf")
+    pages = DocumentLoader(str(library)).iter_pdf_pages(path)
+    assert [next(pages) for _ in range(3)] == [(n, f"biology page {n}") for n in range(1, 4)]
+    pages.close()  # the run dies part way through the file
+    assert len(extractions) == 3
+
+    loader = DocumentLoader(str(library))
+    assert list(loader.iter_pdf_pages(path)) == [(n, f"biology page {n}") for n in range(1, 8)]
+    assert extractions[3:] == [f"biology page {n}" for n in range(4, 8)]  # only the pages not cached yet
+    assert loader.page_cache.hits == 3
+
+    # An edited file has another hash, so none of its old pages are reused
+    library.joinpath("biology.pdf").write_bytes(library.joinpath("chemistry.pdf").read_bytes())
+    assert [text for _, text in loader.iter_pdf_pages(path)] == [f"chemistry page {n}" for n in range(1, 4)]
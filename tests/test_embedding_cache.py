@@ -0,0 +1,87 @@
+import numpy as np
+
+from src import model_registry
+from src.embedding_cache import EmbeddingCache
+from src.embeddings_manager import EmbeddingsManager
+from utils.config_file import EmbeddingsConfig
+
+DIM = 4
+# Digests ending in NUL bytes, which an 'S32' key column used to truncate
+NUL_KEY = b"\x01" * 31 + b"\x00"
+KEYS = [NUL_KEY, b"\x02" * 30 + b"\x00\x00", b"\x03" * 32, b"\x04" * 32]
+
+
+def vector(i: int) -> np.ndarray:
+    return np.full(DIM, i, dtype=np.float32)
+
+
+def disk_cache(path, capacity: int = 2) -> EmbeddingCache:
+    # memory_items=0 forces every lookup through the disk tier
+    return EmbeddingCache("model", DIM, str(path), memory_items=0, disk_items=capacity)
+
+
+def test_evicted_key_ending_in_nul_misses(tmp_path):
+    cache = disk_cache(tmp_path)
+    cache.put_many(KEYS[:3], np.stack([vector(0), vector(1), vector(2)]))
+
+    found, missing = cache.get_many(KEYS[:3])
+    assert missing == [0]  # slot 0 now holds KEYS[2]
+    np.testing.assert_array_equal(found[1], vector(1))
+    np.testing.assert_array_equal(found[2], vector(2))
+
+
+def test_keys_ending_in_nul_survive_reopen(tmp_path):
+    disk_cache(tmp_path).put_many(KEYS[:2], np.stack([vector(0), vector(1)]))
+
+    found, missing = disk_cache(tmp_path).get_many(KEYS[:2])
+    assert missing == []
+    np.testing.assert_array_equal(found[0], vector(0))
+    np.testing.assert_array_equal(found[1], vector(1))
+
+
+def test_processes_sharing_a_directory(tmp_path):
+    writer, reader = disk_cache(tmp_path), disk_cache(tmp_path)
+    writer.put_many([NUL_KEY], vector(0)[None])
+    found, _ = reader.get_many([NUL_KEY])
+    np.testing.assert_array_equal(found[0], vector(0))
+
+    # The other process fills the ring; the reader must not serve NUL_KEY from its stale slot
+    writer.put_many(KEYS[2:4], np.stack([vector(2), vector(3)]))
+    found, missing = reader.get_many([NUL_KEY, KEYS[2], KEYS[3]])
+    assert missing == [0]
+    np.testing.assert_array_equal(found[1], vector(2))
+    np.testing.assert_array_equal(found[2], vector(3))
+
+
+def test_old_key_format_is_discarded(tmp_path):
+    cache = disk_cache(tmp_path)
+    cache.put_many([KEYS[2]], vector(2)[None])
+    header = tmp_path / "model" / "header.json"
+    header.write_text(header.read_text().replace('"format": 2', '"format": 1'))
+
+    _, missing = disk_cache(tmp_path).get_many([KEYS[2]])
+    assert missing == [0]
+
+
+def test_dimension_comes_from_the_tier_or_the_first_write(tmp_path):
+    cache = EmbeddingCache("model", cache_dir=str(tmp_path), memory_items=0, disk_items=2)
+    assert cache.get_many([KEYS[2]]) == ({}, [0])
+    assert not (tmp_path / "model" / "vectors.npy").exists()  # nothing to size it by yet
+
+    cache.put_many([KEYS[2]], vector(2)[None])
+    reopened = EmbeddingCache("model", cache_dir=str(tmp_path), memory_items=0, disk_items=2)
+    assert reopened.dim == DIM
+    found, _ = reopened.get_many([KEYS[2]])
+    np.testing.assert_array_equal(found[0], vector(2))
+
+
+def test_cached_texts_do_not_load_the_model(offline, monkeypatch):
+    monkeypatch.setattr(EmbeddingsConfig, "CACHE_DIR", str(offline / "embedding_cache"))
+    texts = ["cells divide", "plants make starch"]
+    expected = EmbeddingsManager().encode(texts)
+
+    model_registry.clear()  # a new process: nothing loaded, the disk tier holds the vectors
+    manager = EmbeddingsManager()
+    np.testing.assert_array_equal(manager.encode(texts), expected)
+    assert manager.cache.stats()["disk_hits"] == 2
+    assert not manager.is_loaded and not model_registry.loaded_models()
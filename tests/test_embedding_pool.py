@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+import torch  # noqa: E402
+from sentence_transformers import SentenceTransformer, models  # noqa: E402
+from transformers import BertConfig, BertModel, BertTokenizerFast  # noqa: E402
+
+from src.embedding_pool import THREAD_VARIABLES, EmbeddingPool  # noqa: E402
+
+WORDS = "the cell divides into two daughter cells mitosis meiosis an enzyme breaks down starch".split()
+PARENT_ENVIRON = {variable: os.environ.get(variable) for variable in THREAD_VARIABLES}
+TEXTS = [" ".join(WORDS[i % len(WORDS):] + WORDS[:i % 5]) + f" {i}" for i in range(37)]
+
+
+@pytest.fixture(scope="module")
+def model_dir(tmp_path_factory):
+    """A randomly initialised one-layer BERT saved locally, so spawned workers load it without a download."""
+    directory = tmp_path_factory.mktemp("model")
+    (directory / "vocab.txt").write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS))
+    BertTokenizerFast(vocab_file=str(directory / "vocab.txt")).save_pretrained(directory)
+    config = BertConfig(vocab_size=len(WORDS) + 5, hidden_size=16, num_hidden_layers=1, num_attention_heads=2,
+                        intermediate_size=32, max_position_embeddings=64)
+    torch.manual_seed(0)
+    BertModel(config).save_pretrained(directory)
+    modules = [models.Transformer(str(directory), max_seq_length=32), models.Pooling(16, "mean")]
+    SentenceTransformer(modules=modules, device="cpu").save(str(directory / "sentence_transformer"))
+    return str(directory / "sentence_transformer")
+
+
+@pytest.fixture(scope="module")
+def pool(model_dir):
+    pool = EmbeddingPool(model_dir, workers=2, threads_per_worker=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_output_rows_follow_input_order(pool, model_dir):
+    expected = SentenceTransformer(model_dir, device="cpu").encode(TEXTS, batch_size=4)
+    # 37 texts in shards of 12, 12, 12 and 1 across two workers
+    np.testing.assert_allclose(pool.encode(TEXTS, batch_size=4), expected, atol=1e-5)
+    np.testing.assert_allclose(pool.encode(TEXTS[::-1], batch_size=4), expected[::-1], atol=1e-5)
+    assert pool.encode([], batch_size=4).shape == (0, expected.shape[1])
+
+
+def test_workers_start_with_the_thread_variables(pool):
+    executor = pool._start()
+    assert [executor.submit(os.getenv, variable).result() for variable in THREAD_VARIABLES] == ["1"] * 3
+    assert executor.submit(torch.get_num_threads).result() == 1
+    # The parent's own environment is left as it was
+    assert {variable: os.environ.get(variable) for variable in THREAD_VARIABLES} == PARENT_ENVIRON
+
+
+def test_failed_shard_raises_and_the_pool_keeps_working(pool):
+    # The tokenizer rejects a dict in the second shard while the other shards are still encoding
+    with pytest.raises(TypeError):
+        pool.encode(TEXTS[:20] + [{"text": 1}] + TEXTS[20:], batch_size=4)
+    assert pool.encode(TEXTS[:5], batch_size=4).shape[0] == 5
@@ -0,0 +1,151 @@
+import subprocess
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+from src.vector_backends import LocalBackend
+
+DIM = 8
+
+
+def records(start: int, stop: int):
+    rng = np.random.default_rng(start)
+    ids = [f"chunk-{i}" for i in range(start, stop)]
+    return ids, rng.normal(size=(stop - start, DIM)).astype(np.float32), \
+        [f"text of {chunk_id}" for chunk_id in ids], [{"n": i} for i in range(start, stop)]
+
+
+def test_queries_stay_consistent_during_writes(tmp_path):
+    backend = LocalBackend("docs", str(tmp_path), DIM)
+    backend.connect()
+    backend.upsert(*records(0, 2000))
+    errors = []
+    stop = threading.Event()
+
+    def query():
+        queries = np.random.default_rng(1).normal(size=(4, DIM)).astype(np.float32)
+        while not stop.is_set():
+            try:
+                results = backend.query(queries, 10)
+                for ids, documents, metadatas in zip(results["ids"], results["documents"], results["metadatas"]):
+                    for chunk_id, document, metadata in zip(ids, documents, metadatas):
+                        assert document == f"text of {chunk_id}"
+                        assert chunk_id == f"chunk-{metadata['n']}"
+            except Exception as e:  # surfaced below; a thread's assert would be lost
+                errors.append(e)
+                return
+
+    readers = [threading.Thread(target=query) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for i in range(20):
+        backend.delete([f"chunk-{j}" for j in range(i * 50, i * 50 + 50)])
+        backend.upsert(*records(2000 + i * 50, 2050 + i * 50))
+    stop.set()
+    for reader in readers:
+        reader.join()
+    assert not errors, errors[0]
+    assert backend.count() == 2000
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="no flock on Windows")
+def test_index_is_owned_by_one_process(tmp_path):
+    backend = LocalBackend("docs", str(tmp_path), DIM)
+    backend.connect()
+    # Other instances in the same process share the claim
+    LocalBackend("docs", str(tmp_path), DIM).connect()
+
+    script = ("import sys; from src.vector_backends import LocalBackend; "
+              "LocalBackend('docs', sys.argv[1], 8).connect()")
+    other = subprocess.run([sys.executable, "-c", script, str(tmp_path)], capture_output=True, text=True)
+    assert other.returncode != 0
+    assert "held by another process" in other.stderr
+
+    backend.close()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="no flock on Windows")
+def test_lock_released_on_close(tmp_path):
+    first, second = LocalBackend("docs", str(tmp_path), DIM), LocalBackend("docs", str(tmp_path), DIM)
+    first.connect()
+    second.connect()
+    first.close()
+    second.close()
+    script = ("import sys; from src.vector_backends import LocalBackend; "
+              "LocalBackend('docs', sys.argv[1], 8).connect()")
+    assert subprocess.run([sys.executable, "-c", script, str(tmp_path)]).returncode == 0
+
+
+def reopened(tmp_path):
+    backend = LocalBackend("docs", str(tmp_path), DIM)
+    backend.connect()
+    return backend
+
+
+def test_persist_appends_to_journal_until_compaction(tmp_path):
+    backend = reopened(tmp_path)
+    backend.upsert(*records(0, 100))
+    backend.persist()
+    snapshot = (tmp_path / "docs.meta.json").read_bytes()
+
+    backend.upsert(*records(100, 110))
+    backend.persist()
+    backend.delete(["chunk-3", "chunk-50", "missing"])
+    backend.upsert(*records(5, 6))  # an update in place
+    backend.persist()
+    assert (tmp_path / "docs.meta.json").read_bytes() == snapshot
+    assert len((tmp_path / "docs.meta.log").read_text().splitlines()) == 4
+
+    restored = reopened(tmp_path)
+    assert restored.get() == backend.get()
+    assert restored.count() == 108
+    assert restored.query(records(0, 100)[1][7:8], 1)["ids"] == [["chunk-7"]]
+
+    # Once the journal outgrows the collection the snapshot is rewritten and the journal dropped
+    persists = 0
+    while (tmp_path / "docs.meta.json").read_bytes() == snapshot:
+        backend.upsert(*records(0, 10))
+        backend.persist()
+        persists += 1
+    assert persists == 10  # 13 journalled records + 10 * 10 > 108
+    assert not (tmp_path / "docs.meta.log").exists()
+    assert reopened(tmp_path).get() == backend.get()
+
+
+def test_torn_journal_tail_is_cut_before_the_next_append(tmp_path):
+    backend = reopened(tmp_path)
+    backend.upsert(*records(0, 20))
+    backend.persist()
+    backend.upsert(*records(20, 21))
+    backend.persist()
+    journal = tmp_path / "docs.meta.log"
+    with open(journal, "a", encoding="utf-8") as f:
+        f.write('{"op": "delete", "ids": ["chunk-')  # a crash mid-append
+
+    restarted = reopened(tmp_path)
+    assert restarted.count() == 21
+    restarted.upsert(*records(40, 42))
+    restarted.persist()
+    assert journal.read_text().endswith("\n")
+    assert reopened(tmp_path).get() == restarted.get()
+    assert reopened(tmp_path).count() == 23
+
+
+def test_stale_journal_is_ignored(tmp_path):
+    backend = reopened(tmp_path)
+    backend.upsert(*records(0, 20))
+    backend.persist()
+    backend.upsert(*records(20, 21))
+    backend.persist()
+    journal = tmp_path / "docs.meta.log"
+
+    # A journal from before the snapshot was rewritten is not replayed on top of it
+    stale = journal.read_text()
+    backend.delete([f"chunk-{i}" for i in range(20)])
+    backend.upsert(*records(30, 60))
+    backend.persist()
+    assert not journal.exists()
+    journal.write_text(stale)
+    assert reopened(tmp_path).get() == backend.get()
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from src.metadata_filter import MetadataIndex
+
+METADATAS = [
+    {"flag": True, "page": 1},
+    {"flag": 1, "page": 2},
+    {"flag": False, "page": 3},
+    {"flag": 0, "page": 4.5},
+    {"flag": 1.0},
+]
+
+
+@pytest.mark.parametrize("where,expected", [
+    ({"flag": True}, [0]),
+    ({"flag": 1}, [1]),
+    ({"flag": 1.0}, [4]),
+    ({"flag": False}, [2]),
+    ({"flag": 0}, [3]),
+    ({"flag": {"$ne": True}}, [1, 2, 3, 4]),
+    ({"flag": {"$in": [True, 0]}}, [0, 3]),
+    ({"flag": {"$nin": [1, False]}}, [0, 3, 4]),
+    ({"flag": {"$gte": 1}}, [1, 4]),  # bools are not numbers
+    ({"page": {"$gt": 1}}, [1, 2, 3]),
+    ({"$and": [{"flag": {"$lt": 1}}, {"page": {"$lte": 4.5}}]}, [3]),
+])
+def test_bools_and_numbers_are_separate_values(where, expected):
+    index = MetadataIndex()
+    np.testing.assert_array_equal(index.rows(where, METADATAS), expected)
+
+
+def test_appended_rows_keep_value_types():
+    index = MetadataIndex()
+    metadatas = list(METADATAS[:2])
+    assert index.rows({"flag": True}, metadatas).tolist() == [0]
+    for metadata in ({"flag": True}, {"flag": 1}):
+        metadatas.append(metadata)
+        index.add(len(metadatas) - 1, metadata)
+    assert index.rows({"flag": True}, metadatas).tolist() == [0, 2]
+    assert index.rows({"flag": 1}, metadatas).tolist() == [1, 3]
@@ -0,0 +1,68 @@
+import asyncio
+
+from src.metrics import Metrics
+
+
+def test_render_prometheus_text():
+    metrics = Metrics(buckets=[1.0, 0.1])
+    metrics.inc("rag_queries_total", cache="miss")
+    metrics.inc("rag_queries_total", 2, cache="hit")
+    metrics.inc("rag_queries_total", cache="miss")
+    metrics.inc("rag_embedded_texts_total", 5)
+    for seconds in (0.05, 0.5, 3.0):
+        metrics.observe("rag_stage_duration_seconds", seconds, stage="embed")
+    metrics.observe("rag_stage_duration_seconds", 0.1, stage="search")  # a bound value falls in its bucket
+
+    assert metrics.render() == "\n".join([
+        "# TYPE rag_embedded_texts_total counter",
+        "rag_embedded_texts_total 5",
+        "# TYPE rag_queries_total counter",
+        'rag_queries_total{cache="hit"} 2',
+        'rag_queries_total{cache="miss"} 2',
+        "# TYPE rag_stage_duration_seconds histogram",
+        'rag_stage_duration_seconds_bucket{stage="embed",le="0.1"} 1',
+        'rag_stage_duration_seconds_bucket{stage="embed",le="1.0"} 2',
+        'rag_stage_duration_seconds_bucket{stage="embed",le="+Inf"} 3',
+        'rag_stage_duration_seconds_sum{stage="embed"} 3.55',
+        'rag_stage_duration_seconds_count{stage="embed"} 3',
+        'rag_stage_duration_seconds_bucket{stage="search",le="0.1"} 1',
+        'rag_stage_duration_seconds_bucket{stage="search",le="1.0"} 1',
+        'rag_stage_duration_seconds_bucket{stage="search",le="+Inf"} 1',
+        'rag_stage_duration_seconds_sum{stage="search"} 0.1',
+        'rag_stage_duration_seconds_count{stage="search"} 1',
+    ]) + "\n"
+    assert metrics.snapshot()["histograms"]['rag_stage_duration_seconds{stage="embed"}']["count"] == 3
+
+    metrics.reset()
+    assert metrics.render() == "\n"
+
+
+def test_trace_collects_the_stages_of_one_query():
+    metrics = Metrics()
+    with metrics.trace() as timings:
+        with metrics.stage("embed"):
+            pass
+        metrics.record_stage("search", 0.002)
+        metrics.record_stage("search", 0.003)
+        assert list(metrics.timed_iter("load", [1, 2])) == [1, 2]
+
+        async def in_thread():
+            # to_thread copies the context, so worker-thread stages land in this trace
+            await asyncio.to_thread(metrics.record_stage, "generate", 0.01)
+        asyncio.run(in_thread())
+
+    assert sorted(timings) == ["embed", "generate", "load", "search"]
+    assert timings["search"] == 5.0 and timings["generate"] == 10.0  # milliseconds, summed per stage
+
+    metrics.record_stage("search", 1.0)  # outside a trace: only the histogram sees it
+    assert timings["search"] == 5.0
+    assert metrics.snapshot()["histograms"]['rag_stage_duration_seconds{stage="search"}']["count"] == 3
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=False)
+    with metrics.trace() as timings, metrics.stage("embed"):
+        metrics.inc("rag_queries_total")
+        metrics.observe("rag_query_duration_seconds", 1.0)
+    assert timings is None
+    assert metrics.snapshot() == {"counters": {}, "histograms": {}}
@@ -0,0 +1,61 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src import model_registry
+
+
+@pytest.fixture(autouse=True)
+def empty_registry():
+    model_registry.clear()
+    yield
+    model_registry.clear()
+
+
+def test_concurrent_first_calls_load_the_model_once():
+    loads = []
+    start = threading.Barrier(8)
+
+    def loader():
+        loads.append(threading.get_ident())
+        time.sleep(0.05)  # long enough for every caller to arrive while the load is running
+        return object()
+
+    def get(_):
+        start.wait()
+        return model_registry.get_model(("stub", "shared"), loader)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        models = list(pool.map(get, range(8)))
+
+    assert len(loads) == 1
+    assert all(model is models[0] for model in models)
+    assert model_registry.is_loaded(("stub", "shared"))
+    assert list(model_registry.loaded_models()) == ["stub/shared"]
+
+
+def test_different_keys_load_independently():
+    release = threading.Event()
+
+    def slow_loader():
+        release.wait(5)
+        return "slow"
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        slow = pool.submit(model_registry.get_model, ("stub", "slow"), slow_loader)
+        # Another key is not held up by a load still in progress
+        assert model_registry.get_model(("stub", "fast"), lambda: "fast") == "fast"
+        release.set()
+        assert slow.result() == "slow"
+
+
+def test_failed_load_is_retried():
+    def failing():
+        raise OSError("model files missing")
+
+    with pytest.raises(OSError):
+        model_registry.get_model(("stub", "flaky"), failing)
+    assert not model_registry.is_loaded(("stub", "flaky"))
+    assert model_registry.get_model(("stub", "flaky"), lambda: "loaded") == "loaded"
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("sentence_transformers")
+
+import torch  # noqa: E402
+from sentence_transformers import SentenceTransformer, models  # noqa: E402
+from transformers import BertConfig, BertModel, BertTokenizerFast  # noqa: E402
+
+from src.onnx_backend import OnnxEncoder, export_onnx, quantize_onnx  # noqa: E402
+from utils.config_file import EmbeddingsConfig  # noqa: E402
+
+TEXTS = [
+    "what is mitosis",
+    "the cell divides into two daughter cells",
+    "an enzyme breaks down starch while plants turn light into energy " * 4,
+    "a",
+    "",
+]
+WORDS = ("the cell divides into two daughter cells mitosis meiosis an enzyme breaks down starch "
+         "while plants turn light energy a of is what how").split()
+
+
+def tiny_model(directory, pooling: str, normalize: bool) -> SentenceTransformer:
+    """A randomly initialised two-layer BERT, built locally so the test needs no download."""
+    directory.mkdir()
+    (directory / "vocab.txt").write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS))
+    BertTokenizerFast(vocab_file=str(directory / "vocab.txt")).save_pretrained(directory)
+    config = BertConfig(vocab_size=len(WORDS) + 5, hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+                        intermediate_size=64, max_position_embeddings=64)
+    torch.manual_seed(0)
+    BertModel(config).save_pretrained(directory)
+    modules = [models.Transformer(str(directory), max_seq_length=24), models.Pooling(32, pooling)]
+    if normalize:
+        modules.append(models.Normalize())
+    model = SentenceTransformer(modules=modules, device="cpu")
+    model.save(str(directory / "sentence_transformer"))
+    return model
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+@pytest.mark.parametrize("pooling,normalize", [("mean", True), ("cls", False), ("max", True)])
+def test_onnx_matches_sentence_transformer(tmp_path, pooling, normalize):
+    model = tiny_model(tmp_path / "model", pooling, normalize)
+    model_dir = str(tmp_path / "onnx")
+    export_onnx(str(tmp_path / "model" / "sentence_transformer"), model_dir)
+
+    expected = model.encode(TEXTS, batch_size=2)
+    encoder = OnnxEncoder(model_dir)
+    assert encoder.get_sentence_embedding_dimension() == expected.shape[1]
+    np.testing.assert_allclose(encoder.encode(TEXTS, batch_size=2), expected, atol=1e-5)
+    np.testing.assert_allclose(encoder.encode(TEXTS[0]), expected[:1], atol=1e-5)
+
+    quantize_onnx(model_dir)
+    assert cosine(OnnxEncoder(model_dir, quantized=True).encode(TEXTS), expected).min() > 0.95
+
+
+def test_configured_model_parity(tmp_path):
+    model_name = getattr(EmbeddingsConfig, 'DEFAULT_MODEL', 'all-MiniLM-L6-v2')
+    try:
+        model = SentenceTransformer(model_name, device="cpu", local_files_only=True)
+    except Exception as e:
+        pytest.skip(f"{model_name} is not in the local model cache: {e}")
+    model_dir = str(tmp_path / "onnx")
+    export_onnx(model_name, model_dir)
+
+    np.testing.assert_allclose(OnnxEncoder(model_dir).encode(TEXTS), model.encode(TEXTS), atol=1e-4)
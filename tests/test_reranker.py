@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from src import model_registry
+from src.reranker import Reranker
+
+MAX_LENGTH = 512
+
+
+class StubCrossEncoder:
+    """Scores a pair by how many query words the document contains; each batch takes ``delay_ms``."""
+
+    def __init__(self, delay_ms: float = 0.0):
+        self.delay_ms = delay_ms
+        self.batches = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.batches.append(len(pairs))
+        time.sleep(self.delay_ms / 1000)
+        return [float(len(set(query.split()) & set(document.split()))) for query, document in pairs]
+
+
+@pytest.fixture
+def encoder():
+    model_registry.clear()
+    encoder = StubCrossEncoder()
+    model_registry.get_model(("cross_encoder", "stub", MAX_LENGTH), lambda: encoder)
+    yield encoder
+    model_registry.clear()
+
+
+def docs(*contents):
+    return [{"id": f"doc-{i}", "content": content, "distance": i / 10} for i, content in enumerate(contents)]
+
+
+QUERY = "how do plant cells divide"
+RETRIEVED = docs("animal cells", "plant cells divide by mitosis", "rocks do not divide", "how do plant cells divide",
+                 "weather report", "cells")
+
+
+def test_rerank_orders_by_cross_encoder_score(encoder):
+    reranker = Reranker("stub", batch_size=4, budget_ms=10_000)
+    reranked = reranker.rerank(QUERY, RETRIEVED, 5)
+
+    assert [doc["id"] for doc in reranked] == ["doc-3", "doc-1", "doc-2", "doc-0", "doc-5"]
+    assert [doc["rerank_score"] for doc in reranked] == [5.0, 3.0, 2.0, 1.0, 1.0]  # ties keep retrieval order
+    assert reranked[1]["distance"] == 0.1  # retrieval fields are kept
+    assert encoder.batches == [4, 2]
+
+    # Scores are cached per (query, document) pair
+    assert reranker.rerank(QUERY, RETRIEVED, 5) == reranked
+    assert encoder.batches == [4, 2]
+    assert (reranker.pairs_scored, reranker.cache_hits) == (6, 6)
+
+
+def test_budget_cutoff_keeps_retrieval_order_for_the_rest(encoder):
+    encoder.delay_ms = 20
+    reranker = Reranker("stub", batch_size=2, budget_ms=5)
+
+    # The first batch always runs (there is no estimate yet); then the estimate exceeds the budget
+    reranked = reranker.rerank(QUERY, RETRIEVED, 6)
+    assert encoder.batches == [2]
+    assert [doc["id"] for doc in reranked] == ["doc-1", "doc-0", "doc-2", "doc-3", "doc-4", "doc-5"]
+    assert "rerank_score" not in reranked[2]
+    assert reranker.budget_cutoffs == 1
+
+    # Nothing cached and no time for a batch: the retrieval order comes back as it was
+    query = "weather report"
+    assert [doc["id"] for doc in reranker.rerank(query, RETRIEVED, 3)] == ["doc-0", "doc-1", "doc-2"]
+    assert encoder.batches == [2]
+    assert reranker.stats()["budget_cutoffs"] == 2
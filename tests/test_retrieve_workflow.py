@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+
+from workflows.retrive_workflow import RAGRetriever
+
+DOCUMENTS = [
+    "Cell division copies the cell. Division of a cell makes two cells.",
+    "The cell membrane surrounds the cell and controls what enters the cell.",
+    "Cell walls give plant cells their shape.",
+    "A zygote forms when two gametes fuse during fertilisation, long before any tissue or organ develops "
+    "and well before the embryo implants, grows limbs, forms a heart and starts to move.",
+]
+
+
+@pytest.fixture
+def retriever(offline):
+    retriever = RAGRetriever()
+    store = retriever.vector_store
+    ids = [f"chunk-{i}" for i in range(len(DOCUMENTS))]
+    store.add_chunks(DOCUMENTS, [{"source": f"doc{i}.txt"} for i in range(len(DOCUMENTS))], ids,
+                     retriever.embeddings_manager.encode(DOCUMENTS))
+    store.persist()
+    yield retriever
+    store.client.close()
+
+
+def test_fused_relevance_follows_the_ranking(retriever):
+    retriever.hybrid_candidates = 0
+    docs = retriever.retrieve_documents("cell zygote", n_results=2)
+
+    assert [doc["id"] for doc in docs] == ["chunk-0", "chunk-3"]
+    keyword_only = docs[1]
+    assert keyword_only["distance"] is None
+    assert keyword_only["relevance_score"] == pytest.approx(keyword_only["rrf_score"] * (retriever.rrf_k + 1) / 2)
+    scores = [doc["relevance_score"] for doc in docs]
+    assert scores == sorted(scores, reverse=True) and scores[-1] > 0
+
+
+QUERIES = ["cell division", "what does the membrane control", "what gives plant cells their shape",
+           "when does a zygote form"]
+
+
+def slow_answers(retriever, monkeypatch):
+    """Replace generation with answers naming the question, where earlier questions take longer."""
+    def generate_response(prompt, max_tokens=500, temperature=0.7):
+        query = prompt.split("User Question: ")[1].split("\n")[0].strip()
+        time.sleep(0.02 * (len(QUERIES) - QUERIES.index(query)))
+        return f"answer to {query}"
+    monkeypatch.setattr(retriever, "generate_response", generate_response)
+
+
+def test_retrieve_many_matches_one_query_at_a_time(retriever):
+    encoded = []
+    encode = retriever.embeddings_manager.encode
+    retriever.embeddings_manager.encode = lambda texts, *args: encoded.append(texts) or encode(texts, *args)
+
+    batched = retriever.retrieve_many(QUERIES, n_results=2)
+    assert encoded == [QUERIES]  # one encode call for the batch
+    assert batched == [retriever.retrieve_documents(query, n_results=2) for query in QUERIES]
+    assert [docs[0]["id"] for docs in batched] == ["chunk-0", "chunk-1", "chunk-2", "chunk-3"]
+    assert retriever.retrieve_many([]) == []
+
+
+def test_ask_many_returns_answers_in_input_order(retriever, monkeypatch):
+    slow_answers(retriever, monkeypatch)
+    results = retriever.ask_many(QUERIES, max_concurrency=4)
+
+    assert [result["query"] for result in results] == QUERIES
+    assert [result["response"] for result in results] == [f"answer to {query}" for query in QUERIES]
+    assert [result["retrieved_documents"][0]["id"] for result in results] == \
+        ["chunk-0", "chunk-1", "chunk-2", "chunk-3"]
+    assert all(result["num_retrieved"] == len(result["retrieved_documents"]) for result in results)
+
+
+def test_aask_gives_the_same_result_as_ask(retriever):
+    answer_cache, retriever.answer_cache = retriever.answer_cache, None
+
+    async def ask_all():
+        return await asyncio.gather(*(retriever.aask(query) for query in QUERIES))
+    results = asyncio.run(ask_all())
+
+    assert [result["query"] for result in results] == QUERIES
+    for query, result in zip(QUERIES, results):
+        expected = retriever.ask(query)
+        assert result["response"].startswith("[stub answer]")
+        assert {key: value for key, value in result.items() if key != "timings"} == \
+            {key: value for key, value in expected.items() if key != "timings"}
+
+    # Both paths fill and read the same answer cache
+    retriever.answer_cache = answer_cache
+    first = asyncio.run(retriever.aask(QUERIES[0]))
+    cached = retriever.ask(QUERIES[0])
+    assert cached["cache_hit"] is True and cached["response"] == first["response"]
+
+
+def test_streamed_answer_matches_the_complete_one(retriever):
+    docs = retriever.retrieve_documents(QUERIES[3], n_results=2)
+
+    async def stream():
+        return [token async for token in retriever.astream_answer(QUERIES[3], docs)]
+    tokens = asyncio.run(stream())
+
+    assert len(tokens) > 1  # delivered piece by piece, not as one block
+    prompt = retriever.generate_prompt(QUERIES[3], docs)
+    assert "".join(tokens).strip() == retriever.generate_response(prompt, retriever.max_tokens)
+    assert asyncio.run(retriever.agenerate_response(prompt, retriever.max_tokens)) == "".join(tokens).strip()
@@ -0,0 +1,47 @@
+import numpy as np
+
+from src import semantic_cache
+from src.semantic_cache import SemanticCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def vector(*values):
+    return np.array(values, dtype=np.float32)
+
+
+def test_expired_best_match_does_not_hide_a_fresh_one(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(semantic_cache.time, "monotonic", clock)
+    cache = SemanticCache(threshold=0.9, ttl_seconds=60)
+    cache.put(vector(1, 0, 0), {"response": "old"}, version=1, latency_s=1.0)
+    clock.now += 50
+    cache.put(vector(1, 0.2, 0), {"response": "new"}, version=1, latency_s=1.0)
+    clock.now += 20  # the exact match has expired, the near one has not
+
+    hit = cache.lookup(vector(1, 0, 0), version=1)
+    assert hit["response"] == "new"
+    assert cache.stats()["entries"] == 1
+
+
+def test_expired_entries_are_purged_on_lookup(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(semantic_cache.time, "monotonic", clock)
+    cache = SemanticCache(threshold=0.9, ttl_seconds=60)
+    for i in range(5):
+        cache.put(vector(1, i, 0), {"response": i}, version=1, latency_s=1.0)
+    cache.put(vector(0, 0, 1), {"response": "fresh"}, version=1, latency_s=1.0, scope="other")
+    for i in range(5):
+        cache.lookup(vector(1, i, 0), version=1)  # refreshes recency, not age
+    clock.now += 61
+    cache.put(vector(0, 1, 1), {"response": "fresh"}, version=1, latency_s=1.0)
+
+    assert cache.lookup(vector(0, 1, 0), version=1) is None
+    assert cache.stats()["entries"] == 1
+    assert cache.lookup(vector(0, 1, 1), version=1)["response"] == "fresh"
@@ -0,0 +1,145 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from src.snapshot import Snapshot, SnapshotWriter
+from src.vector_store import VectorStore
+
+DIM = 8
+
+
+def blocks():
+    """Three blocks whose ``score`` field goes int -> float -> str and whose other fields come and go."""
+    rng = np.random.default_rng(0)
+    metadatas = [
+        [{"source": "a.pdf", "page": 1, "score": 3}, {"source": "a.pdf", "page": 2, "score": 4, "draft": True}],
+        [{"source": "b.txt", "score": 0.5}, {"source": "b.txt", "tags": ["x", "y"]}],
+        [{"source": "c.txt", "score": "high", "page": 7}],
+    ]
+    start = 0
+    for block_metadatas in metadatas:
+        ids = [f"chunk-{i}" for i in range(start, start + len(block_metadatas))]
+        yield (ids, rng.normal(size=(len(ids), DIM)).astype(np.float32),
+               [f"text of {chunk_id} é" for chunk_id in ids], block_metadatas)
+        start += len(ids)
+
+
+def written(tmp_path, vector_dtype="float32"):
+    path = str(tmp_path / "snapshot")
+    writer = SnapshotWriter(path, DIM, 5, vector_dtype)
+    for block in blocks():
+        writer.write(block)
+    return path, writer.close({"model_name": "model-a"})
+
+
+@pytest.mark.parametrize("vector_dtype", ["float32", "int8"])
+def test_round_trip(tmp_path, vector_dtype):
+    path, manifest = written(tmp_path, vector_dtype)
+    assert not os.path.exists(path + ".tmp")
+    snapshot = Snapshot(path)
+    snapshot.verify()
+    assert (len(snapshot), snapshot.model_name) == (5, "model-a")
+
+    expected = [list(column) for column in zip(*blocks())]
+    read = [list(column) for column in zip(*snapshot.iter_blocks(block_size=2))]
+    assert sum(read[0], []) == sum(expected[0], [])
+    assert sum(read[2], []) == sum(expected[2], [])
+    vectors, original = np.concatenate(read[1]), np.concatenate(expected[1])
+    if vector_dtype == "float32":
+        np.testing.assert_array_equal(vectors, original)
+    else:
+        np.testing.assert_allclose(vectors, original, atol=np.abs(original).max() / 127)
+
+    metadatas = sum(read[3], [])
+    assert metadatas[0] == {"source": "a.pdf", "page": 1, "score": 3}
+    assert metadatas[1] == {"source": "a.pdf", "page": 2, "score": 4, "draft": True}
+    assert metadatas[2] == {"source": "b.txt", "score": 0.5}
+    assert metadatas[3] == {"source": "b.txt", "tags": ["x", "y"]}
+    assert metadatas[4] == {"source": "c.txt", "score": "high", "page": 7}
+    assert {field: column["kind"] for field, column in manifest["columns"].items()} == \
+        {"source": "json", "page": "int", "score": "json", "draft": "bool", "tags": "json"}
+
+
+def test_numeric_columns_widen_from_int_to_float_to_json(tmp_path):
+    path = str(tmp_path / "snapshot")
+    writer = SnapshotWriter(path, DIM, 4)
+    values = [[2], [0.25], [None], ["n/a"]]  # None is a present JSON null
+    for i, block_values in enumerate(values):
+        writer.write(([f"chunk-{i}"], np.zeros((1, DIM)), ["text"], [{"value": v} for v in block_values]))
+        column = writer._fields["value"]
+        assert column.kind == ["int", "float", "json", "json"][i]
+        if i == 1:
+            # Widening rewrote the int written so far as a float
+            column._values.flush()
+            assert np.fromfile(column._values_path, dtype=np.float64).tolist() == [2.0, 0.25]
+    writer.close({"model_name": "model-a"})
+
+    assert [m["value"] for m in Snapshot(path).metadatas(0, 4)] == [2.0, 0.25, None, "n/a"]
+
+
+def test_verify_rejects_a_corrupted_file(tmp_path):
+    path, _ = written(tmp_path)
+    with open(os.path.join(path, "documents.bin"), "r+b") as f:
+        f.seek(3)
+        f.write(b"X")
+    with pytest.raises(ValueError, match="checksum mismatch in documents.bin"):
+        Snapshot(path).verify()
+
+    # Editing the manifest's recorded hashes is caught by the combined checksum
+    path, _ = written(tmp_path / "other")
+    manifest_path = os.path.join(path, "snapshot.json")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    manifest["files"]["ids.bin"] = "0" * 64
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+    with pytest.raises(ValueError, match="manifest checksum mismatch"):
+        Snapshot(path).verify()
+
+
+def local_store(directory, dim: int = DIM) -> VectorStore:
+    store = VectorStore()
+    store.backend_type = "local"
+    store.local_index_dir = str(directory)
+    store.vector_size = dim
+    store.create_client()
+    return store
+
+
+def test_store_export_and_import(tmp_path):
+    source = local_store(tmp_path / "source")
+    for ids, embeddings, documents, metadatas in blocks():
+        source.add_chunks(documents, metadatas, ids, embeddings)
+    source.persist()
+    path = str(tmp_path / "snapshot")
+    source.export_snapshot(path, "model-a")
+
+    target = local_store(tmp_path / "target")
+    target.import_snapshot(path, "model-a")
+    assert target.client.get() == source.client.get()
+    query = next(blocks())[1][1]
+    assert target.search(query, 2) == source.search(query, 2)
+    assert target.lexical_search("chunk-3", 1) == source.lexical_search("chunk-3", 1)
+
+    with pytest.raises(ValueError, match="not empty"):
+        target.import_snapshot(path, "model-a")
+    target.import_snapshot(path, "model-a", replace=True)
+    assert target.client.count() == 5
+
+
+def test_import_rejects_another_model_or_a_corrupted_snapshot(tmp_path):
+    path, _ = written(tmp_path)
+    target = local_store(tmp_path / "target")
+    with pytest.raises(ValueError, match="embedding model 'model-a', not 'model-b'"):
+        target.import_snapshot(path, "model-b")
+    with pytest.raises(ValueError, match="dimension 8, expected 16"):
+        local_store(tmp_path / "wide", dim=16).import_snapshot(path, "model-a")
+
+    with open(os.path.join(path, "vectors.npy"), "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        f.write(b"\x01")
+    with pytest.raises(ValueError, match="checksum mismatch in vectors.npy"):
+        target.import_snapshot(path, "model-a")
+    assert target.client.count() == 0
@@ -0,0 +1,109 @@
+from typing import Optional
+
+import pytest
+
+from utils.config_file import ChunkerConfig, IngestConfig
+from workflows.upsert_workflow import RAGSystem
+
+
+def paragraph(topic: str, n: int) -> str:
+    return " ".join(f"{topic}{n}word{i}" for i in range(10)) + "."
+
+
+@pytest.fixture
+def corpus(offline, monkeypatch):
+    # Ten-token windows without overlap, so editing one paragraph changes one chunk
+    monkeypatch.setattr(ChunkerConfig, "WINDOW_TOKENS", 10)
+    monkeypatch.setattr(ChunkerConfig, "STRIDE_TOKENS", 10)
+    monkeypatch.setattr(IngestConfig, "MAX_WORKERS", 1)
+    directory = offline / "docs"
+    directory.mkdir()
+    for topic in ("algebra", "biology", "chemistry"):
+        (directory / f"{topic}.txt").write_text("\n\n".join(paragraph(topic, n) for n in range(3)))
+    return directory
+
+
+class Recorder:
+    """Wraps EmbeddingsManager.encode and remembers what was embedded; fails after ``fail_after`` batches."""
+
+    def __init__(self, system: RAGSystem, fail_after: Optional[int] = None):
+        self.encode = system.embeddings_manager.encode
+        self.fail_after = fail_after
+        self.texts = []
+        system.embeddings_manager.encode = self
+
+    def __call__(self, texts, *args, **kwargs):
+        if self.fail_after is not None and len(self.texts) >= self.fail_after * len(texts):
+            raise RuntimeError("embedding service went away")
+        self.texts.extend(texts)
+        return self.encode(texts, *args, **kwargs)
+
+
+def run(directory, prune_missing: bool = False):
+    """One ingest by a fresh RAGSystem, as a separate run would; returns the texts it embedded and the stored metadata by id."""
+    system = RAGSystem(str(directory))
+    recorder = Recorder(system)
+    system.workflow(prune_missing=prune_missing)
+    client = system.vector_store.client or system.vector_store.create_client()  # a no-op run never connects
+    try:
+        stored = client.get()
+        return recorder.texts, dict(zip(stored["ids"], stored["metadatas"]))
+    finally:
+        client.close()
+
+
+def test_second_run_only_embeds_and_removes_what_changed(corpus):
+    embedded, stored = run(corpus)
+    assert len(embedded) == len(stored) == 9
+    before = {chunk_id: metadata["source"] for chunk_id, metadata in stored.items()}
+
+    edited = [paragraph("biology", 0), "Mitosis splits one cell into two.", paragraph("biology", 2)]
+    (corpus / "biology.txt").write_text("\n\n".join(edited))
+    (corpus / "chemistry.txt").unlink()
+
+    embedded, stored = run(corpus)
+    assert embedded == ["Mitosis splits one cell into two."]  # unchanged files and chunks are skipped
+    biology = {chunk_id for chunk_id, metadata in stored.items() if metadata["source"] == "biology.txt"}
+    assert len(biology) == 3
+    stale = {chunk_id for chunk_id, source in before.items() if source == "biology.txt"} - biology
+    assert len(stale) == 1 and not stale & set(stored)
+    # Without prune_missing the chunks of a removed file stay
+    assert sum(metadata["source"] == "chemistry.txt" for metadata in stored.values()) == 3
+
+    embedded, stored = run(corpus, prune_missing=True)
+    assert embedded == []
+    assert sorted({metadata["source"] for metadata in stored.values()}) == ["algebra.txt", "biology.txt"]
+    assert len(stored) == 6
+
+    embedded, stored = run(corpus, prune_missing=True)
+    assert embedded == [] and len(stored) == 6
+
+
+def test_interrupted_ingest_resumes_where_it_stopped(corpus, write_pdf, monkeypatch):
+    write_pdf(corpus / "physics.pdf", [f"physics page {n} " + paragraph("physics", n) for n in range(6)])
+    monkeypatch.setattr(IngestConfig, "BATCH_SIZE", 2)
+    monkeypatch.setattr(IngestConfig, "CHECKPOINT_BATCHES", 2)
+
+    system = RAGSystem(str(corpus))
+    first = Recorder(system, fail_after=5)
+    with pytest.raises(RuntimeError):
+        system.workflow()
+    system.vector_store.client.close()
+    assert len(first.texts) == 10
+    assert len(system.progress.done) == 10  # journalled as stored, for the next run to skip
+    assert first.texts[-1].startswith("physics page 0")
+
+    system = RAGSystem(str(corpus))
+    second = Recorder(system)
+    system.workflow()
+    stored = system.vector_store.client.get()
+    system.vector_store.client.close()
+
+    assert not set(second.texts) & set(first.texts)  # stored chunks are not embedded again
+    assert sorted(stored["documents"]) == sorted(first.texts + second.texts)
+    assert len(stored["ids"]) == 9 + 12
+    assert system.loader.page_cache.hits >= 1  # pages extracted before the failure are not parsed again
+    assert not system.progress.done
+
+    embedded, stored = run(corpus)
+    assert embedded == [] and len(stored) == 21
@@ -0,0 +1,117 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.chunker import TextChunker
+from src.lexical_index import LexicalIndex
+from src.vector_backends import LocalBackend
+from src.vector_store import VectorStore
+
+DIM = 8
+
+
+def local_store(tmp_path) -> VectorStore:
+    store = VectorStore()
+    store.backend_type = "local"
+    store.local_index_dir = str(tmp_path)
+    store.vector_size = DIM
+    store.create_client()
+    return store
+
+
+def hashed(texts):
+    return np.stack([np.random.default_rng(abs(hash(text)) % 2**32).normal(size=DIM) for text in texts])
+
+
+def test_update_collection_embeds_the_chunks_it_stores(tmp_path):
+    store = local_store(tmp_path)
+    store.chunker = TextChunker(window_tokens=20, stride_tokens=15)
+    documents = [" ".join(f"word{i}" for i in range(60)), "a short note"]
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return hashed(texts)
+
+    chunks = store.update_collection(documents, encode=encode)
+    assert calls == [chunks]
+    assert len(chunks) > len(documents)
+    stored = store.client.get()
+    assert sorted(stored["documents"]) == sorted(chunks)
+    hits = store.client.query(hashed(chunks[1:2]), 1)
+    assert hits["documents"] == [[chunks[1]]]
+
+
+def test_update_collection_takes_precomputed_embeddings_and_metadata(tmp_path):
+    store = local_store(tmp_path)
+    documents = ["photosynthesis turns light into sugar", "mitosis splits a cell", "osmosis moves water"]
+    metadatas = [{"source": "biology.pdf", "document_id": "bio-1"}, {"source": "cells.txt"}, {}]
+    chunks = store.update_collection(documents, hashed(documents), metadatas=metadatas)
+    assert chunks == documents
+
+    stored = store.client.get()
+    by_text = dict(zip(stored["documents"], stored["metadatas"]))
+    assert [(by_text[d]["source"], by_text[d]["document_id"]) for d in documents] == \
+        [("biology.pdf", "bio-1"), ("cells.txt", 1), ("upload", 2)]
+    assert store.client.query(hashed(documents[1:2]), 1)["documents"] == [[documents[1]]]
+
+    with pytest.raises(ValueError):
+        store.update_collection(documents, hashed(documents[:2]))
+    with pytest.raises(ValueError):
+        store.update_collection(documents)
+
+
+def test_lexical_index_saves_append_to_its_journal(tmp_path):
+    store = local_store(tmp_path)
+    documents = [f"note {i} about topic{i % 5}" for i in range(25)]
+    store.add_chunks(documents, [{"n": i} for i in range(25)], [f"chunk-{i}" for i in range(25)], hashed(documents))
+    store.persist()
+    snapshot = open(store.lexical_index_path, 'rb').read()
+
+    store.add_chunks(["a note about osmosis"], [{"n": 25}], ["chunk-25"], hashed(["a note about osmosis"]))
+    store.persist()
+    store.delete_chunks(["chunk-0", "chunk-5"])
+    store.persist()
+    assert open(store.lexical_index_path, 'rb').read() == snapshot
+    journal = LexicalIndex.journal_path(store.lexical_index_path)
+    assert len(open(journal).read().splitlines()) == 3
+
+    reopened = LexicalIndex.load(store.lexical_index_path)
+    assert len(reopened) == 24
+    assert reopened.search("osmosis", 1) == store.lexical_index.search("osmosis", 1)
+    assert {chunk_id for chunk_id, _ in reopened.search("topic0", 10)} == {f"chunk-{i}" for i in (10, 15, 20)}
+
+    # Compacting folds the journal back into the snapshot
+    store.lexical_index.save(store.lexical_index_path, compact=True)
+    assert not os.path.exists(journal)
+    assert len(LexicalIndex.load(store.lexical_index_path)) == 24
+
+
+def test_lexical_index_is_rebuilt_in_pages(tmp_path, monkeypatch):
+    store = local_store(tmp_path)
+    ids = [f"chunk-{i}" for i in range(25)]
+    documents = [f"note {i} about topic{i % 5}" for i in range(25)]
+    store.add_chunks(documents, [{"n": i} for i in range(25)], ids, hashed(documents))
+    store.persist()
+    os.remove(store.lexical_index_path)
+
+    pages = []
+    iter_documents = LocalBackend.iter_documents
+
+    def paged(backend, batch_size):
+        for block in iter_documents(backend, batch_size):
+            pages.append(len(block[0]))
+            yield block
+
+    def get_all(backend, ids=None):
+        raise AssertionError("the rebuild fetched the whole collection in one call")
+
+    monkeypatch.setattr(LocalBackend, "max_batch_size", 10)
+    monkeypatch.setattr(LocalBackend, "iter_documents", paged)
+    monkeypatch.setattr(LocalBackend, "get", get_all)
+    rebuilt = local_store(tmp_path)
+
+    assert pages == [10, 10, 5]
+    assert len(rebuilt.lexical_index) == 25
+    assert rebuilt.lexical_index.search("topic3", 10)[0][0] in {f"chunk-{i}" for i in range(3, 25, 5)}
@@ -1,13 +1,33 @@
 from dataclasses import dataclass
+from typing import Optional
+
 
 @dataclass
 class EmbeddingsConfig:
     DEFAULT_MODEL = "all-MiniLM-L6-v2"
+    BATCH_SIZE = 32
+    BACKEND = "torch"  # "onnx" or "onnx_int8" run an exported copy with ONNX Runtime on CPU
+    ONNX_DIR = "data/onnx_models"  # exported models, one directory per model (created on first use)
+    ONNX_THREADS = 0  # ONNX Runtime intra-op threads; 0 lets it choose
+    CACHE_ENABLED = True
+    CACHE_DIR = "data/embedding_cache"  # None keeps only the in-memory tier
+    CACHE_MEMORY_ITEMS = 10000
+    CACHE_DISK_ITEMS = 100000  # ~150 MB at 384 float32 dims
+    # Multi-process encoding for CPU-only hosts
+    POOL_WORKERS = 0  # 0 encodes in the calling thread; -1 uses cpu_count // POOL_THREADS_PER_WORKER
+    POOL_THREADS_PER_WORKER = 1
+    POOL_MIN_TEXTS = 64  # smaller calls (e.g. single queries) skip the pool
+
 
 @dataclass
 class LLMConfig:
     DEFAULT_MODEL = "gpt-4.1-mini"
     MAX_TOKENS = 4096
+    PROVIDER = "openai"  # "stub" answers offline (overridable with LLM_PROVIDER)
+    MAX_CONNECTIONS = 100
+    MAX_KEEPALIVE_CONNECTIONS = 20
+    TIMEOUT_SECONDS = 60.0
+
 
 @dataclass
 class VectorStoreConfig:
@@ -15,14 +35,114 @@ class VectorStoreConfig:
     DISTANCE_METRIC = "cosine"
     COLLECTION_NAME = "documents"
     VECTOR_SIZE = 384
+    # "chroma_cloud" (needs CHROMADB_API_KEY) or "local" (in-process NumPy index)
+    BACKEND = "chroma_cloud"
+    LOCAL_INDEX_DIR = "data/vector_index"
+    # Local index only: "flat" (exact) or "ivf" (approximate, for large corpora)
+    INDEX_TYPE = "flat"
+    IVF_NLIST = 0  # 0 picks ~4 * sqrt(num_vectors) at training time
+    IVF_NPROBE = 8
+    IVF_MIN_TRAIN_SIZE = 10000
+    # Flat local index only: "none", "int8" (4x smaller) or "binary" (32x smaller);
+    # the best k * RESCORE_FACTOR candidates by code are rescored in float32
+    QUANTIZATION = "none"
+    RESCORE_FACTOR = 4  # binary codes usually need ~10
+
 
 @dataclass
 class RetrieverConfig:
     TOP_K = 5
     SIMILARITY_METRIC = "cosine"
+    # Fuse BM25 keyword hits with vector hits (reciprocal-rank fusion)
+    HYBRID_SEARCH = True
+    RRF_K = 60
+    HYBRID_CANDIDATES = 20  # hits taken from each leg before fusion
+
+
+@dataclass
+class RerankerConfig:
+    ENABLED = False  # downloads the cross-encoder on first use
+    MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    CANDIDATES = 20  # retrieved candidates rescored per query
+    BATCH_SIZE = 16
+    MAX_LENGTH = 512
+    BUDGET_MS = 150  # stop scoring further batches past this; the rest keep retrieval order
+    CACHE_ITEMS = 10000
+
+
+@dataclass
+class ContextConfig:
+    MAX_CONTEXT_TOKENS = 3000  # budget for retrieved text in the prompt (LLM tokenizer tokens)
+    DEDUP_THRESHOLD = 0.8  # word 3-gram Jaccard similarity above which a chunk is a duplicate
+    MIN_TRIM_TOKENS = 32  # smallest leftover budget worth filling with a trimmed chunk
+
 
 @dataclass
 class RAGSystemConfig:
     N_RESULTS: int = 1
     MAX_TOKENS: int = 500
-    TEMPERATURE: float = 0.7
\ No newline at end of file
+    TEMPERATURE: float = 0.7
+    MAX_CONCURRENT_REQUESTS: int = 8  # concurrent LLM calls in ask_many
+    WARM_UP_ON_START: bool = True  # load models and the index before serving the first request
+
+
+@dataclass
+class IngestConfig:
+    MAX_WORKERS: int = 0  # 0 uses os.cpu_count()
+    PAGES_PER_TASK: int = 16
+    BATCH_SIZE: int = 128  # chunks per embed + upsert batch
+    MANIFEST_DIR: str = "data/manifests"  # one <collection>.json per collection
+    CHECKPOINT_BATCHES: int = 20  # persist the store and the resume journal every N batches
+    PAGE_CACHE_PATH: str = "data/page_cache.sqlite"  # extracted PDF pages by file hash; None disables
+    MMAP_MIN_BYTES: int = 1 << 20  # PDFs and hashed files at least this large are memory-mapped
+    API_INGEST_ROOT: Optional[str] = "documents"  # /ingest directories must lie under it; None disables them
+
+
+@dataclass
+class BulkWriteConfig:
+    CONCURRENCY: int = 4  # upsert batches in flight (backends that are not thread-safe use 1)
+    MAX_BATCH_BYTES: int = 4 * 2**20  # estimated request payload per batch
+    MAX_RETRIES: int = 5  # per batch, for rate limits, timeouts and 5xx errors
+    BACKOFF_BASE_SECONDS: float = 0.5  # doubled per retry, with full jitter
+    BACKOFF_MAX_SECONDS: float = 30.0
+    MIN_SPLIT_SIZE: int = 4  # batches this small fail instead of being split again when rejected as too large
+
+
+@dataclass
+class ChunkerConfig:
+    WINDOW_TOKENS: int = 256  # capped at the embedding model's max_seq_length - 2
+    STRIDE_TOKENS: int = 192  # window - stride tokens overlap between chunks
+
+
+@dataclass
+class MetricsConfig:
+    ENABLED: bool = True  # stage timings, counters and histograms (GET /metrics); no-ops when False
+    LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+
+
+@dataclass
+class AnswerCacheConfig:
+    ENABLED: bool = True
+    SIMILARITY_THRESHOLD: float = 0.95  # cosine similarity between query embeddings
+    TTL_SECONDS: float = 3600
+    MAX_ENTRIES: int = 1000
+
+
+@dataclass
+class SnapshotConfig:
+    BLOCK_SIZE: int = 4096  # records per streamed export / import block
+    VECTOR_DTYPE: str = "float32"  # "int8" stores 4x smaller, slightly lossy vectors
+    VERIFY_ON_IMPORT: bool = True  # re-hash every snapshot file before importing it
+    IMPORT_ON_START: Optional[str] = None  # API: snapshot directory imported into an empty collection at startup
+
+
+@dataclass
+class ConversationConfig:
+    ENABLED: bool = True  # reuse a chat session's candidate chunks for follow-up turns
+    DRIFT_THRESHOLD: float = 0.6  # cosine between a turn's condensed query and the session topic; below it re-retrieves
+    CANDIDATES: int = 20  # chunks kept per session and re-ranked for each follow-up
+    MAX_SESSIONS: int = 1000  # least recently used sessions are dropped beyond this
+    SESSION_TTL_SECONDS: float = 1800
+    CONDENSE_TURNS: int = 3  # earlier user questions folded into a follow-up's retrieval query
+    PROMPT_TURNS: int = 4  # recent messages quoted in the answer prompt
+    PROMPT_TURN_CHARS: int = 500
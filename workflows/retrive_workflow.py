@@ -1,74 +1,334 @@
+import asyncio
+import logging
 import os
 import sys
-from typing import List, Dict, Any
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+import numpy as np
 from dotenv import load_dotenv, find_dotenv
-from openai import OpenAI
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)) + '/../')
 
 from src.vector_store import VectorStore
 from src.embeddings_manager import EmbeddingsManager
-from utils.config_file import RAGSystemConfig, LLMConfig
+from src.context_builder import ContextBuilder, PackedContext
+from src.conversation import SessionCache, SessionState, Turn, condense_query, format_history
+from src import model_registry
+from src.llm_clients import create_llm_clients, llm_provider
+from src.metadata_filter import Where, filter_key, validate_where
+from src.metrics import metrics
+from src.reranker import Reranker
+from src.semantic_cache import SemanticCache
+from utils.config_file import (AnswerCacheConfig, ConversationConfig, RAGSystemConfig, LLMConfig, RerankerConfig,
+                               RetrieverConfig)
 
 load_dotenv(find_dotenv())
 
+logger = logging.getLogger(__name__)
+
 class RAGRetriever:
-    def __init__(self):
-        """Initialize the RAG retriever with vector store and OpenAI client."""
-        self.vector_store = VectorStore()
-        self.embeddings_manager = EmbeddingsManager()
+    def __init__(self, vector_store: Optional[VectorStore] = None,
+                 embeddings_manager: Optional[EmbeddingsManager] = None):
+        """Initialize the RAG retriever with vector store and OpenAI client.
+
+        Pass ``vector_store`` / ``embeddings_manager`` to share already loaded
+        instances (e.g. one per API worker) instead of building new ones.
+        """
+        self.vector_store = vector_store or VectorStore()
+        self.embeddings_manager = embeddings_manager or EmbeddingsManager()
         self.n_results = RAGSystemConfig.N_RESULTS
         self.max_tokens = RAGSystemConfig.MAX_TOKENS
         self.temperature = RAGSystemConfig.TEMPERATURE
         self.model_name = LLMConfig.DEFAULT_MODEL
+        # Packs retrieved chunks into a token budget measured with the LLM's tokenizer
+        # (or, without tiktoken's encoding files, the embedding model's)
+        self.context_builder = ContextBuilder(
+            self.model_name, fallback_tokenizer=lambda: self.embeddings_manager.model.tokenizer
+        )
         
-        # Initialize OpenAI client
+        # Initialize OpenAI clients (or offline stubs when LLM_PROVIDER=stub)
+        self.llm_provider = llm_provider()
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        if not self.openai_api_key:
-            raise ValueError("OpenAI API key not found. Set OPENAI_API_KEY environment variable.")
-        
-        self.openai_client = OpenAI(api_key=self.openai_api_key)
+        self.openai_client, self.async_openai_client = create_llm_clients(self.llm_provider, self.openai_api_key)
+
+        # Semantic answer cache, invalidated whenever the collection changes
+        self.answer_cache: Optional[SemanticCache] = None
+        if AnswerCacheConfig.ENABLED:
+            self.answer_cache = SemanticCache(
+                threshold=AnswerCacheConfig.SIMILARITY_THRESHOLD,
+                ttl_seconds=AnswerCacheConfig.TTL_SECONDS,
+                max_entries=AnswerCacheConfig.MAX_ENTRIES
+            )
+
+        # Hybrid retrieval: the BM25 leg runs on this pool while the vector leg runs inline
+        self.hybrid_search = RetrieverConfig.HYBRID_SEARCH
+        self.rrf_k = RetrieverConfig.RRF_K
+        self.hybrid_candidates = RetrieverConfig.HYBRID_CANDIDATES
+        self._lexical_pool = ThreadPoolExecutor(
+            max_workers=getattr(RAGSystemConfig, 'MAX_CONCURRENT_REQUESTS', 8),
+            thread_name_prefix="lexical-search"
+        )
+
+        # Optional cross-encoder pass over a wider candidate set
+        self.reranker: Optional[Reranker] = Reranker() if RerankerConfig.ENABLED else None
+
+        # Chat sessions: follow-ups re-rank the candidates of their topic instead of searching again
+        self.condense_turns = getattr(ConversationConfig, 'CONDENSE_TURNS', 3)
+        self.session_candidates = getattr(ConversationConfig, 'CANDIDATES', 20)
+        self.sessions: Optional[SessionCache] = None
+        if getattr(ConversationConfig, 'ENABLED', True):
+            self.sessions = SessionCache(
+                drift_threshold=getattr(ConversationConfig, 'DRIFT_THRESHOLD', 0.6),
+                max_sessions=getattr(ConversationConfig, 'MAX_SESSIONS', 1000),
+                ttl_seconds=getattr(ConversationConfig, 'SESSION_TTL_SECONDS', 1800)
+            )
         
-    def retrieve_documents(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
-        """Retrieve relevant documents from ChromaDB based on the query."""
+    def warm_up(self):
+        """Connect to the index and load every model up front instead of on the first query."""
+        with metrics.stage("warm_up"):
+            if self.vector_store.client is None:
+                self.vector_store.create_client()
+            self.embeddings_manager.warm_up()
+            if self.reranker is not None:
+                self.reranker.warm_up()
+
+    def retrieve_documents(self, query: str, n_results: int = 5, query_embedding: Optional[np.ndarray] = None,
+                           where: Optional[Where] = None) -> List[Dict[str, Any]]:
+        """Retrieve relevant documents based on the query.
+
+        With hybrid search on, BM25 and vector search run concurrently and
+        their rankings are merged with reciprocal-rank fusion. ``where`` is
+        a ChromaDB-style metadata filter (e.g. ``{"source": "week3.pdf"}``)
+        applied to both legs before ranking; a malformed filter raises
+        ValueError.
+        """
+        validate_where(where)
+        with metrics.stage("retrieve"):
+            return self._retrieve_documents(query, n_results, query_embedding, where)
+
+    def _retrieve_documents(self, query: str, n_results: int, query_embedding: Optional[np.ndarray],
+                            where: Optional[Where] = None) -> List[Dict[str, Any]]:
         try:
-            # Search for similar documents
-            results = self.vector_store.search(query, n_results=n_results)
-            
-            # Extract and format the results
-            retrieved_docs = []
-            if results and 'documents' in results and results['documents']:
-                documents = results['documents'][0]  # First batch of results
-                metadatas = results.get('metadatas', [[]])[0]
-                distances = results.get('distances', [[]])[0]
-                
-                for i, doc in enumerate(documents):
-                    retrieved_docs.append({
-                        'content': doc,
-                        'metadata': metadatas[i] if i < len(metadatas) else {},
-                        'distance': distances[i] if i < len(distances) else 0.0,
-                        'relevance_score': 1 / (1 + distances[i]) if i < len(distances) else 0.0
-                    })
-            
-            return retrieved_docs
+            if self.vector_store.client is None:
+                self.vector_store.create_client()  # connect once, before the legs split
+            candidates = self._candidate_count(n_results)
+            depth = max(candidates, self.hybrid_candidates) if self.hybrid_search else candidates
+            lexical = self._lexical_pool.submit(self._lexical_hits, query, depth, where) \
+                if self.hybrid_search else None
+
+            # Embed the query with the same model used at ingestion time
+            if query_embedding is None:
+                query_embedding = self.embeddings_manager.encode(query)[0]
+            results = self.vector_store.search(query_embedding, n_results=depth, where=where)
+            docs = self._format_results(results, 0)
+            if lexical is not None:
+                docs = self._fuse(docs, lexical.result(), candidates)
+            return self._rerank(query, docs[:candidates], n_results)
             
         except Exception as e:
-            print(f"Error retrieving documents: {e}")
+            logger.warning("Error retrieving documents: %s", e)
+            return []
+
+    def retrieve_many(self, queries: List[str], n_results: int = 5,
+                      where: Optional[Where] = None) -> List[List[Dict[str, Any]]]:
+        """Retrieve documents for many queries with one encode and one search call, all under ``where``."""
+        validate_where(where)
+        if not queries:
             return []
+        try:
+            if self.vector_store.client is None:
+                self.vector_store.create_client()
+            candidates = self._candidate_count(n_results)
+            depth = max(candidates, self.hybrid_candidates) if self.hybrid_search else candidates
+            lexical = [self._lexical_pool.submit(self._lexical_hits, query, depth, where) for query in queries] \
+                if self.hybrid_search else None
+
+            query_embeddings = self.embeddings_manager.encode(queries)
+            results = self.vector_store.search_many(query_embeddings, n_results=depth, where=where)
+            retrieved = [self._format_results(results, i) for i in range(len(queries))]
+            if lexical is not None:
+                retrieved = [self._fuse(docs, future.result(), candidates) for docs, future in zip(retrieved, lexical)]
+            return [self._rerank(query, docs[:candidates], n_results) for query, docs in zip(queries, retrieved)]
+
+        except Exception as e:
+            logger.warning("Error retrieving documents: %s", e)
+            return [[] for _ in queries]
+
+    def retrieve_in_session(self, query: str, history: Optional[List[Turn]] = None,
+                            session_id: Optional[str] = None, n_results: int = 5,
+                            where: Optional[Where] = None) -> List[Dict[str, Any]]:
+        """Retrieve documents for a chat turn asked after ``history`` (``{"role", "content"}`` messages).
+
+        Follow-ups are condensed with the questions they build on before
+        retrieval. With a ``session_id`` the session's candidate set is
+        re-ranked while the condensed query stays on the session's topic;
+        the index is searched again only once it drifts.
+        """
+        validate_where(where)
+        return self._retrieve_turn(query, history, session_id, n_results, where)[0]
+
+    def _retrieve_turn(self, query: str, history: Optional[List[Turn]], session_id: Optional[str],
+                       n_results: int, where: Optional[Where] = None,
+                       query_embedding: Optional[np.ndarray] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Documents for a chat turn, plus how they were found (condensed query, session cache outcome)."""
+        condensed = condense_query(query, history or [], self.condense_turns)
+        turn: Dict[str, Any] = {"condensed_query": condensed}
+        with metrics.stage("retrieve"):
+            if query_embedding is None or condensed != query:
+                query_embedding = self._embed_query(condensed)
+            if self.sessions is None or session_id is None or query_embedding is None:
+                return self._retrieve_documents(condensed, n_results, query_embedding, where), turn
+
+            version = self.vector_store.collection_version
+            scope = self._cache_scope(where)
+            state, similarity = self.sessions.match(session_id, query_embedding, version, scope)
+            turn["topic_similarity"] = similarity
+            if state is not None:
+                try:
+                    docs = self._reuse_candidates(condensed, query_embedding, state, n_results)
+                    metrics.inc("rag_session_cache_total", result="hit")
+                    return docs, {**turn, "session_cache": "hit"}
+                except Exception as e:
+                    logger.warning("Re-ranking session candidates failed, searching again: %s", e)
+
+            turn["session_cache"] = "drift" if state is None and similarity is not None else "miss"
+            metrics.inc("rag_session_cache_total", result=turn["session_cache"])
+            candidates = self._retrieve_documents(condensed, max(n_results, self.session_candidates),
+                                                  query_embedding, where)
+            if candidates:
+                self.sessions.put(session_id, query_embedding, candidates, version, scope)
+            return candidates[:n_results], turn
+
+    def _reuse_candidates(self, query: str, query_embedding: np.ndarray, state: SessionState,
+                          n_results: int) -> List[Dict[str, Any]]:
+        # Cosine-rank the topic's candidates for this turn; the cross-encoder, if on, reorders the head
+        ranked = state.rank(query_embedding, self.embeddings_manager.encode)
+        docs = [{
+            'id': doc['id'],
+            'content': doc['content'],
+            'metadata': doc['metadata'],
+            'distance': 1 - similarity,
+            'relevance_score': 1 / (2 - similarity)
+        } for doc, similarity in ranked[:self._candidate_count(n_results)]]
+        return self._rerank(query, docs, n_results)
+
+    def _candidate_count(self, n_results: int) -> int:
+        """How many documents to retrieve before the optional rerank cuts down to ``n_results``."""
+        if self.reranker is None:
+            return n_results
+        return max(n_results, getattr(RerankerConfig, 'CANDIDATES', 20))
+
+    def _rerank(self, query: str, docs: List[Dict[str, Any]], n_results: int) -> List[Dict[str, Any]]:
+        if self.reranker is None or len(docs) <= 1:
+            return docs[:n_results]
+        try:
+            return self.reranker.rerank(query, docs, n_results)
+        except Exception as e:
+            logger.warning("Reranking failed, keeping retrieval order: %s", e)
+            return docs[:n_results]
+
+    def _lexical_hits(self, query: str, n_results: int, where: Optional[Where] = None) -> List[Tuple[str, float]]:
+        # Keyword search is best-effort: failures fall back to vector-only results
+        try:
+            return self.vector_store.lexical_search(query, n_results, where)
+        except Exception as e:
+            logger.warning("Lexical search failed, using vector results only: %s", e)
+            return []
+
+    def _fuse(self, vector_docs: List[Dict[str, Any]], lexical_hits: List[Tuple[str, float]],
+              n_results: int) -> List[Dict[str, Any]]:
+        """Reciprocal-rank fusion: score(d) = sum over legs of 1 / (rrf_k + rank).
+
+        ``relevance_score`` of a fused hit is its fused score scaled so that
+        ranking first in both legs gives 1.0, so it orders hits the way
+        they are ranked; keyword-only hits have no vector ``distance``.
+        """
+        if not lexical_hits:
+            return vector_docs[:n_results]
+
+        scores: Dict[str, float] = {}
+        for rank, doc in enumerate(vector_docs, 1):
+            scores[doc['id']] = scores.get(doc['id'], 0.0) + 1 / (self.rrf_k + rank)
+        for rank, (chunk_id, _) in enumerate(lexical_hits, 1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1 / (self.rrf_k + rank)
+        top_ids = sorted(scores, key=scores.get, reverse=True)[:n_results]
+
+        docs = {doc['id']: doc for doc in vector_docs}
+        bm25_scores = dict(lexical_hits)
+        # Keyword-only hits carry no vector distance; fetch their text and metadata
+        missing = [chunk_id for chunk_id in top_ids if chunk_id not in docs]
+        if missing:
+            fetched = self.vector_store.get_chunks(missing)
+            for chunk_id, document, metadata in zip(fetched['ids'], fetched['documents'], fetched['metadatas']):
+                docs[chunk_id] = {
+                    'id': chunk_id,
+                    'content': document,
+                    'metadata': metadata or {},
+                    'distance': None
+                }
+
+        fused = []
+        for chunk_id in top_ids:
+            if chunk_id in docs:
+                fused.append({
+                    **docs[chunk_id],
+                    'relevance_score': scores[chunk_id] * (self.rrf_k + 1) / 2,
+                    'rrf_score': scores[chunk_id],
+                    'bm25_score': bm25_scores.get(chunk_id, 0.0)
+                })
+        return fused
+
+    @staticmethod
+    def _format_results(results: Dict[str, Any], index: int) -> List[Dict[str, Any]]:
+        """Format the ``index``-th query's results from a ChromaDB-style result dict."""
+        retrieved_docs = []
+        if results and 'documents' in results and results['documents']:
+            documents = results['documents'][index]
+            ids = (results.get('ids') or [])[index:index + 1] or [[]]
+            ids = ids[0] or []
+            metadatas = (results.get('metadatas') or [])[index:index + 1] or [[]]
+            distances = (results.get('distances') or [])[index:index + 1] or [[]]
+            metadatas, distances = metadatas[0] or [], distances[0] or []
+            
+            for i, doc in enumerate(documents):
+                retrieved_docs.append({
+                    'id': ids[i] if i < len(ids) else None,
+                    'content': doc,
+                    'metadata': metadatas[i] if i < len(metadatas) else {},
+                    'distance': distances[i] if i < len(distances) else 0.0,
+                    'relevance_score': 1 / (1 + distances[i]) if i < len(distances) else 0.0
+                })
+        
+        return retrieved_docs
     
-    def generate_prompt(self, query: str, retrieved_docs: List[Dict[str, Any]]) -> str:
-        """Generate a prompt for OpenAI using the query and retrieved documents."""
-        if not retrieved_docs:
+    def generate_prompt(self, query: str, retrieved_docs: List[Dict[str, Any]],
+                        history: Optional[List[Turn]] = None) -> str:
+        """Generate a prompt for OpenAI using the query, retrieved documents and any earlier chat turns."""
+        return self.build_prompt(query, retrieved_docs, history)[0]
+
+    def build_prompt(self, query: str, retrieved_docs: List[Dict[str, Any]],
+                     history: Optional[List[Turn]] = None) -> Tuple[str, PackedContext]:
+        """Generate the prompt and report how the context was packed into the token budget."""
+        with metrics.stage("prompt_build"):
+            return self._build_prompt(query, retrieved_docs, history)
+
+    def _build_prompt(self, query: str, retrieved_docs: List[Dict[str, Any]],
+                      history: Optional[List[Turn]] = None) -> Tuple[str, PackedContext]:
+        packed = self.context_builder.build(retrieved_docs)
+        # Recent turns, so follow-ups like "why?" can be answered
+        conversation = format_history(history or [], getattr(ConversationConfig, 'PROMPT_TURNS', 4),
+                                      getattr(ConversationConfig, 'PROMPT_TURN_CHARS', 500))
+        conversation = f"Conversation so far:\n{conversation}\n\n" if conversation else ""
+        if not packed.documents:
             return f"""
-            I don't have any relevant information in my knowledge base to answer your question: "{query}"
+            {conversation}I don't have any relevant information in my knowledge base to answer your question: "{query}"
             
             Please provide a helpful response based on your general knowledge, but mention that this information is not from the specific documents in the system.
-            """
+            """, packed
         
-        # Format retrieved documents
-        context = ""
-        for i, doc in enumerate(retrieved_docs, 1):
-            context += f"Document {i}:\n{doc['content']}\n\n"
+        # Retrieved documents, deduplicated and trimmed to ContextConfig.MAX_CONTEXT_TOKENS
+        context = packed.text
         
         prompt = f"""
         You are a helpful AI assistant. Use the following documents to answer the user's question. 
@@ -77,7 +337,7 @@ class RAGRetriever:
         Context Documents:
         {context}
         
-        User Question: {query}
+        {conversation}User Question: {query}
         
         Instructions:
         - Answer based primarily on the provided documents
@@ -88,54 +348,239 @@ class RAGRetriever:
         Answer:
         """
         
-        return prompt
+        return prompt, packed
     
+    def _messages(self, prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": "You are a helpful AI assistant that answers questions based on provided documents."},
+            {"role": "user", "content": prompt}
+        ]
+
     def generate_response(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7) -> str:
         """Generate a response using OpenAI."""
         try:
-            response = self.openai_client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": "You are a helpful AI assistant that answers questions based on provided documents."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
+            with metrics.stage("generate"):
+                response = self.openai_client.chat.completions.create(
+                    model=self.model_name,
+                    messages=self._messages(prompt),
+                    max_tokens=max_tokens,
+                    temperature=temperature
+                )
             
-            return response.choices[0].message.content.strip()
+            answer = response.choices[0].message.content.strip()
+            self._count_completion(answer)
+            return answer
             
         except Exception as e:
+            metrics.inc("rag_generation_errors_total")
             return f"Error generating response: {e}"
+
+    def _count_completion(self, answer: str):
+        if metrics.enabled:
+            metrics.inc("rag_tokens_total", self.context_builder.counter.count(answer), stage="generate")
     
-    def ask(self, query: str) -> Dict[str, Any]:
+    def ask(self, query: str, where: Optional[Where] = None, history: Optional[List[Turn]] = None,
+            session_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Complete RAG pipeline: retrieve documents and generate response.
+
+        ``where`` restricts retrieval to chunks whose metadata matches it.
+        ``history`` holds the chat turns before ``query`` and ``session_id``
+        names the chat, so follow-ups reuse the session's candidates (see
+        ``retrieve_in_session``). With metrics enabled the result carries
+        per-stage ``timings`` in ms.
         """
-        print(f"Processing query: {query}")
-        
-        # Step 1: Retrieve relevant documents
-        print("Retrieving relevant documents...")
-        retrieved_docs = self.retrieve_documents(query, self.n_results)
-        
-        print(f"Retrieved {len(retrieved_docs)} documents")
-        
-        # Step 2: Generate prompt
-        prompt = self.generate_prompt(query, retrieved_docs)
-        
-        # Step 3: Generate response using OpenAI
-        print("Generating response with OpenAI...")
+        logger.debug("Processing query: %s", query)
+        validate_where(where)
+        start = time.perf_counter()
+        with metrics.trace() as timings:
+            query_embedding = self._embed_query(query)
+            # Answers to follow-ups depend on the conversation, so only opening questions use the answer cache
+            cached = None if history else self._cached_answer(query, query_embedding, where)
+            if cached is not None:
+                logger.debug("Answer served from semantic cache")
+                return self._with_timings(cached, timings, start)
+            
+            # Step 1: Retrieve relevant documents
+            turn: Dict[str, Any] = {}
+            if history or session_id is not None:
+                retrieved_docs, turn = self._retrieve_turn(query, history, session_id, self.n_results,
+                                                           where, query_embedding)
+            else:
+                retrieved_docs = self.retrieve_documents(query, self.n_results, query_embedding, where)
+            logger.debug("Retrieved %d documents", len(retrieved_docs))
+            
+            # Steps 2 and 3: Generate prompt and response using OpenAI
+            result = {**self._answer(query, retrieved_docs, history), **turn}
+            if not history:
+                self._cache_answer(query_embedding, result, start, where)
+            return self._with_timings(result, timings, start)
+
+    @staticmethod
+    def _with_timings(result: Dict[str, Any], timings: Optional[Dict[str, float]], start: float) -> Dict[str, Any]:
+        metrics.inc("rag_queries_total", cache="hit" if result.get("cache_hit") else "miss")
+        if timings is None:
+            return result
+        total_ms = (time.perf_counter() - start) * 1000
+        metrics.observe("rag_query_duration_seconds", total_ms / 1000)
+        stage_timings = {stage: round(ms, 3) for stage, ms in timings.items()}
+        return {**result, "timings": {**stage_timings, "total": round(total_ms, 3)}}
+
+    def _embed_query(self, query: str) -> Optional[np.ndarray]:
+        try:
+            return self.embeddings_manager.encode(query)[0]
+        except Exception as e:
+            logger.warning("Error embedding query: %s", e)
+            return None
+
+    @staticmethod
+    def _cache_scope(where: Optional[Where]) -> Optional[str]:
+        # Answers are only reused for the same filter
+        return filter_key(where) if where is not None else None
+
+    def _cached_answer(self, query: str, query_embedding: Optional[np.ndarray],
+                       where: Optional[Where] = None) -> Optional[Dict[str, Any]]:
+        if self.answer_cache is None or query_embedding is None:
+            return None
+        cached = self.answer_cache.lookup(query_embedding, self.vector_store.collection_version,
+                                          self._cache_scope(where))
+        if cached is None:
+            return None
+        return {**cached, "query": query, "cache_hit": True}
+
+    def _cache_answer(self, query_embedding: Optional[np.ndarray], result: Dict[str, Any], start: float,
+                      where: Optional[Where] = None):
+        # Don't cache answers without context or failed generations
+        if (self.answer_cache is None or query_embedding is None or not result["retrieved_documents"]
+                or result["response"].startswith("Error generating response")):
+            return
+        self.answer_cache.put(
+            query_embedding, result, self.vector_store.collection_version, time.perf_counter() - start,
+            self._cache_scope(where)
+        )
+
+    def ask_many(self, queries: List[str], max_concurrency: Optional[int] = None,
+                 where: Optional[Where] = None) -> List[Dict[str, Any]]:
+        """
+        Batched RAG pipeline for bulk jobs such as question banks.
+
+        Queries are encoded and searched in one batch, all under ``where``;
+        LLM calls run on a bounded thread pool. Results are returned in
+        input order.
+        """
+        if max_concurrency is None:
+            max_concurrency = getattr(RAGSystemConfig, 'MAX_CONCURRENT_REQUESTS', 8)
+
+        logger.debug("Processing %d queries", len(queries))
+        with metrics.stage("retrieve_batch"):
+            retrieved = self.retrieve_many(queries, self.n_results, where)
+
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+            return list(pool.map(self._answer, queries, retrieved))
+
+    def _answer(self, query: str, retrieved_docs: List[Dict[str, Any]],
+                history: Optional[List[Turn]] = None) -> Dict[str, Any]:
+        """Generate the response for already retrieved documents."""
+        prompt, packed = self.build_prompt(query, retrieved_docs, history)
         response = self.generate_response(prompt, self.max_tokens, self.temperature)
-        
-        # Return comprehensive result
+        return self._result(query, response, retrieved_docs, prompt, packed)
+
+    def _result(self, query: str, response: str, retrieved_docs: List[Dict[str, Any]], prompt: str,
+                packed: PackedContext) -> Dict[str, Any]:
+        """The result dict shared by ``ask``, ``ask_many`` and ``aask``."""
         return {
             "query": query,
             "response": response,
             "retrieved_documents": retrieved_docs,
             "num_retrieved": len(retrieved_docs),
-            "model_used": self.model_name  # This should work now
+            "model_used": self.model_name,
+            "context": self._context_report(prompt, packed)
         }
+
+    def _context_report(self, prompt: str, packed: PackedContext) -> Dict[str, Any]:
+        report = {**packed.report(), "prompt_tokens": self.context_builder.counter.count(prompt)}
+        metrics.inc("rag_tokens_total", report["prompt_tokens"], stage="prompt")
+        metrics.inc("rag_tokens_total", report["tokens_used"], stage="context")
+        return report
     
+    async def aretrieve_documents(self, query: str, n_results: int = 5,
+                                  where: Optional[Where] = None) -> List[Dict[str, Any]]:
+        """Async retrieval; encoding and search run in a worker thread so the event loop stays free."""
+        return await asyncio.to_thread(self.retrieve_documents, query, n_results, None, where)
+
+    async def aretrieve_in_session(self, query: str, history: Optional[List[Turn]] = None,
+                                   session_id: Optional[str] = None, n_results: int = 5,
+                                   where: Optional[Where] = None) -> List[Dict[str, Any]]:
+        """Async ``retrieve_in_session``, run in a worker thread."""
+        return await asyncio.to_thread(self.retrieve_in_session, query, history, session_id, n_results, where)
+
+    async def agenerate_response_stream(self, prompt: str, max_tokens: int = 500,
+                                        temperature: float = 0.7) -> AsyncIterator[str]:
+        """Stream the OpenAI response token by token."""
+        start = time.perf_counter()
+        parts: List[str] = []
+        try:
+            stream = await self.async_openai_client.chat.completions.create(
+                model=self.model_name,
+                messages=self._messages(prompt),
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if metrics.enabled:
+                        parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+
+        except Exception as e:
+            metrics.inc("rag_generation_errors_total")
+            yield f"Error generating response: {e}"
+
+        finally:
+            if metrics.enabled:
+                metrics.record_stage("generate", time.perf_counter() - start)
+                self._count_completion("".join(parts))
+
+    async def agenerate_response(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7) -> str:
+        """Generate a complete response without blocking the event loop."""
+        parts = [token async for token in self.agenerate_response_stream(prompt, max_tokens, temperature)]
+        return "".join(parts).strip()
+
+    def astream_answer(self, query: str, retrieved_docs: List[Dict[str, Any]],
+                       history: Optional[List[Turn]] = None) -> AsyncIterator[str]:
+        """Stream the answer to ``query`` for already retrieved documents, after the chat turns in ``history``."""
+        prompt = self.generate_prompt(query, retrieved_docs, history)
+        return self.agenerate_response_stream(prompt, self.max_tokens, self.temperature)
+
+    async def aask(self, query: str, where: Optional[Where] = None, history: Optional[List[Turn]] = None,
+                   session_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Async RAG pipeline: same result as ``ask`` without blocking the event loop.
+        """
+        validate_where(where)
+        start = time.perf_counter()
+        with metrics.trace() as timings:
+            # to_thread copies the context, so worker-thread stages land in this trace
+            query_embedding = await asyncio.to_thread(self._embed_query, query)
+            cached = None if history else self._cached_answer(query, query_embedding, where)
+            if cached is not None:
+                return self._with_timings(cached, timings, start)
+
+            turn: Dict[str, Any] = {}
+            if history or session_id is not None:
+                retrieved_docs, turn = await asyncio.to_thread(self._retrieve_turn, query, history, session_id,
+                                                               self.n_results, where, query_embedding)
+            else:
+                retrieved_docs = await asyncio.to_thread(self.retrieve_documents, query, self.n_results,
+                                                         query_embedding, where)
+            prompt, packed = self.build_prompt(query, retrieved_docs, history)
+            response = await self.agenerate_response(prompt, self.max_tokens, self.temperature)
+            result = {**self._result(query, response, retrieved_docs, prompt, packed), **turn}
+            if not history:
+                self._cache_answer(query_embedding, result, start, where)
+            return self._with_timings(result, timings, start)
+
     def get_system_info(self) -> Dict[str, Any]:
         """Get information about the retrieval system."""
         try:
@@ -146,6 +591,11 @@ class RAGRetriever:
                 "vector_store": collection_info,
                 "embeddings": embeddings_info,
                 "openai_model": self.model_name,
+                "answer_cache": self.answer_cache.stats() if self.answer_cache is not None else "disabled",
+                "reranker": self.reranker.stats() if self.reranker is not None else "disabled",
+                "conversation_sessions": self.sessions.stats() if self.sessions is not None else "disabled",
+                "llm_provider": self.llm_provider,
+                "loaded_models": model_registry.loaded_models(),
                 "status": "ready"
             }
         except Exception as e:
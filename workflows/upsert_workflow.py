@@ -1,15 +1,150 @@
+import logging
+import os
+from collections import defaultdict
+from itertools import batched
+from typing import Iterable, List, Optional, Tuple
+
+from src.bulk_writer import UpsertProgress
+from src.chunker import TextChunker
 from src.document_loader import DocumentLoader
 from src.embeddings_manager import EmbeddingsManager
+from src.ingest_manifest import IngestManifest
+from src.metrics import metrics
 from src.vector_store import VectorStore
+from utils.config_file import IngestConfig
+
+logger = logging.getLogger(__name__)
 
 class RAGSystem:
-    def __init__(self, file_directory: str):
+    def __init__(self, file_directory: Optional[str] = None,
+                 embeddings_manager: Optional[EmbeddingsManager] = None,
+                 vector_store: Optional[VectorStore] = None):
         self.loader = DocumentLoader(file_directory)
-        self.embeddings_manager = EmbeddingsManager()
-        self.vector_store = VectorStore()
-
-    def workflow(self):
-        documents = self.loader.load_documents()
-        embeddings = self.embeddings_manager.encode(documents)
-        self.vector_store.update_collection(documents=documents, embeddings=embeddings)
-        print(f"Loaded {len(documents)} documents into the vector store.")
\ No newline at end of file
+        self.embeddings_manager = embeddings_manager or EmbeddingsManager()
+        self.vector_store = vector_store or VectorStore()
+        self.batch_size = IngestConfig.BATCH_SIZE
+        self.checkpoint_batches = getattr(IngestConfig, 'CHECKPOINT_BATCHES', 20)
+        self.manifest = IngestManifest(
+            os.path.join(IngestConfig.MANIFEST_DIR, f"{self.vector_store.collection_name}.json")
+        )
+        # Chunk ids stored by an interrupted run of workflow(), skipped when it is re-run
+        self.progress = UpsertProgress(
+            os.path.join(IngestConfig.MANIFEST_DIR, f"{self.vector_store.collection_name}.progress")
+        )
+
+    def workflow(self, prune_missing: bool = False):
+        """Incrementally sync the directory into the vector store.
+
+        Files whose hash matches the manifest are skipped. For changed files
+        only chunks with new content hashes are embedded and upserted, and
+        chunks that no longer exist are deleted. With ``prune_missing`` the
+        chunks of files that disappeared from the directory are deleted too.
+        Pages stream through chunking, batched embedding and upserts, so only
+        one batch is held in memory at a time. The store is persisted every
+        ``CHECKPOINT_BATCHES`` batches; if the run fails, re-running it skips
+        the chunks persisted so far instead of embedding and upserting them again.
+        """
+        file_hashes = {}
+        for filename in self.loader.list_files():
+            file_hash = IngestManifest.file_hash(os.path.join(self.loader.directory, filename))
+            if not self.manifest.is_unchanged(filename, file_hash):
+                file_hashes[filename] = file_hash
+        logger.info("%d new or changed files to ingest", len(file_hashes))
+
+        known_ids = {filename: set(self.manifest.chunk_ids(filename)) for filename in file_hashes}
+        current_ids = defaultdict(list)
+        if self.progress.done:
+            logger.info("Resuming: %d chunks were stored by an interrupted run", len(self.progress.done))
+
+        def new_records():
+            self._use_model_tokenizer()
+            pages = self._measured(self.loader.iter_pages(filenames=list(file_hashes)))
+            for chunk, metadata, chunk_id in self.vector_store.iter_chunks(pages):
+                current_ids[metadata["source"]].append(chunk_id)
+                if chunk_id not in known_ids[metadata["source"]] and chunk_id not in self.progress.done:
+                    yield chunk, metadata, chunk_id
+
+        self.vector_store.progress = self.progress
+        try:
+            num_embedded = self._store(new_records(), checkpoint=True)
+        finally:
+            # Journal whatever made it into the store, even when the run fails
+            self.vector_store.persist()
+            self.vector_store.progress = None
+
+        stale_ids = []
+        for filename, file_hash in file_hashes.items():
+            stale_ids.extend(known_ids[filename] - set(current_ids[filename]))
+            self.manifest.update(filename, file_hash, current_ids[filename])
+        if prune_missing:
+            present = set(self.loader.list_files())
+            for filename in [name for name in self.manifest.files if name not in present]:
+                stale_ids.extend(self.manifest.remove(filename)["chunk_ids"])
+        if self.progress.done:
+            # Chunks an interrupted run stored for file contents that no longer exist
+            live = {chunk_id for entry in self.manifest.files.values() for chunk_id in entry["chunk_ids"]}
+            stale_ids.extend(self.progress.done - live - set(stale_ids))
+
+        self.vector_store.delete_chunks(stale_ids)
+        self.vector_store.persist()
+        self.manifest.save()
+        self.progress.clear()
+        logger.info("Embedded %d new chunks and removed %d stale chunks", num_embedded, len(stale_ids))
+
+    def ingest_texts(self, documents: List[Tuple[str, str]]) -> int:
+        """Chunk, embed and upsert in-memory ``(source, text)`` documents.
+
+        No manifest is involved; content-hash IDs make repeated calls idempotent.
+        """
+        self._use_model_tokenizer()
+        pages = ((source, 1, text) for source, text in documents)
+        num_chunks = self._store(self.vector_store.iter_chunks(pages))
+        self.vector_store.persist()
+        return num_chunks
+
+    def export_snapshot(self, path: str, vector_dtype: Optional[str] = None, overwrite: bool = False) -> dict:
+        """Snapshot the collection, tagged with this system's embedding model and carrying its ingest manifest."""
+        return self.vector_store.export_snapshot(path, self.embeddings_manager.model_name, vector_dtype,
+                                                 self.manifest.path, overwrite)
+
+    def import_snapshot(self, path: str, replace: bool = False) -> dict:
+        """Load a snapshot instead of re-embedding; later ``workflow`` runs continue incrementally from it."""
+        manifest = self.vector_store.import_snapshot(path, self.embeddings_manager.model_name, replace,
+                                                     ingest_manifest_path=self.manifest.path)
+        self.manifest = IngestManifest(self.manifest.path)
+        self.progress.clear()
+        return manifest
+
+    def _use_model_tokenizer(self):
+        """Chunk with the embedding model's own tokenizer so no chunk is truncated.
+
+        Deferred until there is something to ingest, so building a RAGSystem
+        does not load the model.
+        """
+        if self.vector_store.chunker.tokenizer is None:
+            self.vector_store.chunker = TextChunker.for_model(self.embeddings_manager.model)
+
+    @staticmethod
+    def _measured(pages: Iterable[Tuple[str, int, str]]) -> Iterable[Tuple[str, int, str]]:
+        """Charge page extraction to the "load" stage and count the extracted text."""
+        for page in metrics.timed_iter("load", pages):
+            if metrics.enabled:
+                metrics.inc("rag_loaded_pages_total")
+                metrics.inc("rag_loaded_bytes_total", len(page[2].encode('utf-8')))
+            yield page
+
+    def _store(self, records: Iterable[Tuple[str, dict, str]], checkpoint: bool = False) -> int:
+        """Embed and upsert ``(chunk, metadata, id)`` records batch by batch.
+
+        With ``checkpoint`` the store is persisted every ``checkpoint_batches``
+        batches, which also commits the resume journal.
+        """
+        num_chunks = 0
+        for number, batch in enumerate(batched(records, self.batch_size), 1):
+            chunks, metadatas, ids = (list(column) for column in zip(*batch))
+            embeddings = self.embeddings_manager.encode(chunks)
+            self.vector_store.add_chunks(chunks, metadatas, ids, embeddings)
+            num_chunks += len(chunks)
+            if checkpoint and self.checkpoint_batches and number % self.checkpoint_batches == 0:
+                self.vector_store.persist()
+        return num_chunks